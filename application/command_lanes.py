@@ -0,0 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class CommandLanes:
+    """
+    Serializes commands per drone while commands for different drones run concurrently.
+
+    Each drone gets its own lock while at least one command for it is running or
+    waiting, so the table only holds the drones that are busy.
+    """
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+
+        # metrics
+        self.contended = 0
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def lane(self, drone_id: str):
+        """
+        Run the body with exclusive access to the drone.
+        """
+        lock = self._locks.get(drone_id)
+        if lock is None:
+            lock = self._locks[drone_id] = asyncio.Lock()
+        elif lock.locked():
+            self.contended += 1
+        self._users[drone_id] = self._users.get(drone_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[drone_id] -= 1
+            if not self._users[drone_id]:
+                del self._users[drone_id]
+                del self._locks[drone_id]
+
+    def metrics(self) -> dict:
+        return {
+            "active": len(self._locks),
+            "contended": self.contended,
+        }
@@ -0,0 +1,336 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from application.command_tracker import CommandInFlightError
+from domain.drone import Drone, DroneStatus, InvalidTransitionError
+from infrastructure.metrics import Counter
+from infrastructure.repository.outbox_repository import CommandOutboxRepository
+
+OUTBOX_COMMANDS = Counter("drone_api_outbox_commands", "Commands queued for offline drones, per outcome.", ["outcome"])
+
+# Queued commands are delivered lowest first, so a drone coming back is sent home before anything else
+COMMAND_PRIORITY = {"return-home": 0, "land": 1, "takeoff": 2}
+
+QUEUED = "queued"
+DONE = "done"
+# Queued for a drone another worker owns; only the owner delivers it
+FORWARDED = "forwarded"
+
+
+class QueuedCommand:
+    __slots__ = ("entry_id", "drone_id", "command", "priority", "idempotency_key", "created_at", "expires_at",
+                 "state", "attempts")
+
+    def __init__(self, entry_id: str, drone_id: str, command: str, priority: int, idempotency_key: Optional[str],
+                 created_at: float, expires_at: float, state: str = QUEUED):
+        self.entry_id = entry_id
+        self.drone_id = drone_id
+        self.command = command
+        self.priority = priority
+        self.idempotency_key = idempotency_key
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.state = state
+        self.attempts = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QueuedCommand":
+        return cls(data["_id"], data["drone_id"], data["command"], data["priority"], data.get("idempotency_key"),
+                   data["created_at"], data["expires_at"], data.get("state", QUEUED))
+
+    def to_dict(self) -> Dict:
+        return {
+            "_id": self.entry_id,
+            "drone_id": self.drone_id,
+            "command": self.command,
+            "priority": self.priority,
+            "idempotency_key": self.idempotency_key,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+            "state": self.state,
+        }
+
+
+class CommandOutbox:
+    """
+    Per-drone outbox of commands issued while the drone was offline.
+
+    Commands are written to the store (when there is one) and indexed in memory:
+    a priority heap per drone, the idempotency keys, and one expiry heap. Nothing
+    polls: the outbox is a heartbeat listener, and a status message from a drone
+    with queued commands starts delivering them, one at a time and each waiting
+    for its ack. The handler is given the drone as it last reported, which can be
+    newer than the stored drone while the report waits in the write-behind stage.
+    Commands whose ack does not arrive, or that the drone cannot accept because it
+    is still lost, stay queued and are retried on a later status message, up to
+    max_attempts. Commands the drone can no longer accept, e.g. an invalid
+    transition from its reported status, are dropped.
+    Expired commands are pruned from memory as new ones are queued, and deleted
+    from MongoDB by its TTL index.
+
+    With sharded ingestion, only the worker that owns a drone (see ShardPlan.owns)
+    receives its status messages, so only that worker holds and delivers the
+    drone's commands. A command queued on another worker is stored and handed to
+    the forwarder, which passes it on to every worker's receive(); workers only
+    load owned commands from the store at startup.
+    """
+    def __init__(self, store: Optional[CommandOutboxRepository] = None, ttl: float = 3600.0, max_attempts: int = 5,
+                 owns: Optional[Callable[[str], bool]] = None):
+        self.store = store
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.owns = owns
+        self._queues: Dict[str, List[Tuple[int, int, QueuedCommand]]] = {}
+        self._pending: Dict[str, int] = {}
+        self._keys: Dict[str, QueuedCommand] = {}
+        self._entries: Dict[str, QueuedCommand] = {}
+        self._expiry: List[Tuple[float, int, QueuedCommand]] = []
+        self._sequence = itertools.count()
+        self._handler: Optional[Callable[[QueuedCommand, Optional[Drone]], Awaitable]] = None
+        self._forwarder: Optional[Callable[[Dict], Awaitable]] = None
+        self._draining: Dict[str, asyncio.Task] = {}
+        self._reported: Dict[str, Drone] = {}
+        self._size = 0
+
+        # metrics
+        self.queued = 0
+        self.delivered = 0
+        self.expired = 0
+        self.rejected = 0
+        self.retries = 0
+        self.duplicates = 0
+        self.forwarded = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, drone_id: str) -> bool:
+        return drone_id in self._pending
+
+    def set_handler(self, handler: Callable[[QueuedCommand, Optional[Drone]], Awaitable]):
+        """
+        Set the coroutine function that sends a queued command, given the drone as it
+        last reported, and waits for its ack.
+        """
+        self._handler = handler
+
+    def set_forwarder(self, forwarder: Callable[[Dict], Awaitable]):
+        """
+        Set the coroutine function that passes a command queued for a drone owned by
+        another worker on to every worker.
+        """
+        self._forwarder = forwarder
+
+    def _owned(self, drone_id: str) -> bool:
+        return self.owns is None or self.owns(drone_id)
+
+    def pending_for(self, drone_id: str) -> List[QueuedCommand]:
+        """
+        Return the commands queued for a drone, in delivery order.
+        """
+        now = time.time()
+        return [entry for _, _, entry in sorted(self._queues.get(drone_id, ()))
+                if entry.state == QUEUED and entry.expires_at > now]
+
+    def _index(self, entry: QueuedCommand):
+        sequence = next(self._sequence)
+        self._entries[entry.entry_id] = entry
+        if entry.state == QUEUED:
+            heapq.heappush(self._queues.setdefault(entry.drone_id, []), (entry.priority, sequence, entry))
+            self._pending[entry.drone_id] = self._pending.get(entry.drone_id, 0) + 1
+            self._size += 1
+        if entry.idempotency_key is not None:
+            self._keys[entry.idempotency_key] = entry
+        heapq.heappush(self._expiry, (entry.expires_at, sequence, entry))
+
+    def _finish(self, entry: QueuedCommand, outcome: str):
+        entry.state = DONE
+        self._size -= 1
+        remaining = self._pending[entry.drone_id] - 1
+        if remaining:
+            self._pending[entry.drone_id] = remaining
+        else:
+            # The heap only holds finished entries now
+            del self._pending[entry.drone_id]
+            del self._queues[entry.drone_id]
+        OUTBOX_COMMANDS.labels(outcome).inc()
+
+    def purge_expired(self, now: Optional[float] = None):
+        """
+        Forget the commands and idempotency keys that expired by now.
+        """
+        now = time.time() if now is None else now
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            entry = heapq.heappop(expiry)[2]
+            if entry.state == QUEUED:
+                self.expired += 1
+                self._finish(entry, "expired")
+            if entry.idempotency_key is not None and self._keys.get(entry.idempotency_key) is entry:
+                del self._keys[entry.idempotency_key]
+            self._entries.pop(entry.entry_id, None)
+
+    def _duplicate(self, existing: QueuedCommand, drone_id: str, command: str) -> Tuple[QueuedCommand, bool]:
+        if (existing.drone_id, existing.command) != (drone_id, command):
+            raise ValueError(f"Idempotency key {existing.idempotency_key} was used for another command")
+        self.duplicates += 1
+        OUTBOX_COMMANDS.labels("duplicate").inc()
+        return existing, False
+
+    async def enqueue(self, drone_id: str, command: str, idempotency_key: Optional[str] = None,
+                      ttl: Optional[float] = None) -> Tuple[QueuedCommand, bool]:
+        """
+        Queue a command for a drone. Returns the entry and whether it was added, which is
+        False when a command with the same idempotency key was queued before.
+        """
+        if command not in COMMAND_PRIORITY:
+            raise ValueError(f"Unknown command: {command}")
+        now = time.time()
+        self.purge_expired(now)
+        if idempotency_key is not None:
+            existing = self._keys.get(idempotency_key)
+            if existing is not None:
+                return self._duplicate(existing, drone_id, command)
+
+        entry = QueuedCommand(uuid.uuid4().hex, drone_id, command, COMMAND_PRIORITY[command], idempotency_key,
+                              now, now + (self.ttl if ttl is None else ttl))
+        if self.store is not None:
+            while not await self.store.insert(entry.to_dict()):
+                stored = await self.store.find_by_key(idempotency_key)
+                if stored is not None:
+                    # Queued by another instance
+                    return self._duplicate(QueuedCommand.from_dict(stored), drone_id, command)
+                # The stored command was deleted in between, its key is free again
+        if not self._owned(drone_id) and self._forwarder is not None:
+            await self._forwarder(entry.to_dict())
+            # Kept for its idempotency key; the owner delivers it
+            entry.state = FORWARDED
+            self.forwarded += 1
+        self._index(entry)
+        self.queued += 1
+        OUTBOX_COMMANDS.labels("queued").inc()
+        return entry, True
+
+    def receive(self, document: Dict):
+        """
+        Forwarded command listener: queue a command another worker queued for a drone this worker owns.
+        """
+        entry = QueuedCommand.from_dict(document)
+        if (not self._owned(entry.drone_id) or entry.entry_id in self._entries
+                or entry.state != QUEUED or entry.expires_at <= time.time()):
+            return
+        self._index(entry)
+
+    def notify(self, drone: Drone):
+        """
+        Heartbeat listener: start delivering the commands queued for a drone that reported.
+        """
+        drone_id = drone.drone_id
+        if drone_id not in self._pending or self._handler is None:
+            return
+        self._reported[drone_id] = drone
+        if drone_id not in self._draining:
+            self._draining[drone_id] = asyncio.create_task(self._drain(drone_id))
+
+    def _next(self, drone_id: str, now: float) -> Optional[QueuedCommand]:
+        queue = self._queues.get(drone_id)
+        while queue:
+            entry = queue[0][2]
+            if entry.state != QUEUED:
+                heapq.heappop(queue)
+            elif entry.expires_at <= now:
+                heapq.heappop(queue)
+                self.expired += 1
+                self._finish(entry, "expired")
+            else:
+                return entry
+        return None
+
+    async def _complete(self, entry: QueuedCommand, outcome: str):
+        self._finish(entry, outcome)
+        if self.store is not None:
+            try:
+                await self.store.complete(entry.entry_id)
+            except Exception as e:
+                logging.error("Failed to mark queued command %s as done: %s", entry.entry_id, e)
+
+    async def _drain(self, drone_id: str):
+        try:
+            while True:
+                entry = self._next(drone_id, time.time())
+                if entry is None:
+                    return
+                entry.attempts += 1
+                try:
+                    await self._handler(entry, self._reported.get(drone_id))
+                except (asyncio.TimeoutError, CommandInFlightError, InvalidTransitionError) as e:
+                    if isinstance(e, InvalidTransitionError) and e.current != DroneStatus.LOST:
+                        self.rejected += 1
+                        logging.warning("Dropping queued %s command for drone %s: %s", entry.command, drone_id, e,
+                                        extra={"drone_id": drone_id})
+                        await self._complete(entry, "rejected")
+                    elif entry.attempts < self.max_attempts:
+                        # Retried on the next status message of the drone
+                        self.retries += 1
+                        logging.info("Queued %s command for drone %s not delivered yet (attempt %d): %s",
+                                     entry.command, drone_id, entry.attempts, e or "timed out", extra={"drone_id": drone_id})
+                        return
+                    else:
+                        self.rejected += 1
+                        logging.warning("Dropping queued %s command for drone %s after %d attempts",
+                                        entry.command, drone_id, entry.attempts, extra={"drone_id": drone_id})
+                        await self._complete(entry, "rejected")
+                except Exception as e:
+                    self.rejected += 1
+                    logging.warning("Dropping queued %s command for drone %s: %s", entry.command, drone_id, e,
+                                    extra={"drone_id": drone_id})
+                    await self._complete(entry, "rejected")
+                else:
+                    self.delivered += 1
+                    await self._complete(entry, "delivered")
+        finally:
+            del self._draining[drone_id]
+            self._reported.pop(drone_id, None)
+
+    async def load(self):
+        """
+        Load the unexpired commands from the store, so commands queued before a restart are still delivered.
+        """
+        if self.store is None:
+            return
+        loaded = 0
+        async for document in self.store.find_unexpired(time.time()):
+            entry = QueuedCommand.from_dict(document)
+            if entry.state == QUEUED and not self._owned(entry.drone_id):
+                entry.state = FORWARDED
+            if entry.entry_id not in self._entries:
+                self._index(entry)
+                loaded += 1
+        logging.info("Loaded %d commands from the outbox, %d of them queued", loaded, self._size)
+
+    async def stop(self):
+        """
+        Stop the deliveries in progress; their commands stay queued.
+        """
+        tasks = list(self._draining.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        return {
+            "queued_now": self._size,
+            "drones": len(self._pending),
+            "queued": self.queued,
+            "delivered": self.delivered,
+            "expired": self.expired,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "duplicates": self.duplicates,
+            "forwarded": self.forwarded,
+        }
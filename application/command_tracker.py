@@ -0,0 +1,133 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Dict, Optional
+
+
+class CommandInFlightError(Exception):
+    """
+    Raised when a drone still has an unacknowledged command.
+    """
+
+
+class PendingCommand:
+    __slots__ = ("tid", "drone_id", "command", "future", "sent_at", "timer")
+
+    def __init__(self, tid: uuid.UUID, drone_id: str, command: str, future: asyncio.Future):
+        self.tid = tid
+        self.drone_id = drone_id
+        self.command = command
+        self.future = future
+        self.sent_at = time.perf_counter()
+        self.timer = None
+
+
+class CommandTracker:
+    """
+    Pending-ack table correlating published commands with drone acknowledgements by tid.
+
+    Every entry carries its own expiry timer, so registering, resolving and expiring
+    a command are O(1). A drone can only have one pending command at a time.
+    The future of an entry resolves to the ack message, or to None when it expires.
+    """
+    def __init__(self, ack_timeout: float = 10.0, latency_window: int = 1024):
+        self.ack_timeout = ack_timeout
+        self._by_tid: Dict[str, PendingCommand] = {}
+        self._by_drone: Dict[str, PendingCommand] = {}
+        self._latencies = deque(maxlen=latency_window)
+
+        # metrics
+        self.acked = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._by_tid)
+
+    def pending_for(self, drone_id: str) -> Optional[PendingCommand]:
+        return self._by_drone.get(drone_id)
+
+    def register(self, drone_id: str, command: str) -> PendingCommand:
+        """
+        Track a new command for a drone and return its pending entry.
+        """
+        current = self._by_drone.get(drone_id)
+        if current is not None:
+            raise CommandInFlightError(
+                f"Drone {drone_id} has not acknowledged its {current.command} command {current.tid} yet"
+            )
+        loop = asyncio.get_running_loop()
+        pending = PendingCommand(uuid.uuid4(), drone_id, command, loop.create_future())
+        pending.timer = loop.call_later(self.ack_timeout, self._expire, str(pending.tid))
+        self._by_tid[str(pending.tid)] = pending
+        self._by_drone[drone_id] = pending
+        return pending
+
+    def mark_sent(self, pending: PendingCommand):
+        """
+        Start measuring the ack latency of a command as it is published.
+        """
+        pending.sent_at = time.perf_counter()
+
+    def _remove(self, tid: str) -> Optional[PendingCommand]:
+        pending = self._by_tid.pop(tid, None)
+        if pending is not None:
+            pending.timer.cancel()
+            if self._by_drone.get(pending.drone_id) is pending:
+                del self._by_drone[pending.drone_id]
+        return pending
+
+    def resolve(self, tid, message: Dict) -> bool:
+        """
+        Resolve the command with the given tid. Returns False for unknown or expired tids.
+        """
+        pending = self._remove(str(tid))
+        if pending is None:
+            return False
+        self._latencies.append(time.perf_counter() - pending.sent_at)
+        self.acked += 1
+        if not pending.future.done():
+            pending.future.set_result(message)
+        return True
+
+    def discard(self, pending: PendingCommand):
+        """
+        Forget a command that could not be sent.
+        """
+        if self._remove(str(pending.tid)) is not None and not pending.future.done():
+            pending.future.set_result(None)
+
+    def _expire(self, tid: str):
+        pending = self._remove(tid)
+        if pending is None:
+            return
+        self.expired += 1
+        if not pending.future.done():
+            pending.future.set_result(None)
+
+    async def wait(self, pending: PendingCommand, timeout: Optional[float] = None) -> Dict:
+        """
+        Wait for the ack of a command. Raises asyncio.TimeoutError when it does not arrive in time.
+        """
+        message = await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        if message is None:
+            raise asyncio.TimeoutError()
+        return message
+
+    def latency(self, pending: PendingCommand) -> float:
+        return time.perf_counter() - pending.sent_at
+
+    def metrics(self) -> Dict:
+        """
+        Return a snapshot of ack counters and end-to-end latency (seconds) over the recent window.
+        """
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+        return {
+            "pending": len(self._by_tid),
+            "acked": self.acked,
+            "expired": self.expired,
+            "latency_p50": latencies[count // 2] if count else None,
+            "latency_p99": latencies[min(count - 1, int(count * 0.99))] if count else None,
+            "latency_max": latencies[-1] if count else None,
+        }
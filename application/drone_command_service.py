@@ -1,10 +1,21 @@
 from datetime import datetime
 from domain.drone import Drone, DroneStatus
-from infrastructure.repository.drone_repository import DroneRepository
+from domain.geo import LatLon, haversine_m, validate_position
+from infrastructure.repository.base import DroneRepositoryProtocol
+from infrastructure.repository.drone_loader import DroneLoader
 from infrastructure.mqtt_handler import MQTTHandler
-from typing import Dict
+from infrastructure.mqtt_publisher import MQTTPublisher
+from infrastructure.drone_cache import DroneStateCache
+from infrastructure.spatial_index import SpatialIndex
+from infrastructure.liveness import LivenessMonitor
+from infrastructure.fleet_stats import FleetStats
+from application.command_tracker import CommandTracker, PendingCommand
+from application.command_lanes import CommandLanes
+from application.command_outbox import CommandOutbox, QueuedCommand
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from pydantic import BaseModel
-import json
+import asyncio
+import copy
 
 import logging
 import uuid
@@ -15,11 +26,105 @@ class DroneTopic(BaseModel):
     data: Dict
 
 
+# Command name -> (label used in messages, Drone method applying it)
+COMMANDS = {
+    "takeoff": ("takeoff", Drone.takeoff),
+    "land": ("land", Drone.land),
+    "return-home": ("return_home", Drone.return_home),
+}
+
+
+class ConcurrentUpdateError(Exception):
+    """
+    Raised when a drone kept changing under a command for every compare-and-set attempt.
+    """
+
+
 class DroneCommandService:
-    def __init__(self, drone_repository: DroneRepository, mqtt_handler: MQTTHandler):
+    def __init__(self, drone_repository: DroneRepositoryProtocol, mqtt_handler: MQTTHandler, drone_cache: DroneStateCache = None,
+                 command_tracker: CommandTracker = None, drone_loader: DroneLoader = None,
+                 publisher: MQTTPublisher = None, spatial_index: SpatialIndex = None,
+                 liveness_monitor: LivenessMonitor = None, command_lanes: CommandLanes = None,
+                 max_update_attempts: int = 3, command_outbox: CommandOutbox = None, fleet_stats: FleetStats = None):
         self.drone_repository = drone_repository
+        self.command_lanes = command_lanes if command_lanes is not None else CommandLanes()
+        self.max_update_attempts = max_update_attempts
+        self.drone_loader = drone_loader if drone_loader is not None else DroneLoader(drone_repository)
         self.subscriber = mqtt_handler
-        
+        self.publisher = publisher if publisher is not None else mqtt_handler.publisher
+        self.drone_cache = drone_cache
+        self.command_tracker = command_tracker if command_tracker is not None else CommandTracker()
+        self.spatial_index = spatial_index
+        if drone_cache is not None:
+            mqtt_handler.add_status_listener(drone_cache.put)
+        if spatial_index is not None:
+            mqtt_handler.add_status_listener(spatial_index.update)
+        self.fleet_stats = fleet_stats
+        if fleet_stats is not None:
+            mqtt_handler.add_status_listener(fleet_stats.update)
+        self.liveness_monitor = liveness_monitor
+        if liveness_monitor is not None:
+            mqtt_handler.add_heartbeat_listener(liveness_monitor.report)
+            liveness_monitor.add_lost_listener(self.mark_lost)
+        self.command_outbox = command_outbox
+        if command_outbox is not None:
+            mqtt_handler.add_heartbeat_listener(command_outbox.notify)
+            command_outbox.set_handler(self._deliver_queued)
+            if mqtt_handler.outbox_topic:
+                command_outbox.set_forwarder(self._forward_queued)
+                mqtt_handler.add_outbox_listener(command_outbox.receive)
+        mqtt_handler.add_ack_listener(self.command_tracker.resolve)
+
+    async def _find_drone(self, drone_id: str) -> Drone:
+        """
+        Read-through lookup: serve the drone from the cache, loading it from the repository on a miss.
+        Concurrent misses share one repository query through the loader.
+        The returned object is shared with the cache and must not be modified.
+        """
+        if self.drone_cache is not None:
+            drone = self.drone_cache.get(drone_id)
+            if drone is not None:
+                return drone
+        drone = await self.drone_loader.load(drone_id)
+        if self.drone_cache is not None and drone:
+            self.drone_cache.put(drone)
+        return drone
+
+    async def _load_drone(self, drone_id: str) -> Drone:
+        """
+        Return a private copy of the drone that commands can modify.
+        """
+        drone = await self._find_drone(drone_id)
+        return copy.copy(drone) if drone else drone
+
+    async def _mutate(self, drone_id: str, change: Callable[[Drone], None], reported: Optional[Drone] = None) -> Drone:
+        """
+        Apply a change to the stored drone with optimistic concurrency: read the versioned
+        document, apply the change (which may raise to reject it) and write it back only if
+        the version is still the one read. A telemetry write in between makes the write miss,
+        and the change is retried against the new state. A reported drone newer than the
+        stored one, whose report is still in the write-behind stage, is changed instead.
+        """
+        for _ in range(self.max_update_attempts):
+            drone = await self.drone_repository.find_by_id(drone_id)
+            if reported is not None and reported.last_updated > drone.last_updated:
+                version = drone.version
+                drone = copy.copy(reported)
+                drone.version = version
+            change(drone)
+            # Documents written before versioning have no version and match version 0
+            expected = drone.version or 0
+            if await self.drone_repository.compare_and_set(drone.to_dict(), expected):
+                drone.version = expected + 1
+                if self.drone_cache is not None:
+                    self.drone_cache.put(drone)
+                if self.subscriber.change_detector is not None:
+                    # A report repeating the state before the command is a change now
+                    self.subscriber.change_detector.forget(drone_id)
+                return drone
+        raise ConcurrentUpdateError(
+            f"Drone {drone_id} changed during each of {self.max_update_attempts} update attempts"
+        )
 
     async def connect(self):
         """
@@ -31,76 +136,241 @@ class DroneCommandService:
         
 
     async def get_status(self, drone_id: str) -> DroneStatus:
-        drone = await self.drone_repository.find_by_id(drone_id)
+        drone = await self._find_drone(drone_id)
         return drone.status
 
-    async def execute_takeoff(self, drone_id: str):
-        drone_data = await self.drone_repository.find_by_id(drone_id)
-        if not drone_data:
-            raise ValueError(f"Drone with id {drone_id} not found")
-        # Simulate a drone object
-        drone = Drone(drone_id, self.subscriber.mqtt_client, self.subscriber.status_topic)
-        if not drone:
-            raise ValueError(f"Faied to Simulate Drone object with id {drone_id}")
-
-        drone.takeoff()
-        await self.publish_status(drone.to_dict())
-        
-        return f"takeoff command sent to Drone {drone_id}"
+    async def get_statuses(self, drone_ids: Optional[List[str]] = None, status: Optional[DroneStatus] = None,
+                           dock_id: Optional[str] = None, after: Optional[str] = None,
+                           limit: Optional[int] = None) -> List[Drone]:
+        """
+        Look up several drones at once. Cached drones are served from memory and
+        the remaining ones are loaded with a single repository query, shared with
+        any concurrent lookup of the same drones. Without drone_ids, the fleet is
+        queried a page at a time: up to limit drones in drone_id order, after the
+        given ID.
+        """
+        status_value = status.value if status is not None else None
+        if drone_ids is None:
+            return await self.drone_repository.find_many(status=status_value, dock_id=dock_id, after=after, limit=limit)
+        if self.drone_cache is None:
+            return await self.drone_repository.find_many(drone_ids, status=status_value, dock_id=dock_id)
 
-    async def execute_land(self, drone_id: str):
-        # TODO: Make Command and Publish MQTT
-        drone = await self.drone_repository.find_by_id(drone_id)
-        if not drone:
-            raise ValueError(f"Drone with id {drone_id} not found")
-        
-        drone_data = drone.land()
-        await self.publish_status(drone_data)
+        drones = []
+        missing = []
+        for drone_id in dict.fromkeys(drone_ids):
+            drone = self.drone_cache.get(drone_id)
+            if drone is None:
+                missing.append(drone_id)
+            elif (status is None or drone.status == status) and (dock_id is None or drone.dock_id == dock_id):
+                drones.append(drone)
+        if missing:
+            loaded = await self.drone_loader.load_many(missing)
+            for drone in loaded:
+                self.drone_cache.put(drone)
+                if (status is None or drone.status == status) and (dock_id is None or drone.dock_id == dock_id):
+                    drones.append(drone)
+        return drones
 
-        return f"land command sent to Drone {drone_id}"
+    async def mark_lost(self, drone_id: str):
+        """
+        Flip a drone that stopped reporting to LOST. The last_updated timestamp is kept,
+        so it tells when the drone was last heard from.
+        """
+        drone = await self._load_drone(drone_id)
+        if drone.status == DroneStatus.LOST:
+            return
+        if self.liveness_monitor is not None and drone_id in self.liveness_monitor:
+            # The drone reported again while it was being loaded
+            return
+        drone.status = DroneStatus.LOST
+        await self.subscriber.apply_status(drone)
+        logging.warning("Drone %s stopped reporting and is marked lost", drone_id, extra={"drone_id": drone_id})
 
-    async def execute_return_home(self, drone_id: str):
-        drone = await self.drone_repository.find_by_id(drone_id)
-        if not drone:
-            raise ValueError(f"Drone with id {drone_id} not found")
-        
-        drone_data = drone.return_home()
-        await self.publish_status(drone_data)
+    async def find_nearby(self, latitude: float, longitude: float, radius_m: float) -> List[Dict]:
+        """
+        Return the drones within radius_m meters of a point, nearest first. Served from
+        the spatial index once it is loaded, and from the repository before that.
+        """
+        validate_position(latitude, longitude)
+        if self.spatial_index is not None and self.spatial_index.ready:
+            matches = self.spatial_index.within_radius(latitude, longitude, radius_m)
+        else:
+            drones = await self.drone_repository.find_near(latitude, longitude, radius_m)
+            matches = sorted(
+                ((drone.drone_id, (drone.latitude, drone.longitude, drone.altitude),
+                  haversine_m(latitude, longitude, drone.latitude, drone.longitude)) for drone in drones),
+                key=lambda match: match[2],
+            )
+        return [{"drone_id": drone_id, "latitude": position[0], "longitude": position[1], "altitude": position[2],
+                 "distance_m": round(distance, 1)} for drone_id, position, distance in matches]
+
+    async def find_in_polygon(self, polygon: Sequence[LatLon]) -> List[Dict]:
+        """
+        Return the drones inside a polygon of (lat, lon) vertices.
+        """
+        if len(polygon) < 3:
+            raise ValueError("A polygon needs at least 3 points")
+        for latitude, longitude in polygon:
+            validate_position(latitude, longitude)
+        if self.spatial_index is not None and self.spatial_index.ready:
+            matches = self.spatial_index.within_polygon(polygon)
+        else:
+            drones = await self.drone_repository.find_within(polygon)
+            matches = [(drone.drone_id, (drone.latitude, drone.longitude, drone.altitude)) for drone in drones]
+        return [{"drone_id": drone_id, "latitude": position[0], "longitude": position[1], "altitude": position[2]}
+                for drone_id, position in matches]
+
+    async def _is_offline(self, drone_id: str) -> bool:
+        """
+        A drone is offline when the liveness monitor timed it out and it has not reported
+        since, or when it is stored as lost, e.g. by the worker tracking it. Drones the
+        monitor does not track yet, e.g. before the startup warm-up, count as online.
+        """
+        if self.liveness_monitor is None:
+            return False
+        if self.liveness_monitor.is_silent(drone_id):
+            return True
+        drone = await self._find_drone(drone_id)
+        return drone.status == DroneStatus.LOST
 
-        return f"return_home command sent to Drone {drone_id}"
+    async def execute_command(self, drone_id: str, command: str, wait: bool = False, timeout: Optional[float] = None,
+                              idempotency_key: Optional[str] = None, ttl: Optional[float] = None):
+        """
+        Dispatch a single command by name. Commands for offline drones are queued in the
+        outbox, when there is one, and delivered when the drone reports again.
+        """
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+        if self.command_outbox is not None and await self._is_offline(drone_id):
+            return await self._queue_command(drone_id, command, idempotency_key, ttl)
+        label, change = COMMANDS[command]
+        return await self._send_command(drone_id, command, label, change, wait, timeout)
+
+    async def execute_commands(self, commands: List[Tuple[str, str]], concurrency: int = 32) -> List[Dict]:
+        """
+        Run (drone_id, command) pairs concurrently, at most `concurrency` at a time,
+        and return one result per pair in the same order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(drone_id: str, command: str) -> Dict:
+            async with semaphore:
+                try:
+                    message = await self.execute_command(drone_id, command)
+                    return {"drone_id": drone_id, "command": command, "success": True, "message": message}
+                except Exception as e:
+                    return {"drone_id": drone_id, "command": command, "success": False, "message": str(e)}
+
+        return await asyncio.gather(*(run(drone_id, command) for drone_id, command in commands))
+
+    async def execute_takeoff(self, drone_id: str, wait: bool = False, timeout: Optional[float] = None,
+                              idempotency_key: Optional[str] = None, ttl: Optional[float] = None):
+        return await self.execute_command(drone_id, "takeoff", wait, timeout, idempotency_key, ttl)
+
+    async def execute_land(self, drone_id: str, wait: bool = False, timeout: Optional[float] = None,
+                           idempotency_key: Optional[str] = None, ttl: Optional[float] = None):
+        return await self.execute_command(drone_id, "land", wait, timeout, idempotency_key, ttl)
+
+    async def execute_return_home(self, drone_id: str, wait: bool = False, timeout: Optional[float] = None,
+                                  idempotency_key: Optional[str] = None, ttl: Optional[float] = None):
+        return await self.execute_command(drone_id, "return-home", wait, timeout, idempotency_key, ttl)
+
+    async def _queue_command(self, drone_id: str, command: str, idempotency_key: Optional[str], ttl: Optional[float]) -> str:
+        await self.drone_repository.find_by_id(drone_id)
+        label = COMMANDS[command][0]
+        _, added = await self.command_outbox.enqueue(drone_id, command, idempotency_key=idempotency_key, ttl=ttl)
+        if not added:
+            return f"{label} command already queued for Drone {drone_id}"
+        return f"{label} command queued for offline Drone {drone_id}"
+
+    async def _deliver_queued(self, entry: QueuedCommand, reported: Optional[Drone]):
+        """
+        Outbox handler: send a queued command and wait for its ack. The command is
+        validated against the drone's latest report, which may not be stored yet.
+        """
+        label, change = COMMANDS[entry.command]
+        await self._send_command(entry.drone_id, entry.command, label, change, wait=True, timeout=None,
+                                 reported=reported)
+
+    async def _forward_queued(self, entry: Dict):
+        """
+        Outbox forwarder: pass a command queued for a drone owned by another worker on to every worker.
+        """
+        await self.publisher.publish(self.subscriber.outbox_topic, self.subscriber.codec.encode(entry), kind="command")
+
+    async def _send_command(self, drone_id: str, command: str, label: str, change: Callable[[Drone], Dict],
+                            wait: bool, timeout: Optional[float], reported: Optional[Drone] = None) -> str:
+        """
+        Apply a command to the stored drone in its command lane, then publish the tracked
+        command and its resulting status, optionally waiting for the drone ack outside the lane.
+        """
+        async with self.command_lanes.lane(drone_id):
+            pending = self.command_tracker.register(drone_id, command)
+            try:
+                drone = await self._mutate(drone_id, change, reported)
+                drone_data = drone.to_dict()
+                await self.publish_command(pending, drone_data)
+                await self.publish_status(drone_data)
+            except Exception:
+                self.command_tracker.discard(pending)
+                raise
+
+        if not wait:
+            return f"{label} command sent to Drone {drone_id}"
+        await self.command_tracker.wait(pending, timeout)
+        latency_ms = self.command_tracker.latency(pending) * 1000
+        return f"{label} command acknowledged by Drone {drone_id} in {latency_ms:.1f} ms"
     
 
     async def execute_update_dock(self, drone_id: str, dock_id: str):
-        drone = await self.drone_repository.find_by_id(drone_id)
-        if not drone:
-            raise ValueError(f"Drone with id {drone_id} not found")
         if not dock_id:
             raise ValueError("Dock ID cannot be empty")
-        if drone.dock_id == dock_id:
-            raise ValueError(f"Drone {drone_id} is already assigned to dock {dock_id}")
-        if drone.status != DroneStatus.DOCKED:
-            raise ValueError(f"Drone {drone_id} is not docked and cannot be assigned to a new dock")
-        
-        # Update the dock ID
-        drone.dock_id = dock_id
-        await self.drone_repository.save(drone)
+
+        def update_dock(drone: Drone):
+            if drone.dock_id == dock_id:
+                raise ValueError(f"Drone {drone_id} is already assigned to dock {dock_id}")
+            if drone.status != DroneStatus.DOCKED:
+                raise ValueError(f"Drone {drone_id} is not docked and cannot be assigned to a new dock")
+            drone.dock_id = dock_id
+
+        async with self.command_lanes.lane(drone_id):
+            await self._mutate(drone_id, update_dock)
         return f"update_dock command sent to Drone {drone_id}"
     
 
     async def execute_register(self, drone_id: str, dock_id: str):
         drone = Drone(drone_id=drone_id, dock_id=dock_id)
-        await self.drone_repository.save(drone)
+        if not await self.drone_repository.compare_and_set(drone.to_dict(), None):
+            raise ValueError(f"Drone {drone_id} is already registered")
         return f"Drone {drone_id} registered with dock {dock_id}"
 
 
     async def execute_unregister(self, drone_id: str):
-        drone = await self.drone_repository.get(drone_id)
-        if not drone:
-            raise ValueError(f"Drone with id {drone_id} not found")
-        
-        await self.drone_repository.delete(drone_id)
+        async with self.command_lanes.lane(drone_id):
+            await self.drone_repository.find_by_id(drone_id)
+            await self.drone_repository.delete_drone_by_id(drone_id)
+        if self.drone_cache is not None:
+            self.drone_cache.invalidate(drone_id)
+        if self.spatial_index is not None:
+            self.spatial_index.remove(drone_id)
+        if self.fleet_stats is not None:
+            self.fleet_stats.remove(drone_id)
+        if self.liveness_monitor is not None:
+            self.liveness_monitor.forget(drone_id)
         return f"Drone {drone_id} unregistered"
     
+    async def publish_command(self, pending: PendingCommand, drone_data: Dict):
+        """
+        Publish a command wrapped in a DroneTopic envelope carrying its tid.
+        """
+        envelope = DroneTopic(
+            tid=pending.tid,
+            timestamp=datetime.now(),
+            data={"drone_id": pending.drone_id, "command": pending.command, "dock_id": drone_data.get("dock_id")},
+        )
+        self.command_tracker.mark_sent(pending)
+        await self.publisher.publish(self.subscriber.command_topic, self.subscriber.codec.encode(envelope.model_dump()), kind="command")
+
     async def publish_status(self, drone_data):
         """
         Publish the current status of the drone to the MQTT status topic.
@@ -111,8 +381,9 @@ class DroneCommandService:
             "dock_id": drone_data['dock_id'],
             #"status": status.value if isinstance(status, DroneStatus) else DroneStatus.UNKNOWN.value,
             "status": status,
-            "last_updated": drone_data.get("last_updated")
+            "last_updated": drone_data.get("last_updated"),
+            "echo": True,
         }
-        self.subscriber.mqtt_client.publish(self.subscriber.status_topic, json.dumps(status_msg), qos=1)
+        await self.publisher.publish(self.subscriber.status_topic_for(status_msg["drone_id"]), self.subscriber.codec.encode(status_msg), kind="status")
         #logging.info(f"Drone {drone_data.get('drone_id')} published status: {status_msg})")
 
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Iterable, Optional
+
+from domain.drone import Drone, DroneStatus
+from infrastructure.drone_cache import DroneStateCache
+from infrastructure.fleet_stats import FleetStats
+from infrastructure.liveness import LivenessMonitor
+from infrastructure.repository.base import DroneRepositoryProtocol
+from infrastructure.snapshot import SnapshotError, SnapshotReader
+from infrastructure.spatial_index import SpatialIndex
+
+
+class FleetWarmup:
+    """
+    Loads the fleet state into the state cache and the spatial index at startup.
+
+    A local snapshot younger than snapshot_max_age is loaded first and makes the
+    service ready within seconds. The fleet is then streamed from the repository
+    in batches to catch up with changes made since the snapshot; the service is
+    ready once that finishes when there is no usable snapshot. A failed stream is
+    restarted with jittered exponential backoff until it succeeds or the warm-up
+    is cancelled. State received from telemetry in the meantime is newer and is kept.
+
+    Loaded drones that are not already lost are tracked by the liveness monitor,
+    so drones that stay silent after a restart are detected too, and every drone
+    is counted in the fleet statistics.
+    """
+    def __init__(self, repository: DroneRepositoryProtocol, drone_cache: DroneStateCache = None,
+                 spatial_index: SpatialIndex = None, snapshot_path: Optional[str] = None,
+                 snapshot_max_age: float = 3600.0, batch_size: int = 1000, liveness_monitor: LivenessMonitor = None,
+                 fleet_stats: FleetStats = None, retry_base: float = 1.0, retry_max: float = 60.0):
+        self.repository = repository
+        self.drone_cache = drone_cache
+        self.spatial_index = spatial_index
+        self.snapshot_path = snapshot_path
+        self.snapshot_max_age = snapshot_max_age
+        self.batch_size = batch_size
+        self.liveness_monitor = liveness_monitor
+        self.fleet_stats = fleet_stats
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.ready = False
+
+        # metrics
+        self.source = None
+        self.loaded = 0
+        self.duration = 0.0
+        self.failures = 0
+
+    def _apply(self, drones: Iterable[Drone]):
+        cache = self.drone_cache
+        index = self.spatial_index
+        monitor = self.liveness_monitor
+        stats = self.fleet_stats
+        for drone in drones:
+            stored = cache.put_if_newer(drone) if cache is not None else True
+            if index is not None and (stored or index.position(drone.drone_id) is None):
+                index.update(drone)
+            if stats is not None and (stored or drone.drone_id not in stats):
+                stats.update(drone)
+            if monitor is not None and drone.status != DroneStatus.LOST:
+                monitor.track(drone.drone_id)
+            self.loaded += 1
+
+    def _mark_ready(self, source: str, started: float):
+        if self.spatial_index is not None:
+            self.spatial_index.ready = True
+        if self.fleet_stats is not None:
+            self.fleet_stats.ready = True
+        self.ready = True
+        self.source = source
+        self.duration = time.perf_counter() - started
+        logging.info("Fleet state warm from %s: %d drones in %.2fs", source, self.loaded, self.duration)
+
+    async def _load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with SnapshotReader(self.snapshot_path) as reader:
+                if reader.age > self.snapshot_max_age:
+                    logging.info("Ignoring fleet snapshot %s, %.0fs old", self.snapshot_path, reader.age)
+                    return False
+                for batch in reader.batches(self.batch_size):
+                    self._apply(batch)
+                    await asyncio.sleep(0)
+        except (OSError, SnapshotError) as e:
+            logging.warning("Cannot load fleet snapshot %s: %s", self.snapshot_path, e)
+            return False
+        return True
+
+    async def run(self):
+        """
+        Load the fleet state. Safe to run in the background while the service handles traffic.
+        """
+        started = time.perf_counter()
+        if await self._load_snapshot():
+            self._mark_ready("snapshot", started)
+        while True:
+            try:
+                async for batch in self.repository.iter_all(self.batch_size):
+                    self._apply(batch)
+                break
+            except Exception as e:
+                self.failures += 1
+                delay = min(self.retry_max, self.retry_base * 2 ** (self.failures - 1)) * random.uniform(0.5, 1.0)
+                logging.error("Failed to load the fleet state from the repository (attempt %d), retrying in %.1fs: %s",
+                              self.failures, delay, e)
+                await asyncio.sleep(delay)
+        if not self.ready:
+            self._mark_ready("repository", started)
+
+    def metrics(self) -> dict:
+        return {
+            "ready": self.ready,
+            "source": self.source,
+            "loaded": self.loaded,
+            "duration": self.duration,
+            "failures": self.failures,
+        }
@@ -0,0 +1,80 @@
+"""
+Measure per-object memory and from_dict/to_dict time of the Drone model.
+
+The previous representation (a plain object carrying the MQTT client and status
+topic, parsing timestamps with strptime) is reproduced below as a baseline.
+
+    python -m benchmarks.bench_drone_model --count 100000
+"""
+import argparse
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from domain.drone import Drone, DroneStatus
+
+SAMPLE = {
+    "drone_id": "drone-000001",
+    "dock_id": "dock-1",
+    "status": "flying",
+    "last_updated": "2025-04-05T13:28:28",
+}
+
+
+class LegacyDrone:
+    def __init__(self, drone_id, mqtt_client, status_topic, dock_id=None, status=DroneStatus.UNKNOWN):
+        self.drone_id = drone_id
+        self.dock_id = dock_id
+        self.status = status
+        self.last_updated = datetime.now()
+        self.mqtt_client = mqtt_client
+        self.status_topic = status_topic
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        status = DroneStatus(data.get("status", DroneStatus.UNKNOWN.value).lower())
+        datetime.strptime(data["last_updated"], "%Y-%m-%dT%H:%M:%S")
+        return cls(data.get("drone_id"), data.get("mqtt_client"), data.get("status_topic", "drone/status"),
+                   dock_id=data.get("dock_id"), status=status)
+
+    def to_dict(self):
+        return {
+            "drone_id": self.drone_id,
+            "dock_id": self.dock_id,
+            "status": self.status.value if isinstance(self.status, DroneStatus) else self.status,
+            "last_updated": self.last_updated.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+
+def bytes_per_object(model, count: int) -> float:
+    documents = [dict(SAMPLE, drone_id=f"drone-{i:06d}") for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    drones = [model.from_dict(document) for document in documents]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del drones
+    return (after - before) / count
+
+
+def microseconds_per_call(statement, number: int) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main(count: int, number: int):
+    print(f"{'model':<12} {'bytes/obj':>10} {'from_dict us':>13} {'to_dict us':>11}")
+    for name, model in (("legacy", LegacyDrone), ("slots", Drone)):
+        drone = model.from_dict(SAMPLE)
+        print(f"{name:<12} {bytes_per_object(model, count):>10.1f} "
+              f"{microseconds_per_call(lambda: model.from_dict(SAMPLE), number):>13.3f} "
+              f"{microseconds_per_call(drone.to_dict, number):>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--number", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.count, args.number)
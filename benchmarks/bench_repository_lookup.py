@@ -0,0 +1,67 @@
+"""
+Measure DroneRepository.find_by_id latency against collection size, with and without indexes.
+
+Requires a running MongoDB. Uses a scratch collection that is dropped afterwards.
+
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_repository_lookup
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from infrastructure.repository.drone_repository import DroneRepository
+
+BENCH_COLLECTION = "drones_bench"
+
+
+def make_document(i: int) -> dict:
+    return {
+        "drone_id": f"drone-{i:06d}",
+        "dock_id": f"dock-{i % 100}",
+        "status": random.choice(["idle", "docked", "flying", "returning"]),
+        "last_updated": "2025-04-05T13:28:28",
+    }
+
+
+async def measure_lookups(repository: DroneRepository, size: int, lookups: int) -> dict:
+    latencies = []
+    for _ in range(lookups):
+        drone_id = f"drone-{random.randrange(size):06d}"
+        started = time.perf_counter()
+        await repository.find_by_id(drone_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def main(sizes, lookups: int):
+    repository = DroneRepository(os.getenv("MONGODB_URI", "mongodb://localhost:27017"), collection_name=BENCH_COLLECTION)
+    print(f"{'documents':>10} {'scan p50':>10} {'scan p99':>10} {'index p50':>10} {'index p99':>10}")
+    try:
+        for size in sizes:
+            await repository.collection.drop()
+            for start in range(0, size, 5000):
+                await repository.collection.insert_many([make_document(i) for i in range(start, min(start + 5000, size))])
+
+            scan = await measure_lookups(repository, size, lookups)
+            await repository.ensure_indexes()
+            indexed = await measure_lookups(repository, size, lookups)
+
+            print(f"{size:>10} {scan['p50_ms']:>10.3f} {scan['p99_ms']:>10.3f} "
+                  f"{indexed['p50_ms']:>10.3f} {indexed['p99_ms']:>10.3f}")
+    finally:
+        await repository.collection.drop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.lookups))
@@ -0,0 +1,56 @@
+"""
+Offline stand-in for the MQTT broker used by the benchmark harness.
+"""
+import asyncio
+from typing import Optional
+
+from infrastructure.codec import get_codec
+
+
+class FakeMQTTClient:
+    """
+    Loopback broker stand-in with the parts of the gmqtt Client API the server uses.
+
+    Published messages are delivered to on_message when the topic is subscribed.
+    With ack_topic set, a simulated drone acknowledges every command envelope it sees.
+    """
+    def __init__(self, command_topic: str = "drone/command", ack_topic: Optional[str] = None, codec=None):
+        self.command_topic = command_topic
+        self.ack_topic = ack_topic
+        self.subscriptions = set()
+        self.published = 0
+        self.is_connected = True
+        self.on_connect = None
+        self.on_message = None
+        self._tasks = set()
+        self._codec = codec if codec is not None else get_codec()
+
+    async def connect(self, host: str = None, port: int = None):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    def subscribe(self, topic: str, qos: int = 0):
+        self.subscriptions.add(topic.split("/", 2)[2] if topic.startswith("$share/") else topic)
+
+    def publish(self, topic: str, payload, qos: int = 0):
+        self.published += 1
+        if self.on_message is not None and topic in self.subscriptions:
+            self._deliver(topic, payload, qos)
+        if self.ack_topic is not None and topic == self.command_topic:
+            self._ack(payload)
+
+    def _ack(self, payload):
+        tid = self._codec.decode(payload).get("tid")
+        if tid is not None:
+            self._deliver(self.ack_topic, self._codec.encode({"tid": tid}), 1)
+
+    def _deliver(self, topic: str, payload, qos: int):
+        task = asyncio.get_running_loop().create_task(self.on_message(self, topic, payload, qos, None))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
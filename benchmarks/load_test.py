@@ -0,0 +1,219 @@
+"""
+Offline load test of the API and the MQTT ingest path.
+
+Drives the FastAPI app through httpx's ASGI transport and MQTTHandler.on_message
+directly, with an in-memory repository and a loopback MQTT broker, for synthetic
+fleets. Reports throughput, p50/p99 latency and transient allocations per
+operation, and writes the results as JSON.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.load_test --fleet-sizes 1000 10000 100000 --output results.json
+    python -m benchmarks.load_test --compare results.json   # fail on regressions
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import httpx
+
+from benchmarks.fakes import FakeMQTTClient
+from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+
+STATUSES = ["idle", "docked", "flying", "returning"]
+# A command the drone accepts in each status, so transitions stay valid as the scenario repeats
+NEXT_COMMAND = {"idle": "takeoff", "docked": "takeoff", "flying": "return-home", "returning": "land"}
+
+
+def make_document(i: int) -> dict:
+    return {
+        "drone_id": f"drone-{i:06d}",
+        "dock_id": f"dock-{i % 100}",
+        "status": STATUSES[i % len(STATUSES)],
+        "last_updated": "2025-04-05T13:28:28",
+    }
+
+
+async def wire_app(fleet_size: int):
+    """
+    Point the application objects built in main.py at the offline stand-ins.
+    """
+    os.environ.setdefault("REPOSITORY_BACKEND", "memory")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import main
+
+    repository = InMemoryDroneRepository()
+    await repository.save_many([make_document(i) for i in range(fleet_size)])
+
+    client = FakeMQTTClient(main.COMMAND_TOPIC, ack_topic=main.ACK_TOPIC, codec=main.mqtt_handler.codec)
+    client.on_message = main.mqtt_handler.on_message
+    main.mqtt_handler.mqtt_client = client
+    main.mqtt_publisher.mqtt_client = client
+    main.mqtt_handler.repository = repository
+    main.status_writer.repository = repository
+    main.drone_command_service.drone_repository = repository
+    main.drone_command_service.drone_loader.repository = repository
+    main.mqtt_handler.subscribe_to_topics()
+    main.drone_cache.clear()
+    return main, client
+
+
+def summarize(scenario: str, fleet_size: int, latencies, elapsed: float, alloc_bytes: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "scenario": scenario,
+        "fleet_size": fleet_size,
+        "ops": count,
+        "throughput_ops": count / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[count // 2] * 1000,
+        "p99_ms": latencies[min(count - 1, int(count * 0.99))] * 1000,
+        "alloc_bytes_per_op": alloc_bytes,
+    }
+
+
+async def run_scenario(scenario: str, fleet_size: int, operation, ops: int, concurrency: int, alloc_samples: int) -> dict:
+    """
+    Run `operation(i)` ops times over `concurrency` workers, then sample its allocations.
+    """
+    latencies = []
+
+    async def worker(offset: int):
+        for i in range(offset, ops, concurrency):
+            started = time.perf_counter()
+            await operation(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    # Transient memory allocated per operation, measured sequentially on a sample
+    peaks = []
+    tracemalloc.start()
+    for i in range(alloc_samples):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await operation(ops + i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return summarize(scenario, fleet_size, latencies, elapsed, sum(peaks) / len(peaks) if peaks else 0.0)
+
+
+async def run_fleet(fleet_size: int, ops: int, concurrency: int, alloc_samples: int) -> list:
+    main, client = await wire_app(fleet_size)
+    handler = main.mqtt_handler
+    main.status_writer.start()
+    main.mqtt_publisher.start()
+    rng = random.Random(fleet_size)
+    drone_ids = [f"drone-{i:06d}" for i in range(fleet_size)]
+    results = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as http:
+        async def status_read(i: int):
+            response = await http.get(f"/drones/{rng.choice(drone_ids)}/status")
+            assert response.status_code == 200, response.text
+
+        async def fleet_status_read(i: int):
+            ids = ",".join(rng.sample(drone_ids, min(100, fleet_size)))
+            response = await http.get(f"/drones/status?ids={ids}")
+            assert response.status_code == 200, response.text
+
+        async def command(i: int):
+            # Concurrent workers always target different drones, and each waits for the simulated ack
+            drone_id = drone_ids[i % fleet_size]
+            next_command = NEXT_COMMAND[main.drone_command_service.drone_repository.documents[drone_id]["status"]]
+            response = await http.post(f"/drones/{drone_id}/{next_command}?wait=true&timeout=5")
+            assert response.status_code == 200, response.text
+
+        payloads = [
+            handler.codec.encode(dict(make_document(i % fleet_size), status=STATUSES[(i // fleet_size + i) % len(STATUSES)]))
+            for i in range(min(ops, 50000))
+        ]
+
+        async def telemetry_ingest(i: int):
+            await handler.on_message(client, handler.status_topic, payloads[i % len(payloads)], 1, None)
+
+        for scenario, operation in (
+            ("status_read", status_read),
+            ("fleet_status_read_100", fleet_status_read),
+            ("command_issue", command),
+            ("telemetry_ingest", telemetry_ingest),
+        ):
+            result = await run_scenario(scenario, fleet_size, operation, ops, concurrency, alloc_samples)
+            await client.drain()
+            results.append(result)
+            print(f"{scenario:<24} {fleet_size:>7} {result['throughput_ops']:>12.0f} "
+                  f"{result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} {result['alloc_bytes_per_op']:>10.0f}")
+
+    await main.mqtt_publisher.stop()
+    await main.status_writer.stop()
+    return results
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    Return the scenarios whose throughput dropped or p99 grew by more than `tolerance`.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["fleet_size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["scenario"], result["fleet_size"]))
+        if before is None:
+            continue
+        if result["throughput_ops"] < before["throughput_ops"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']} @ {result['fleet_size']}: throughput "
+                               f"{before['throughput_ops']:.0f} -> {result['throughput_ops']:.0f} ops/s")
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']} @ {result['fleet_size']}: p99 "
+                               f"{before['p99_ms']:.3f} -> {result['p99_ms']:.3f} ms")
+    return regressions
+
+
+async def main(args):
+    print(f"{'scenario':<24} {'fleet':>7} {'ops/s':>12} {'p50 ms':>9} {'p99 ms':>9} {'alloc B/op':>10}")
+    results = []
+    for fleet_size in args.fleet_sizes:
+        results.extend(await run_fleet(fleet_size, args.ops, args.concurrency, args.alloc_samples))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ops": args.ops,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=5000, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--alloc-samples", type=int, default=200)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(asyncio.run(main(parser.parse_args())))
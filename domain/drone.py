@@ -1,8 +1,7 @@
 from enum import Enum
-from datetime import datetime
-import logging
-import json
-from gmqtt import Client as MQTTClient
+from datetime import datetime, timezone
+from typing import Optional, Union
+from domain.geo import validate_position
 
 
 class DroneStatus(Enum):
@@ -14,118 +13,168 @@ class DroneStatus(Enum):
     DOCKED = "docked"
     FLYING = "flying"
     RETURNING = "returning"
+    LOST = "lost"
+
+
+# Lookup table used by from_dict instead of constructing DroneStatus(value)
+_STATUS_BY_VALUE = {status.value: status for status in DroneStatus}
+
+# Statuses a command may move a drone to, by current status. Telemetry is not
+# validated: a drone's report of its own status always wins.
+TRANSITIONS = {
+    DroneStatus.UNKNOWN: frozenset({DroneStatus.IDLE, DroneStatus.DOCKED, DroneStatus.FLYING, DroneStatus.RETURNING}),
+    DroneStatus.IDLE: frozenset({DroneStatus.DOCKED, DroneStatus.FLYING, DroneStatus.RETURNING}),
+    DroneStatus.DOCKED: frozenset({DroneStatus.IDLE, DroneStatus.FLYING}),
+    DroneStatus.FLYING: frozenset({DroneStatus.DOCKED, DroneStatus.RETURNING}),
+    DroneStatus.RETURNING: frozenset({DroneStatus.DOCKED, DroneStatus.FLYING}),
+    DroneStatus.LOST: frozenset({DroneStatus.DOCKED, DroneStatus.RETURNING}),
+}
+
+
+class InvalidTransitionError(ValueError):
+    """
+    Raised when a command is not allowed in the current status of the drone.
+    """
+    def __init__(self, drone_id: str, current: DroneStatus, target: DroneStatus):
+        super().__init__(f"Drone {drone_id} cannot go from {current.value} to {target.value}")
+        self.drone_id = drone_id
+        self.current = current
+        self.target = target
+
+
+def parse_timestamp(value: Union[str, datetime]) -> datetime:
+    """
+    Parse a "%Y-%m-%dT%H:%M:%S" (ISO 8601) timestamp. Timestamps with an offset
+    are converted to naive UTC, so they compare with the naive ones.
+    """
+    if not isinstance(value, datetime):
+        # fromisoformat only accepts the "Z" suffix from Python 3.11 on
+        if value.endswith(("Z", "z")):
+            value = value[:-1] + "+00:00"
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def format_timestamp(value: datetime) -> str:
+    """
+    Format a timestamp as "%Y-%m-%dT%H:%M:%S".
+    """
+    return value.isoformat(timespec="seconds")
+
+
+def parse_status(value: Union[str, DroneStatus]) -> DroneStatus:
+    """
+    Convert a status value to DroneStatus.
+    """
+    if isinstance(value, DroneStatus):
+        return value
+    status = _STATUS_BY_VALUE.get(value)
+    if status is None:
+        status = _STATUS_BY_VALUE.get(value.lower()) if isinstance(value, str) else None
+        if status is None:
+            raise ValueError(f"Invalid status: {value}")
+    return status
 
 
 class Drone:
     """
     Class to represent a drone.
     """
-    def __init__(self, drone_id: str, mqtt_client: MQTTClient, status_topic: str, dock_id=None, status: DroneStatus = DroneStatus.UNKNOWN):
+    __slots__ = ("drone_id", "dock_id", "status", "last_updated", "latitude", "longitude", "altitude", "version")
+
+    def __init__(self, drone_id: str, dock_id=None, status: DroneStatus = DroneStatus.UNKNOWN,
+                 last_updated: Optional[datetime] = None, latitude: Optional[float] = None,
+                 longitude: Optional[float] = None, altitude: Optional[float] = None, version: Optional[int] = None):
         """
-        Initialize a drone with an ID, dock ID, and status.
+        Initialize a drone with an ID, dock ID, status and optional position.
+        `version` is the stored document version, when the drone was read from a repository.
         """
         self.drone_id = drone_id
         self.dock_id = dock_id
         self.status = status
-        self.last_updated = datetime.now()
-        self.mqtt_client = mqtt_client
-        self.status_topic = status_topic
-
-        #logging.info(f"Drone {self.drone_id} initialized with status {self.status.name}")
-
-    def _publish_status(self):
-        """
-        Publish the current status of the drone to the MQTT status topic.
-        """
-        status_msg = {
-            "drone_id": self.drone_id,
-            "dock_id": self.dock_id,
-            "status": self.status.value,
-            "last_updated": self.last_updated.strftime("%Y-%m-%dT%H:%M:%S")
-        }
-        self.mqtt_client.publish(self.status_topic, json.dumps(status_msg), qos=1)
-        logging.info(f"Drone {self.drone_id} published status: {status_msg}")
+        self.last_updated = last_updated if last_updated is not None else datetime.now()
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.version = version
+
+    def __copy__(self):
+        return Drone(self.drone_id, self.dock_id, self.status, self.last_updated,
+                     self.latitude, self.longitude, self.altitude, self.version)
+
+    @property
+    def has_position(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+    def _transition(self, status: DroneStatus):
+        if status not in TRANSITIONS[self.status]:
+            raise InvalidTransitionError(self.drone_id, self.status, status)
+        self.status = status
 
     def takeoff(self):
         """
-        Set the drone status to flying and publish the status.
+        Set the drone status to flying.
         """
-        #self.status = DroneStatus.FLYING
-        self.status = "flying"
+        self._transition(DroneStatus.FLYING)
         self.last_updated = datetime.now()
-        #logging.info(f"Drone {self.drone_id} took off from dock {self.dock_id}")
-        #self._publish_status()
-        
+        return self.to_dict()
 
     def return_home(self):
         """
-        Set the drone status to returning and publish the status.
+        Set the drone status to returning.
         """
-        self.status = DroneStatus.RETURNING
+        self._transition(DroneStatus.RETURNING)
         self.last_updated = datetime.now()
-        #logging.info(f"Drone {self.drone_id} is returning to dock {self.dock_id}")
-        #self._publish_status()
         return self.to_dict()
 
     def land(self, dock_id=None):
         """
-        Set the drone status to docked and publish the status.
+        Set the drone status to docked.
         """
-        self.status = DroneStatus.DOCKED
+        self._transition(DroneStatus.DOCKED)
         self.last_updated = datetime.now()
         self.dock_id = dock_id
-        #logging.info(f"Drone {self.drone_id} landed at dock {dock_id}")
-        #self._publish_status()
         return self.to_dict()
 
-
-
     @classmethod
     def from_dict(cls, data: dict):
         """
         Create a Drone instance from a dictionary.
         """
-        drone_id = data.get("drone_id")
-        dock_id = data.get("dock_id")
-
-        # Convert status to DroneStatus or set to UNKNOWN
-        status_str = data.get("status", DroneStatus.UNKNOWN.value)
-        try:
-            status = DroneStatus(status_str.lower())  # Convert string to DroneStatus
-        except ValueError:
-            raise ValueError(f"Invalid status: {status_str}")
-
-        last_updated = datetime.strptime(data["last_updated"], "%Y-%m-%dT%H:%M:%S")
-        
-        mqtt_client = data.get("mqtt_client")
-        status_topic = data.get("status_topic", "drone/status")
-
+        last_updated = data.get("last_updated")
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        altitude = data.get("altitude")
+        if latitude is not None or longitude is not None:
+            validate_position(latitude, longitude, altitude)
         return cls(
-            drone_id=drone_id,
-            mqtt_client=mqtt_client,
-            status_topic=status_topic,
-            dock_id=dock_id,
-            status=status
+            data.get("drone_id"),
+            data.get("dock_id"),
+            parse_status(data.get("status", "unknown")),
+            parse_timestamp(last_updated) if last_updated is not None else None,
+            latitude,
+            longitude,
+            altitude,
+            data.get("version"),
         )
-    
-    # def to_dict(self):
-    #     """
-    #     Convert the Drone instance to a dictionary.
-    #     """
-    #     return {
-    #         "drone_id": self.drone_id,
-    #         "dock_id": self.dock_id,
-    #         "status": self.status,
-    #         "last_updated": self.last_updated.strftime("%Y-%m-%dT%H:%M:%S"),
-    #     }
 
     def to_dict(self):
         """
-        Convert the Drone instance to a dictionary.
+        Convert the Drone instance to a dictionary. The position is only included when known,
+        so a status update without one does not overwrite the stored position. The version
+        is maintained by the repositories and is not included.
         """
-        return {
+        data = {
             "drone_id": self.drone_id,
             "dock_id": self.dock_id,
-            "status": self.status.value if isinstance(self.status, DroneStatus) else self.status,
-            "last_updated": self.last_updated.strftime("%Y-%m-%dT%H:%M:%S"),
-        }
\ No newline at end of file
+            "status": self.status.value,
+            "last_updated": format_timestamp(self.last_updated),
+        }
+        if self.latitude is not None:
+            data["latitude"] = self.latitude
+            data["longitude"] = self.longitude
+            if self.altitude is not None:
+                data["altitude"] = self.altitude
+        return data
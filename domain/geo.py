@@ -0,0 +1,72 @@
+import math
+from typing import Optional, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+
+# (latitude, longitude) in decimal degrees
+LatLon = Tuple[float, float]
+
+
+def validate_position(latitude: float, longitude: float, altitude: Optional[float] = None):
+    """
+    Raise ValueError unless the coordinates are finite and within range.
+    """
+    if not (isinstance(latitude, (int, float)) and -90.0 <= latitude <= 90.0):
+        raise ValueError(f"Invalid latitude: {latitude}")
+    if not (isinstance(longitude, (int, float)) and -180.0 <= longitude <= 180.0):
+        raise ValueError(f"Invalid longitude: {longitude}")
+    if altitude is not None and not (isinstance(altitude, (int, float)) and math.isfinite(altitude)):
+        raise ValueError(f"Invalid altitude: {altitude}")
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points in meters.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bounds(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, min_lon, max_lat, max_lon) of a box containing the circle.
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    min_lat = max(-90.0, latitude - dlat)
+    max_lat = min(90.0, latitude + dlat)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-9 or dlat / cos_lat >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlon = dlat / cos_lat
+    return min_lat, max(-180.0, longitude - dlon), max_lat, min(180.0, longitude + dlon)
+
+
+def polygon_bounds(polygon: Sequence[LatLon]) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, min_lon, max_lat, max_lon) of a polygon.
+    """
+    lats = [point[0] for point in polygon]
+    lons = [point[1] for point in polygon]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+def point_in_polygon(latitude: float, longitude: float, polygon: Sequence[LatLon]) -> bool:
+    """
+    Ray-casting test of a point against a simple polygon given as (lat, lon) vertices.
+    Edges are treated as straight lines in degrees, which is accurate for geofences
+    that do not cross the antimeridian.
+    """
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lat_i > latitude) != (lat_j > latitude):
+            crossing = lon_i + (latitude - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if longitude < crossing:
+                inside = not inside
+        j = i
+    return inside
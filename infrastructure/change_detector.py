@@ -0,0 +1,37 @@
+import time
+from typing import Dict, Optional, Tuple
+
+
+class ChangeDetector:
+    """
+    Per-drone change detection for status telemetry.
+
+    A status message is processed when its status, dock or position differs from
+    the last processed one for that drone, or when heartbeat_interval seconds have passed
+    since then. Identical messages in between are dropped, so steady drones are
+    written at most once per heartbeat while transitions stay immediate.
+    """
+    def __init__(self, heartbeat_interval: float = 30.0):
+        self.heartbeat_interval = heartbeat_interval
+        self._last: Dict[str, Tuple[str, Optional[str], Optional[tuple], float]] = {}
+
+        # metrics
+        self.passed = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def should_process(self, drone_id: str, status: str, dock_id: Optional[str], position: Optional[tuple] = None) -> bool:
+        now = time.monotonic()
+        last = self._last.get(drone_id)
+        if (last is not None and last[0] == status and last[1] == dock_id and last[2] == position and
+                now - last[3] < self.heartbeat_interval):
+            self.dropped += 1
+            return False
+        self._last[drone_id] = (status, dock_id, position, now)
+        self.passed += 1
+        return True
+
+    def forget(self, drone_id: str):
+        self._last.pop(drone_id, None)
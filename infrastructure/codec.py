@@ -0,0 +1,98 @@
+import json
+import uuid
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+def _default(obj: Any):
+    """
+    Serialize the non-JSON types used in drone payloads.
+    """
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, datetime):
+        return obj.isoformat(timespec="seconds")
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class JsonCodec:
+    """
+    Stdlib JSON codec, always available.
+    """
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+    def decode(self, payload) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec:
+    """
+    JSON codec backed by orjson. Produces the same wire format as JsonCodec:
+    datetimes are passed through to _default instead of being serialized by
+    orjson, which would include microseconds.
+    """
+    name = "orjson"
+    content_type = "application/json"
+
+    def encode(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def decode(self, payload) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec:
+    """
+    Compact binary codec backed by msgpack.
+    JSON payloads are still accepted on decode so drones can be migrated gradually.
+    """
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        self._json = OrjsonCodec() if orjson is not None else JsonCodec()
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+    def decode(self, payload) -> Any:
+        if isinstance(payload, str) or payload[:1] in (b"{", b"["):
+            return self._json.decode(payload)
+        return msgpack.unpackb(payload, raw=False)
+
+
+def get_codec(name: Optional[str] = None):
+    """
+    Return the codec for `name` ("json", "orjson", "msgpack").
+    Without a name, orjson is used when installed and stdlib JSON otherwise.
+    """
+    if not name or name == "auto":
+        return OrjsonCodec() if orjson is not None else JsonCodec()
+    if name == "json":
+        return JsonCodec()
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("The orjson codec requires the 'orjson' package")
+        return OrjsonCodec()
+    if name == "msgpack":
+        if msgpack is None:
+            raise ValueError("The msgpack codec requires the 'msgpack' package")
+        return MsgpackCodec()
+    raise ValueError(f"Unknown codec: {name}")
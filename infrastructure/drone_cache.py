@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from domain.drone import Drone
+
+
+class DroneStateCache:
+    """
+    Bounded in-process cache of the latest known drone state, keyed by drone_id.
+
+    Entries are evicted least-recently-used once max_size is reached, and are
+    treated as missing once they are older than ttl seconds (the staleness bound).
+    """
+    def __init__(self, max_size: int = 100000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, drone_id: str) -> bool:
+        return self.get(drone_id) is not None
+
+    def get(self, drone_id: str) -> Optional[Drone]:
+        """
+        Return the cached drone, or None when it is missing or stale.
+        """
+        entry = self._entries.get(drone_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        drone, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[drone_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(drone_id)
+        self.hits += 1
+        return drone
+
+    def put(self, drone: Drone):
+        """
+        Store the latest state of a drone.
+        """
+        entries = self._entries
+        entries[drone.drone_id] = (drone, time.monotonic())
+        entries.move_to_end(drone.drone_id)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def put_if_newer(self, drone: Drone) -> bool:
+        """
+        Store a drone unless the cache holds a fresh state with a later last_updated.
+        Used to warm the cache without overwriting newer telemetry.
+        """
+        entry = self._entries.get(drone.drone_id)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl and entry[0].last_updated > drone.last_updated:
+            return False
+        self.put(drone)
+        return True
+
+    def invalidate(self, drone_id: str):
+        """
+        Drop a drone from the cache.
+        """
+        self._entries.pop(drone_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> dict:
+        """
+        Return a snapshot of the cache metrics.
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from domain.drone import Drone, DroneStatus
+from infrastructure.metrics import Counter
+from infrastructure.repository.base import DroneRepositoryProtocol
+
+FLEET_STATS_CORRECTIONS = Counter(
+    "drone_api_fleet_stats_corrections",
+    "Fleet summary counts corrected by reconciliation with the repository.",
+)
+
+# (status, dock_id)
+StatsKey = Tuple[str, Optional[str]]
+
+
+class FleetStats:
+    """
+    Drone counts per status and per dock, maintained incrementally from telemetry.
+
+    The status listener remembers the last (status, dock_id) of every drone, so a
+    report moves the drone between counters in O(1) and reading the summary never
+    touches the fleet or the database. The counts can drift from the repository:
+    drones registered or deleted without a status message, messages handled by
+    other ingestion workers, or the write-behind delay. Every reconcile_interval
+    seconds the fleet is streamed from the repository and the remembered state and
+    the counts are rebuilt from it, except for the drones updated or removed while
+    the stream ran, whose newer state is kept. Updates are tracked from settle
+    seconds before the stream, so updates the write-behind stage has not written
+    yet are kept too; settle should cover its flush interval.
+    """
+    def __init__(self, repository: DroneRepositoryProtocol, reconcile_interval: float = 60.0, batch_size: int = 1000,
+                 settle: float = 1.0):
+        self.repository = repository
+        self.reconcile_interval = reconcile_interval
+        self.batch_size = batch_size
+        self.settle = settle
+        self.ready = False
+        self._state: Dict[str, StatsKey] = {}
+        # Drones updated or removed during a reconciliation and its settle time
+        self._touched: Optional[Set[str]] = None
+        self._counts: Dict[StatsKey, int] = {}
+        self._by_status: Dict[str, int] = {}
+        self._by_dock: Dict[str, Dict[str, int]] = {}
+        self._total = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+        # metrics
+        self.reconciliations = 0
+        self.corrections = 0
+        self.reconciled_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __contains__(self, drone_id: str) -> bool:
+        return drone_id in self._state
+
+    def _add(self, key: StatsKey, delta: int):
+        status, dock_id = key
+        count = self._counts.get(key, 0) + delta
+        if count:
+            self._counts[key] = count
+        else:
+            del self._counts[key]
+        self._by_status[status] = self._by_status.get(status, 0) + delta
+        if dock_id is not None:
+            dock = self._by_dock.setdefault(dock_id, {})
+            count = dock.get(status, 0) + delta
+            if count:
+                dock[status] = count
+            else:
+                del dock[status]
+                if not dock:
+                    del self._by_dock[dock_id]
+        self._total += delta
+
+    def update(self, drone: Drone):
+        """
+        Status listener: move the drone to the counters of its reported status and dock.
+        """
+        key = (drone.status.value, drone.dock_id)
+        if self._touched is not None:
+            self._touched.add(drone.drone_id)
+        previous = self._state.get(drone.drone_id)
+        if previous == key:
+            return
+        self._state[drone.drone_id] = key
+        if previous is not None:
+            self._add(previous, -1)
+        self._add(key, 1)
+
+    def load(self, drones: Iterable[Drone]):
+        for drone in drones:
+            self.update(drone)
+
+    def remove(self, drone_id: str):
+        if self._touched is not None:
+            self._touched.add(drone_id)
+        previous = self._state.pop(drone_id, None)
+        if previous is not None:
+            self._add(previous, -1)
+
+    def summary(self) -> dict:
+        """
+        Return the counts. The cost depends on the number of statuses and docks, not on the fleet size.
+        """
+        # Drift can take a count below zero until the next reconciliation
+        by_status = {status.value: 0 for status in DroneStatus}
+        by_status.update((status, count) for status, count in self._by_status.items() if count > 0)
+        by_dock = {}
+        for dock_id, counts in self._by_dock.items():
+            dock = {status: count for status, count in counts.items() if count > 0}
+            if dock:
+                dock["total"] = sum(dock.values())
+                by_dock[dock_id] = dock
+        return {
+            "total": max(self._total, 0),
+            "by_status": by_status,
+            "by_dock": by_dock,
+            "reconciled_at": self.reconciled_at,
+        }
+
+    async def reconcile(self) -> int:
+        """
+        Rebuild the state and the counts from the repository and return how many counts were off.
+        """
+        state: Dict[str, StatsKey] = {}
+        counts: Dict[StatsKey, int] = {}
+        self._touched = set()
+        try:
+            # Wait for the updates received just before to be written
+            await asyncio.sleep(self.settle)
+            async for batch in self.repository.iter_all(self.batch_size):
+                for drone in batch:
+                    key = (drone.status.value, drone.dock_id)
+                    state[drone.drone_id] = key
+                    counts[key] = counts.get(key, 0) + 1
+        finally:
+            touched, self._touched = self._touched, None
+        # Updates received during the stream are at least as new as what it read
+        for drone_id in touched:
+            stale = state.pop(drone_id, None)
+            if stale is not None:
+                counts[stale] -= 1
+            key = self._state.get(drone_id)
+            if key is not None:
+                state[drone_id] = key
+                counts[key] = counts.get(key, 0) + 1
+        counts = {key: count for key, count in counts.items() if count}
+        corrections = sum(abs(counts.get(key, 0) - self._counts.get(key, 0)) for key in counts.keys() | self._counts.keys())
+        self._state = state
+        self._counts = {}
+        self._by_status = {}
+        self._by_dock = {}
+        self._total = 0
+        for key, count in counts.items():
+            self._add(key, count)
+        self.reconciliations += 1
+        self.corrections += corrections
+        self.reconciled_at = time.time()
+        if corrections:
+            FLEET_STATS_CORRECTIONS.inc(corrections)
+            logging.info("Fleet summary reconciled, %d counts corrected", corrections)
+        return corrections
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.reconcile_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logging.error("Failed to reconcile the fleet summary: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "tracked": len(self._state),
+            "reconciliations": self.reconciliations,
+            "corrections": self.corrections,
+            "reconciled_at": self.reconciled_at,
+        }
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import random
+from typing import Dict, List, Optional
+from domain.drone import Drone
+from infrastructure.repository.history_repository import DroneHistoryRepository
+from infrastructure.metrics import Counter
+
+HISTORY_SAMPLES = Counter("drone_api_history_samples", "Telemetry samples recorded to history.")
+HISTORY_DROPPED = Counter("drone_api_history_dropped_samples", "Telemetry samples dropped because the history buffer was full.")
+
+
+class HistoryRecorder:
+    """
+    Buffers status samples and appends them to the history store in batches.
+
+    record() never blocks ingestion: when the buffer holds max_buffer samples,
+    the oldest ones are dropped. A batch whose append fails goes back to the front
+    of the buffer and is retried with jittered exponential backoff.
+    """
+    def __init__(self, repository: DroneHistoryRepository, batch_size: int = 1000,
+                 flush_interval: float = 1.0, max_buffer: int = 100000,
+                 retry_base: float = 0.5, retry_max: float = 30.0):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._buffer: List[Dict] = []
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._failures = 0
+
+    def record(self, drone: Drone):
+        """
+        Status listener: buffer one sample.
+        """
+        buffer = self._buffer
+        if len(buffer) >= self.max_buffer:
+            del buffer[:self.batch_size]
+            HISTORY_DROPPED.inc(self.batch_size)
+        buffer.append({
+            "drone_id": drone.drone_id,
+            "dock_id": drone.dock_id,
+            "status": drone.status.value,
+            "last_updated": drone.last_updated,
+        })
+        if len(buffer) >= self.batch_size:
+            self._full.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def _backoff(self) -> float:
+        return min(self.retry_max, self.retry_base * 2 ** (self._failures - 1)) * random.uniform(0.5, 1.0)
+
+    async def flush(self) -> bool:
+        """
+        Append the buffered samples. Returns False when an append failed and its
+        batch was put back to be retried.
+        """
+        while self._buffer:
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+            try:
+                await self.repository.append_many(batch)
+            except Exception as e:
+                self._failures += 1
+                self._buffer[:0] = batch
+                overflow = len(self._buffer) - self.max_buffer
+                if overflow > 0:
+                    del self._buffer[:overflow]
+                    HISTORY_DROPPED.inc(overflow)
+                logging.error("Failed to append %d history samples (attempt %d), retrying: %s",
+                              len(batch), self._failures, e)
+                return False
+            self._failures = 0
+            HISTORY_SAMPLES.inc(len(batch))
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            if self._failures:
+                # A full buffer must not cut the backoff short
+                await asyncio.sleep(self._backoff())
+            else:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            await self.flush()
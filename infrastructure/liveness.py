@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from domain.drone import Drone
+from infrastructure.metrics import Counter
+
+DRONES_LOST = Counter("drone_api_drones_lost", "Drones that stopped reporting within the liveness timeout.")
+
+
+class LivenessMonitor:
+    """
+    Detects drones that stop reporting, using a timer wheel of heartbeat deadlines.
+
+    The wheel has one slot per tick over the timeout. A heartbeat moves the drone
+    into the slot of its new deadline, which is O(1) whatever the fleet size. Every
+    tick the slot whose deadline has passed is expired as a whole and its drones
+    are reported to the lost listeners, so nothing ever scans the fleet. Expired
+    drones are remembered as silent until they report again.
+
+    When ingestion is sharded, owns tells which drones this worker receives every
+    status message of; the others are not tracked, since their heartbeats go to
+    another worker.
+    """
+    def __init__(self, timeout: float = 90.0, tick: float = 1.0, owns: Optional[Callable[[str], bool]] = None):
+        self.timeout = timeout
+        self.tick = tick
+        self.owns = owns
+        self._ticks = max(1, math.ceil(timeout / tick))
+        self._wheel: List[Set[str]] = [set() for _ in range(self._ticks + 1)]
+        self._slot_of: Dict[str, int] = {}
+        self._silent: Set[str] = set()
+        self._origin = time.monotonic()
+        self._current = 0
+        self._task: Optional[asyncio.Task] = None
+        self.lost_listeners = []
+
+        # metrics
+        self.lost = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, drone_id: str) -> bool:
+        return drone_id in self._slot_of
+
+    def add_lost_listener(self, listener):
+        """
+        Register a coroutine function that receives the ID of every drone that went silent.
+        """
+        self.lost_listeners.append(listener)
+
+    def _now_tick(self) -> int:
+        return int((time.monotonic() - self._origin) / self.tick)
+
+    def heartbeat(self, drone_id: str):
+        """
+        Record that a drone reported, pushing its deadline timeout seconds out.
+        """
+        if self.owns is not None and not self.owns(drone_id):
+            return
+        self._silent.discard(drone_id)
+        slot = (self._current + self._ticks) % len(self._wheel)
+        previous = self._slot_of.get(drone_id)
+        if previous == slot:
+            return
+        if previous is not None:
+            self._wheel[previous].discard(drone_id)
+        self._wheel[slot].add(drone_id)
+        self._slot_of[drone_id] = slot
+
+    def report(self, drone: Drone):
+        """
+        Heartbeat listener: record that a drone reported.
+        """
+        self.heartbeat(drone.drone_id)
+
+    def track(self, drone_id: str):
+        """
+        Start tracking a drone that has not reported yet, without moving an existing
+        deadline or reviving a silent drone.
+        """
+        if drone_id not in self._slot_of and drone_id not in self._silent:
+            self.heartbeat(drone_id)
+
+    def forget(self, drone_id: str):
+        self._silent.discard(drone_id)
+        slot = self._slot_of.pop(drone_id, None)
+        if slot is not None:
+            self._wheel[slot].discard(drone_id)
+
+    def is_silent(self, drone_id: str) -> bool:
+        """
+        Return whether the deadline of a tracked drone passed and it has not reported since.
+        """
+        return drone_id in self._silent
+
+    def advance(self) -> List[str]:
+        """
+        Expire every slot up to the current tick and return the drones whose deadline passed.
+        """
+        expired = []
+        target = self._now_tick()
+        while self._current < target:
+            self._current += 1
+            index = self._current % len(self._wheel)
+            slot = self._wheel[index]
+            if slot:
+                self._wheel[index] = set()
+                for drone_id in slot:
+                    del self._slot_of[drone_id]
+                self._silent |= slot
+                expired.extend(slot)
+        return expired
+
+    async def _notify(self, drone_ids: List[str]):
+        self.lost += len(drone_ids)
+        DRONES_LOST.inc(len(drone_ids))
+        for drone_id in drone_ids:
+            for listener in self.lost_listeners:
+                try:
+                    await listener(drone_id)
+                except Exception as e:
+                    logging.error("Liveness listener failed for drone %s: %s", drone_id, e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            expired = self.advance()
+            if expired:
+                await self._notify(expired)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "tracked": len(self._slot_of),
+            "silent": len(self._silent),
+            "lost": self.lost,
+        }
@@ -0,0 +1,212 @@
+import logging
+import queue
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from infrastructure.codec import get_codec
+from infrastructure.metrics import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    "drone_api_log_records_dropped",
+    "Log records dropped before being written, per reason.",
+    ["reason"],
+)
+_SAMPLED_OUT = LOG_RECORDS_DROPPED.labels("sampled")
+_RATE_LIMITED = LOG_RECORDS_DROPPED.labels("rate_limited")
+_QUEUE_FULL = LOG_RECORDS_DROPPED.labels("queue_full")
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_SCALARS = (str, int, float, bool, type(None))
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including the fields passed with extra=
+    (e.g. drone_id and topic).
+    """
+    def __init__(self):
+        super().__init__()
+        self.codec = get_codec()
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value if isinstance(value, _SCALARS) else repr(value)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return self.codec.encode(entry).decode("utf-8")
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING. Records about a drone (extra drone_id)
+    are sampled per drone, so every record of a sampled drone is kept and its story can
+    be followed; other records are sampled at random. The rate can be set per topic
+    (extra topic).
+    """
+    def __init__(self, rate: float = 1.0, topic_rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rate = rate
+        self.topic_rates = topic_rates or {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        topic = getattr(record, "topic", None)
+        rate = self.topic_rates.get(topic, self.rate) if topic is not None else self.rate
+        if rate >= 1.0:
+            return True
+        drone_id = getattr(record, "drone_id", None)
+        if drone_id is not None:
+            keep = zlib.crc32(str(drone_id).encode()) % 10000 < rate * 10000
+        else:
+            keep = random.random() < rate
+        if not keep:
+            _SAMPLED_OUT.inc()
+        return keep
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits repeated WARNING and ERROR records to burst per interval seconds. Records are
+    grouped by logger, level and message template, so a flood of the same invalid payload
+    is written a few times, and the first record of the next interval reports how many
+    were suppressed.
+    """
+    def __init__(self, burst: int = 10, interval: float = 60.0, max_keys: int = 10000):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_keys = max_keys
+        # key -> [window start, records in window, suppressed in window]
+        self._windows: Dict[tuple, list] = {}
+
+        # metrics
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.levelno, record.msg)
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is None and len(self._windows) >= self.max_keys:
+                self._windows.clear()
+            if window is not None and window[2]:
+                record.msg = f"{record.msg} ({window[2]} similar messages suppressed)"
+            self._windows[key] = [now, 1, 0]
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        self.suppressed += 1
+        _RATE_LIMITED.inc()
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queues records for the listener thread without formatting them, and drops them
+    when the queue is full instead of blocking or reporting an error.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record is passed as is and
+        # formatted in the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            _QUEUE_FULL.inc()
+
+
+class LoggingPipeline:
+    """
+    Root logging through a bounded queue: records are filtered on the calling thread,
+    then formatted and written by a QueueListener thread, so logging on the event loop
+    never waits for I/O.
+    """
+    def __init__(self, level: str = "INFO", json_format: bool = True, sample_rate: float = 1.0,
+                 topic_sample_rates: Optional[Dict[str, float]] = None, error_burst: int = 10,
+                 error_interval: float = 60.0, queue_size: int = 10000, stream=None):
+        self.output = logging.StreamHandler(stream if stream is not None else sys.stdout)
+        self.output.setFormatter(JSONFormatter() if json_format else
+                                 logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        self.handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        self.sampling = SamplingFilter(sample_rate, topic_sample_rates)
+        self.rate_limit = RateLimitFilter(error_burst, error_interval)
+        self.handler.addFilter(self.sampling)
+        self.handler.addFilter(self.rate_limit)
+        self.listener = QueueListener(self.handler.queue, self.output)
+        self.level = level
+        self._started = False
+
+    def start(self):
+        """
+        Route the root logger through the queue.
+        """
+        if self._started:
+            return
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.removeHandler(self.output)
+        root.addHandler(self.handler)
+        self.listener.start()
+        self._started = True
+
+    def stop(self):
+        """
+        Write the queued records, then log synchronously so records emitted during shutdown are kept.
+        """
+        if not self._started:
+            return
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        self.listener.stop()
+        for log_filter in self.handler.filters:
+            self.output.addFilter(log_filter)
+        root.addHandler(self.output)
+        self._started = False
+
+    @staticmethod
+    def set_level(level: str, logger: Optional[str] = None) -> str:
+        """
+        Change the level of a logger (the root logger by default) at runtime and return it.
+        """
+        level = level.upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Unknown log level: {level}")
+        logging.getLogger(logger).setLevel(level)
+        return level
+
+    @staticmethod
+    def get_level(logger: Optional[str] = None) -> str:
+        return logging.getLevelName(logging.getLogger(logger).getEffectiveLevel())
+
+    def metrics(self) -> dict:
+        return {
+            "level": self.get_level(),
+            "queue_depth": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "suppressed": self.rate_limit.suppressed,
+        }
@@ -1,19 +1,88 @@
-import json
 import logging
+import time
 from domain.drone import Drone, DroneStatus
-from infrastructure.repository.drone_repository import DroneRepository
+from infrastructure.repository.base import DroneRepositoryProtocol
+from infrastructure.status_writer import StatusWriter
+from infrastructure.mqtt_publisher import MQTTPublisher
+from infrastructure.codec import get_codec
+from infrastructure.sharding import ShardPlan
+from infrastructure.change_detector import ChangeDetector
+from infrastructure.metrics import Counter, Histogram
+
+MQTT_STAGE_SECONDS = Histogram(
+    "drone_api_mqtt_stage_duration_seconds",
+    "Time spent per MQTT message processing stage.",
+    ["stage"],
+)
+_DECODE_SECONDS = MQTT_STAGE_SECONDS.labels("decode")
+_HANDLE_SECONDS = MQTT_STAGE_SECONDS.labels("handle")
+_SAVE_SECONDS = MQTT_STAGE_SECONDS.labels("save")
+
+INVALID_PAYLOADS = Counter(
+    "drone_api_mqtt_invalid_payloads",
+    "MQTT messages rejected as invalid, per reason.",
+    ["reason"],
+)
+UNKNOWN_COMMANDS = Counter("drone_api_mqtt_unknown_commands", "Command messages with an unknown command.")
+UNCHANGED_STATUS = Counter("drone_api_mqtt_unchanged_status", "Status messages dropped because nothing changed since the last write.")
+RELAYED_ACKS = Counter("drone_api_mqtt_relayed_acks", "Status acks of commands issued by another worker, relayed to the ack topic.")
+PROCESSING_ERRORS = Counter("drone_api_mqtt_processing_errors", "MQTT messages that raised while being processed.")
 
 
 class MQTTHandler:
-    def __init__(self, mqtt_client, command_topic, status_topic, repository: DroneRepository):
+    def __init__(self, mqtt_client, command_topic, status_topic, repository: DroneRepositoryProtocol, status_writer: StatusWriter = None,
+                 codec=None, shard_plan: ShardPlan = None, ack_topic: str = None, change_detector: ChangeDetector = None,
+                 outbox_topic: str = None, publisher: MQTTPublisher = None):
         self.mqtt_client = mqtt_client
+        self.publisher = publisher if publisher is not None else MQTTPublisher(mqtt_client)
         self.command_topic = command_topic
         self.status_topic = status_topic
         self.repository = repository
+        self.status_writer = status_writer
+        self.codec = codec if codec is not None else get_codec()
+        self.ack_topic = ack_topic
+        self.outbox_topic = outbox_topic
+        self.change_detector = change_detector
+        self.status_listeners = []
+        self.ack_listeners = []
+        self.heartbeat_listeners = []
+        self.outbox_listeners = []
+        self.shard_plan = shard_plan if shard_plan is not None else ShardPlan()
+        self._status_partition_prefix = f"{status_topic}/"
 
         self.mqtt_client.on_connect = self.on_connect
         self.mqtt_client.on_message = self.on_message
 
+    def add_status_listener(self, listener):
+        """
+        Register a callable that receives every drone decoded from the status topic.
+        """
+        self.status_listeners.append(listener)
+
+    def add_heartbeat_listener(self, listener):
+        """
+        Register a callable that receives the drone of every valid status message sent
+        by a drone, including the unchanged ones dropped by the change detector. Status
+        echoes published by the server (echo: true) are not heartbeats.
+        """
+        self.heartbeat_listeners.append(listener)
+
+    def add_ack_listener(self, listener):
+        """
+        Register a callable that receives (tid, message) for every command acknowledgement,
+        i.e. ack topic messages and status messages carrying a tid. It returns whether the
+        tid was known. When sharded, a status ack no listener knew is relayed to the ack
+        topic, which every worker subscribes to, so it reaches the worker that issued the command.
+        """
+        self.ack_listeners.append(listener)
+
+    def add_outbox_listener(self, listener):
+        """
+        Register a callable that receives every command forwarded on the outbox topic
+        by the worker that queued it.
+        """
+        self.outbox_listeners.append(listener)
+
     async def connect(self):
         """
         Connect to the MQTT broker.
@@ -25,7 +94,7 @@ class MQTTHandler:
         """
         Callback function for when the client connects to the broker.
         """
-        logging.info(f"Connected to MQTT broker with result code: {rc}")
+        logging.info("Connected to MQTT broker with result code: %s", rc)
         self.subscribe_to_topics()
 
 
@@ -33,29 +102,86 @@ class MQTTHandler:
         """
         Subscribe to the command and status topics.
         """
-        self.mqtt_client.subscribe(self.command_topic)
-        self.mqtt_client.subscribe(self.status_topic)
-        logging.info(f"Subscribed to topics: {self.command_topic}, {self.status_topic}")
+        topics = self.shard_plan.plain_subscriptions(self.command_topic) + self.shard_plan.status_subscriptions(self.status_topic)
+        if self.ack_topic:
+            # Not shared: only the worker that issued a command knows its tid
+            topics.append(self.ack_topic)
+        if self.outbox_topic:
+            # Not shared either: the worker owning the drone picks the command up
+            topics.append(self.outbox_topic)
+        for topic in topics:
+            self.mqtt_client.subscribe(topic)
+        logging.info("Subscribed to topics: %s", ", ".join(topics))
+
+    def status_topic_for(self, drone_id: str) -> str:
+        """
+        Return the topic the status of a drone is published on.
+        """
+        return self.shard_plan.status_topic_for(self.status_topic, drone_id)
+
+    def is_status_topic(self, topic: str) -> bool:
+        return topic == self.status_topic or topic.startswith(self._status_partition_prefix)
+
+    async def apply_status(self, drone: Drone):
+        """
+        Apply a status that did not arrive over MQTT, e.g. from the liveness monitor:
+        notify the status listeners and save it like a received status.
+        """
+        if self.change_detector is not None:
+            self.change_detector.forget(drone.drone_id)
+        for listener in self.status_listeners:
+            listener(drone)
+        if self.status_writer is not None:
+            await self.status_writer.submit(drone.to_dict())
+        else:
+            await self.repository.save(drone.to_dict())
 
     async def on_message(self, client, topic, payload, qos, properties):
         """
         Handle incoming MQTT messages.
         """
         try:
-            message = json.loads(payload)
-            logging.info(f"Received message on {topic}: {message}")
+            started = time.perf_counter()
+            try:
+                message = self.codec.decode(payload)
+            except Exception as e:
+                INVALID_PAYLOADS.labels("undecodable").inc()
+                logging.error("Invalid payload on %s: %s", topic, e, extra={"topic": topic})
+                return
+            decoded = time.perf_counter()
+            _DECODE_SECONDS.observe(decoded - started)
+            if logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug("Received message on %s: %s", topic, message, extra={"topic": topic})
 
-            if topic == self.command_topic:
+            # Unwrap DroneTopic envelopes ({"tid", "timestamp", "data"})
+            tid = message.get("tid")
+            if isinstance(message.get("data"), dict):
+                message = message["data"]
+
+            if topic == self.ack_topic:
+                if not tid:
+                    INVALID_PAYLOADS.labels("missing_tid").inc()
+                    logging.error("Invalid ack payload: missing 'tid'", extra={"topic": topic})
+                    return
+                for listener in self.ack_listeners:
+                    listener(tid, message)
+
+            elif topic == self.outbox_topic:
+                for listener in self.outbox_listeners:
+                    listener(message)
+
+            elif topic == self.command_topic:
                 # Handle command messages
                 drone_id = message.get("drone_id")
                 command = message.get("command")
 
                 if not drone_id or not command:
-                    logging.error("Invalid command payload: missing 'drone_id' or 'command'")
+                    INVALID_PAYLOADS.labels("missing_command").inc()
+                    logging.error("Invalid command payload: missing 'drone_id' or 'command'", extra={"topic": topic})
                     return
 
                 # Simulate a drone object
-                drone = Drone(drone_id, self.mqtt_client, self.status_topic)
+                drone = Drone(drone_id)
                 if command == "takeoff":
                     drone.takeoff()
                 elif command == "land":
@@ -63,26 +189,66 @@ class MQTTHandler:
                 elif command == "return-home":
                     drone.return_home()
                 else:
-                    logging.error(f"Unknown command: {command}")
+                    UNKNOWN_COMMANDS.inc()
+                    logging.error("Unknown command: %s", command, extra={"topic": topic, "drone_id": drone_id})
 
-            elif topic == self.status_topic:
+            elif self.is_status_topic(topic):
                 # Handle status messages
                 drone_data = message
 
                 # validate the payload
                 if not drone_data.get("drone_id"):
-                    logging.error("Invalid status payload: missing 'drone_id'")
+                    INVALID_PAYLOADS.labels("missing_drone_id").inc()
+                    logging.error("Invalid status payload: missing 'drone_id'", extra={"topic": topic})
                     return
                 if not drone_data.get("status"):
-                    logging.error("Invalid status payload: missing 'status'")
+                    INVALID_PAYLOADS.labels("missing_status").inc()
+                    logging.error("Invalid status payload: missing 'status'", extra={"topic": topic, "drone_id": drone_data["drone_id"]})
                     return
-                
-                # Save the drone status to the database
-                drone = Drone.from_dict(drone_data)
+
+                try:
+                    drone = Drone.from_dict(drone_data)
+                except ValueError as e:
+                    INVALID_PAYLOADS.labels("invalid_status").inc()
+                    logging.error("Invalid status payload: %s", e, extra={"topic": topic, "drone_id": drone_data["drone_id"]})
+                    return
+
+                # The server's own status echoes say nothing about the drone being alive
+                if not drone_data.get("echo"):
+                    for listener in self.heartbeat_listeners:
+                        listener(drone)
+
+                # Drop repeats of the last processed state; acks always go through
+                latitude = drone_data.get("latitude")
+                position = (latitude, drone_data.get("longitude"), drone_data.get("altitude")) if latitude is not None else None
+                if (self.change_detector is not None and not tid and
+                        not self.change_detector.should_process(drone_data["drone_id"], drone_data["status"],
+                                                                drone_data.get("dock_id"), position)):
+                    UNCHANGED_STATUS.inc()
+                    return
+
+                for listener in self.status_listeners:
+                    listener(drone)
+                if tid:
+                    resolved = [listener(tid, drone_data) for listener in self.ack_listeners]
+                    if not any(resolved) and self.ack_topic and self.shard_plan.sharded:
+                        RELAYED_ACKS.inc()
+                        await self.publisher.publish(self.ack_topic, self.codec.encode({"tid": tid, "data": drone_data}), kind="ack")
                 serialized_drone = drone.to_dict()
-                await self.repository.save(serialized_drone)
+                handled = time.perf_counter()
+                _HANDLE_SECONDS.observe(handled - decoded)
+
+                # Save the drone status to the database
+                if self.status_writer is not None:
+                    await self.status_writer.submit(serialized_drone)
+                else:
+                    await self.repository.save(serialized_drone)
+                _SAVE_SECONDS.observe(time.perf_counter() - handled)
 
-                logging.info(f"Drone status saved to database: {serialized_drone}")
+                if logging.root.isEnabledFor(logging.DEBUG):
+                    logging.debug("Drone status saved to database: %s", serialized_drone,
+                                  extra={"topic": topic, "drone_id": drone.drone_id})
 
         except Exception as e:
-            logging.error(f"Error processing message: {e}")
\ No newline at end of file
+            PROCESSING_ERRORS.inc()
+            logging.error("Error processing message: %s", e, extra={"topic": topic})
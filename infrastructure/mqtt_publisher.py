@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+from gmqtt.storage import PersistentStorage
+
+from infrastructure.metrics import Counter, Histogram
+
+MQTT_PUBLISH_SECONDS = Histogram(
+    "drone_api_mqtt_publish_duration_seconds",
+    "Time from queueing an outbound MQTT message until it is handed to the client.",
+    ["kind"],
+)
+MQTT_PUBACK_SECONDS = Histogram(
+    "drone_api_mqtt_puback_duration_seconds",
+    "Time from publishing a QoS 1/2 message until the broker acknowledged it.",
+)
+MQTT_PUBLISH_DROPPED = Counter(
+    "drone_api_mqtt_publish_dropped",
+    "Outbound MQTT messages dropped without being published.",
+    ["reason"],
+)
+
+# QoS per message kind: commands must reach the drone, relayed acks the worker waiting for them,
+# status echoes are superseded by the next update
+DEFAULT_QOS_POLICY = {"command": 1, "ack": 1, "status": 0}
+
+_STOP = object()
+
+
+class InflightWindow(PersistentStorage):
+    """
+    gmqtt storage of unacknowledged QoS 1/2 publishes that also tracks the in-flight window.
+
+    Pass it to the gmqtt Client as persistent_storage, so the client keeps replaying
+    unacknowledged messages on reconnect while the publisher can wait for room in
+    the window and observe the broker ack latency.
+    """
+    def __init__(self):
+        super().__init__()
+        self._sent_at: Dict[int, float] = {}
+        self._released = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def push_message(self, mid, raw_package):
+        super().push_message(mid, raw_package)
+        self._sent_at.setdefault(mid, time.perf_counter())
+
+    def remove_message_by_mid(self, mid):
+        sent_at = self._sent_at.pop(mid, None)
+        if sent_at is not None:
+            MQTT_PUBACK_SECONDS.observe(time.perf_counter() - sent_at)
+        super().remove_message_by_mid(mid)
+        self._released.set()
+
+    def clear(self):
+        self._sent_at.clear()
+        super().clear()
+        self._released.set()
+
+    async def wait_below(self, limit: int):
+        """
+        Wait until fewer than `limit` messages are in flight.
+        """
+        while len(self._messages) >= limit:
+            self._released.clear()
+            await self._released.wait()
+
+
+class OutboundMessage:
+    __slots__ = ("topic", "payload", "qos", "kind", "queued_at", "attempts")
+
+    def __init__(self, topic: str, payload, qos: int, kind: str):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.kind = kind
+        self.queued_at = time.perf_counter()
+        self.attempts = 0
+
+
+class MQTTPublisher:
+    """
+    Outbound MQTT stage with a bounded send queue and an in-flight window.
+
+    Messages are published by a background sender in bursts of up to batch_size.
+    QoS 1/2 messages wait while max_inflight messages are unacknowledged. While the
+    client is disconnected the sender retries with jittered exponential backoff, so
+    a fleet of workers does not hit the broker at once when it comes back.
+
+    When the queue is full, QoS 0 messages are dropped and QoS 1/2 publishers wait.
+    Before start() is called, messages are published inline.
+    """
+    def __init__(self, mqtt_client, window: Optional[InflightWindow] = None, qos_policy: Optional[Dict[str, int]] = None,
+                 max_queue_size: int = 10000, max_inflight: int = 100, batch_size: int = 100,
+                 retry_base: float = 0.2, retry_max: float = 5.0, max_qos0_attempts: int = 3):
+        self.mqtt_client = mqtt_client
+        self.window = window
+        self.qos_policy = dict(DEFAULT_QOS_POLICY, **(qos_policy or {}))
+        self.max_inflight = max_inflight
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_qos0_attempts = max_qos0_attempts
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+
+        self._task: Optional[asyncio.Task] = None
+        self._publish_seconds = {kind: MQTT_PUBLISH_SECONDS.labels(kind) for kind in self.qos_policy}
+        self._dropped = {reason: MQTT_PUBLISH_DROPPED.labels(reason) for reason in ("queue_full", "disconnected", "shutdown")}
+
+        # metrics
+        self.published = 0
+        self.dropped = 0
+        self.retries = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    @property
+    def inflight(self) -> int:
+        return len(self.window) if self.window is not None else 0
+
+    def metrics(self) -> Dict:
+        """
+        Return a snapshot of the publisher metrics.
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "inflight": self.inflight,
+            "published": self.published,
+            "dropped": self.dropped,
+            "retries": self.retries,
+        }
+
+    def start(self):
+        """
+        Start the background sender.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        Stop the background sender after publishing what is queued, waiting at most `timeout` seconds.
+        """
+        if self._task is None:
+            return
+        try:
+            self.queue.put_nowait(_STOP)
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        while not self.queue.empty():
+            if self.queue.get_nowait() is not _STOP:
+                self._drop("shutdown")
+
+    async def publish(self, topic: str, payload, kind: str = "command"):
+        """
+        Queue a message for publishing with the QoS configured for its kind.
+        """
+        if kind not in self.qos_policy:
+            raise ValueError(f"Unknown message kind: {kind}")
+        message = OutboundMessage(topic, payload, self.qos_policy[kind], kind)
+        if self._task is None:
+            self._send(message)
+            return
+        if message.qos == 0:
+            try:
+                self.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop("queue_full")
+            return
+        await self.queue.put(message)
+
+    def _drop(self, reason: str):
+        self.dropped += 1
+        self._dropped[reason].inc()
+
+    def _send(self, message: OutboundMessage):
+        self.mqtt_client.publish(message.topic, message.payload, qos=message.qos)
+        self.published += 1
+        self._publish_seconds[message.kind].observe(time.perf_counter() - message.queued_at)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.retry_max, self.retry_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, message: OutboundMessage):
+        try:
+            while True:
+                if self.mqtt_client.is_connected:
+                    if message.qos > 0 and self.window is not None:
+                        await self.window.wait_below(self.max_inflight)
+                    try:
+                        self._send(message)
+                        return
+                    except Exception as e:
+                        logging.warning("Failed to publish to %s: %s", message.topic, e)
+                message.attempts += 1
+                if message.qos == 0 and message.attempts >= self.max_qos0_attempts:
+                    self._drop("disconnected")
+                    return
+                self.retries += 1
+                await asyncio.sleep(self._backoff(message.attempts))
+        except asyncio.CancelledError:
+            self._drop("shutdown")
+            raise
+
+    async def _run(self):
+        while True:
+            message = await self.queue.get()
+            burst = 0
+            while message is not _STOP:
+                await self._deliver(message)
+                burst += 1
+                if burst >= self.batch_size:
+                    break
+                try:
+                    message = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+            if message is _STOP:
+                return
+            # Let the transport flush the burst and the MQTT reader process acks
+            await asyncio.sleep(0)
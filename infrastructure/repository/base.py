@@ -0,0 +1,62 @@
+from typing import AsyncIterator, Dict, List, Optional, Protocol, Sequence, Tuple
+from domain.drone import Drone
+from domain.geo import LatLon
+from infrastructure.metrics import Histogram
+
+REPOSITORY_OP_SECONDS = Histogram(
+    "drone_api_repository_operation_duration_seconds",
+    "DroneRepository operation latency.",
+    ["operation"],
+)
+
+
+class DroneRepositoryProtocol(Protocol):
+    """
+    Interface shared by the drone state repository backends.
+
+    Documents are the dictionaries produced by Drone.to_dict; keys missing from a
+    document (such as the position) keep their stored value. find_by_id raises
+    ValueError when the drone does not exist.
+
+    Every write increments the stored document version, which drones read back
+    carry. compare_and_set only writes when the stored version is the expected
+    one (None: the drone must not exist yet), so read-modify-write cycles cannot
+    silently overwrite a concurrent update.
+    """
+    async def ensure_indexes(self):
+        ...
+
+    async def close(self):
+        ...
+
+    async def find_by_id(self, drone_id: str) -> Drone:
+        ...
+
+    async def find_many(self, drone_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                        dock_id: Optional[str] = None, after: Optional[str] = None,
+                        limit: Optional[int] = None) -> List[Drone]:
+        ...
+
+    def iter_all(self, batch_size: int = 1000) -> AsyncIterator[List[Drone]]:
+        ...
+
+    async def find_near(self, latitude: float, longitude: float, radius_m: float) -> List[Drone]:
+        ...
+
+    async def find_within(self, polygon: Sequence[LatLon]) -> List[Drone]:
+        ...
+
+    async def compare_and_set(self, data: Dict, expected_version: Optional[int]) -> bool:
+        ...
+
+    async def count_by_status_and_dock(self) -> Dict[Tuple[str, Optional[str]], int]:
+        ...
+
+    async def save(self, data: Dict):
+        ...
+
+    async def save_many(self, documents: List[Dict]):
+        ...
+
+    async def delete_drone_by_id(self, drone_id: str) -> str:
+        ...
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Dict, List, Optional
+from domain.drone import Drone
+from infrastructure.metrics import Counter, Histogram
+from infrastructure.repository.base import DroneRepositoryProtocol
+
+LOADER_BATCH_SIZE = Histogram(
+    "drone_api_loader_batch_size",
+    "Drone IDs fetched per coalesced repository query.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+LOADER_COALESCED = Counter("drone_api_loader_coalesced_lookups", "Drone lookups served by a query already in flight.")
+
+
+class DroneLoader:
+    """
+    Single-flight, batching front for repository lookups by drone_id.
+
+    Concurrent lookups of the same drone share one in-flight future, and lookups
+    requested during the same event loop tick are fetched together: a single ID
+    with find_by_id, several with one find_many query.
+    """
+    def __init__(self, repository: DroneRepositoryProtocol, max_batch_size: int = 1000):
+        self.repository = repository
+        self.max_batch_size = max_batch_size
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._queued: List[str] = []
+        self._tasks = set()
+
+        # metrics
+        self.queries = 0
+        self.coalesced = 0
+
+    def _future_for(self, drone_id: str) -> asyncio.Future:
+        future = self._inflight.get(drone_id)
+        if future is not None:
+            self.coalesced += 1
+            LOADER_COALESCED.inc()
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._inflight[drone_id] = loop.create_future()
+        if not self._queued:
+            loop.call_soon(self._dispatch)
+        self._queued.append(drone_id)
+        return future
+
+    def _dispatch(self):
+        queued, self._queued = self._queued, []
+        for start in range(0, len(queued), self.max_batch_size):
+            task = asyncio.ensure_future(self._fetch(queued[start:start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, drone_ids: List[str]):
+        self.queries += 1
+        LOADER_BATCH_SIZE.observe(len(drone_ids))
+        try:
+            if len(drone_ids) == 1:
+                try:
+                    found = {drone_ids[0]: await self.repository.find_by_id(drone_ids[0])}
+                except ValueError:
+                    found = {}
+            else:
+                found = {drone.drone_id: drone for drone in await self.repository.find_many(drone_ids)}
+        except Exception as e:
+            for drone_id in drone_ids:
+                future = self._inflight.pop(drone_id)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for drone_id in drone_ids:
+            future = self._inflight.pop(drone_id)
+            if not future.done():
+                future.set_result(found.get(drone_id))
+
+    async def load(self, drone_id: str) -> Drone:
+        """
+        Load one drone, raising ValueError when it does not exist.
+        """
+        # shield: a cancelled caller must not cancel the lookup other callers share
+        drone = await asyncio.shield(self._future_for(drone_id))
+        if drone is None:
+            raise ValueError(f"Drone with ID {drone_id} not found")
+        return drone
+
+    async def load_many(self, drone_ids: List[str]) -> List[Drone]:
+        """
+        Load several drones, skipping the ones that do not exist.
+        """
+        futures = [self._future_for(drone_id) for drone_id in dict.fromkeys(drone_ids)]
+        drones = await asyncio.shield(asyncio.gather(*futures))
+        return [drone for drone in drones if drone is not None]
+
+    def metrics(self) -> dict:
+        """
+        Return a snapshot of the loader metrics.
+        """
+        return {
+            "queries": self.queries,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
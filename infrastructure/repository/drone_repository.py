@@ -1,10 +1,35 @@
 import os
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from domain.drone import Drone
+from domain.geo import EARTH_RADIUS_M, LatLon
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, GEOSPHERE, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from infrastructure.metrics import timed
+from infrastructure.repository.base import REPOSITORY_OP_SECONDS
+
+# Only the fields Drone.from_dict reads are fetched from MongoDB
+DRONE_PROJECTION = {"_id": 0, "drone_id": 1, "dock_id": 1, "status": 1, "last_updated": 1,
+                    "latitude": 1, "longitude": 1, "altitude": 1, "version": 1}
+
+# Documents written before versioning have no version field and count as version 0
+INCREMENT_VERSION = {"version": 1}
+
+
+def with_location(data: Dict) -> Dict:
+    """
+    Add the GeoJSON point indexed by the 2dsphere index when the document has a position.
+    """
+    if data.get("latitude") is None:
+        return data
+    return dict(data, location={"type": "Point", "coordinates": [data["longitude"], data["latitude"]]})
+
 
 class DroneRepository:
-    def __init__(self, mongo_uri: str):
+    """
+    MongoDB (Motor) drone state repository.
+    """
+    def __init__(self, mongo_uri: str, collection_name: str = "drones"):
         
         #username = os.getenv("DRONE_DB_USERNAME")
         #password = os.getenv("DRONE_DB_PASSWORD")
@@ -17,21 +42,133 @@ class DroneRepository:
         db_url = f"{mongo_uri}"
         
         self.client = AsyncIOMotorClient(db_url)
-        self.collection = self.client[db_name]["drones"]
+        self.collection = self.client[db_name][collection_name]
 
+    async def ensure_indexes(self):
+        """
+        Create the indexes used by the lookups. Safe to call on every startup.
+        """
+        await self.collection.create_index([("drone_id", ASCENDING)], unique=True, name="drone_id_unique")
+        await self.collection.create_index([("status", ASCENDING)], name="status")
+        await self.collection.create_index([("dock_id", ASCENDING)], name="dock_id")
+        await self.collection.create_index([("location", GEOSPHERE)], name="location_2dsphere")
+
+    async def close(self):
+        self.client.close()
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_by_id"))
     async def find_by_id(self, drone_id: str) -> Drone:
-        doc = await self.collection.find_one({"drone_id": drone_id})
+        doc = await self.collection.find_one({"drone_id": drone_id}, DRONE_PROJECTION)
         if not doc:
             raise ValueError(f"Drone with ID {drone_id} not found")
         return Drone.from_dict(doc)
-    
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_many"))
+    async def find_many(self, drone_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                        dock_id: Optional[str] = None, after: Optional[str] = None,
+                        limit: Optional[int] = None) -> List[Drone]:
+        """
+        Find drones by ID and/or status and dock with a single query. With after or
+        limit, drones are returned in drone_id order, starting after the given ID.
+        """
+        query = {}
+        if drone_ids is not None:
+            query["drone_id"] = {"$in": list(drone_ids)}
+        if after is not None:
+            query.setdefault("drone_id", {})["$gt"] = after
+        if status is not None:
+            query["status"] = status
+        if dock_id is not None:
+            query["dock_id"] = dock_id
+        cursor = self.collection.find(query, DRONE_PROJECTION)
+        if after is not None or limit is not None:
+            cursor = cursor.sort("drone_id", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [Drone.from_dict(doc) async for doc in cursor]
+
+    async def iter_all(self, batch_size: int = 1000) -> AsyncIterator[List[Drone]]:
+        """
+        Stream every drone in batches of up to batch_size, fetched with a cursor of the same batch size.
+        """
+        batch = []
+        async for doc in self.collection.find({}, DRONE_PROJECTION, batch_size=batch_size):
+            batch.append(Drone.from_dict(doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_near"))
+    async def find_near(self, latitude: float, longitude: float, radius_m: float) -> List[Drone]:
+        """
+        Find drones within radius_m of a point using the 2dsphere index.
+        """
+        query = {"location": {"$geoWithin": {"$centerSphere": [[longitude, latitude], radius_m / EARTH_RADIUS_M]}}}
+        return [Drone.from_dict(doc) async for doc in self.collection.find(query, DRONE_PROJECTION)]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_within"))
+    async def find_within(self, polygon: Sequence[LatLon]) -> List[Drone]:
+        """
+        Find drones inside a polygon of (lat, lon) vertices using the 2dsphere index.
+        """
+        ring = [[lon, lat] for lat, lon in polygon]
+        if ring[0] != ring[-1]:
+            ring.append(ring[0])
+        query = {"location": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}}
+        return [Drone.from_dict(doc) async for doc in self.collection.find(query, DRONE_PROJECTION)]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("count_by_status_and_dock"))
+    async def count_by_status_and_dock(self) -> Dict[Tuple[str, Optional[str]], int]:
+        """
+        Count the drones per (status, dock_id) with one $group aggregation.
+        """
+        pipeline = [{"$group": {"_id": {"status": "$status", "dock_id": "$dock_id"}, "count": {"$sum": 1}}}]
+        return {(group["_id"].get("status"), group["_id"].get("dock_id")): group["count"]
+                async for group in self.collection.aggregate(pipeline)}
+
+    @timed(REPOSITORY_OP_SECONDS.labels("compare_and_set"))
+    async def compare_and_set(self, data: Dict, expected_version: Optional[int]) -> bool:
+        """
+        Write the document only if the stored version is expected_version, with the
+        version in the update filter. None inserts a drone that must not exist yet.
+        """
+        if expected_version is None:
+            try:
+                await self.collection.insert_one(dict(with_location(data), version=1))
+            except DuplicateKeyError:
+                return False
+            return True
+        version = expected_version if expected_version else {"$in": [0, None]}
+        result = await self.collection.update_one(
+            {"drone_id": data['drone_id'], "version": version},
+            {"$set": with_location(data), "$inc": INCREMENT_VERSION},
+        )
+        return result.matched_count == 1
+
+    @timed(REPOSITORY_OP_SECONDS.labels("save"))
     async def save(self, data: Dict):
         await self.collection.update_one(
             {"drone_id": data['drone_id']},
-            {"$set": data},
+            {"$set": with_location(data), "$inc": INCREMENT_VERSION},
             upsert=True
         )
 
+    @timed(REPOSITORY_OP_SECONDS.labels("save_many"))
+    async def save_many(self, documents: List[Dict]):
+        """
+        Upsert several drone documents with a single unordered bulk write.
+        """
+        if not documents:
+            return
+        await self.collection.bulk_write(
+            [UpdateOne({"drone_id": data['drone_id']}, {"$set": with_location(data), "$inc": INCREMENT_VERSION}, upsert=True)
+             for data in documents],
+            ordered=False
+        )
+
+    @timed(REPOSITORY_OP_SECONDS.labels("delete_drone_by_id"))
     async def delete_drone_by_id(self, drone_id: str) -> str:
         result = await self.collection.delete_one({"drone_id": drone_id})
         if result.deleted_count:
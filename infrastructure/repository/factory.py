@@ -0,0 +1,17 @@
+from infrastructure.repository.base import DroneRepositoryProtocol
+
+
+def create_drone_repository(backend: str, mongo_uri: str = None, sqlite_path: str = "drones.db") -> DroneRepositoryProtocol:
+    """
+    Build the drone state repository for the configured backend: mongo, memory or sqlite.
+    """
+    if backend == "mongo":
+        from infrastructure.repository.drone_repository import DroneRepository
+        return DroneRepository(mongo_uri=mongo_uri)
+    if backend == "memory":
+        from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+        return InMemoryDroneRepository()
+    if backend == "sqlite":
+        from infrastructure.repository.sqlite_drone_repository import SQLiteDroneRepository
+        return SQLiteDroneRepository(sqlite_path)
+    raise ValueError(f"Unknown repository backend: {backend}")
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import AsyncIterator, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+from infrastructure.metrics import Histogram, timed
+
+HISTORY_OP_SECONDS = Histogram(
+    "drone_api_history_operation_duration_seconds",
+    "DroneHistoryRepository operation latency.",
+    ["operation"],
+)
+
+
+class DroneHistoryRepository:
+    """
+    Append-only telemetry history using the bucket pattern.
+
+    Samples are stored in one document per drone and time window:
+    {drone_id, bucket_start, count, samples: [{t, s, d}, ...]} where t is the
+    sample time, s the status and d the dock ID. A bucket holds at most
+    bucket_size samples: samples are only pushed to a bucket with room for all of
+    them, and otherwise open a new bucket of the same window. Telemetry can arrive
+    out of order, so neither the samples of a bucket nor the buckets of a window
+    are kept in time order; first and last bound the sample times of a bucket.
+    """
+    def __init__(self, mongo_uri: str, collection_name: str = "drone_history",
+                 bucket_seconds: int = 3600, bucket_size: int = 200):
+        db_name = "drone_db"
+        self.client = AsyncIOMotorClient(mongo_uri)
+        self.collection = self.client[db_name][collection_name]
+        self.bucket_seconds = bucket_seconds
+        self.bucket_size = bucket_size
+
+    def bucket_start(self, timestamp: datetime) -> datetime:
+        epoch = int(timestamp.timestamp())
+        return datetime.fromtimestamp(epoch - epoch % self.bucket_seconds)
+
+    async def ensure_indexes(self):
+        """
+        Create the index used by range queries. Safe to call on every startup.
+        """
+        await self.collection.create_index([("drone_id", ASCENDING), ("bucket_start", ASCENDING)], name="drone_bucket")
+
+    @timed(HISTORY_OP_SECONDS.labels("append_many"))
+    async def append_many(self, samples: List[Dict]):
+        """
+        Append status documents ({drone_id, dock_id, status, last_updated}) with one bulk write.
+        """
+        groups: Dict[tuple, List[Dict]] = {}
+        for data in samples:
+            timestamp = data["last_updated"]
+            groups.setdefault((data["drone_id"], self.bucket_start(timestamp)), []).append(
+                {"t": timestamp, "s": data["status"], "d": data.get("dock_id")}
+            )
+
+        operations = []
+        for (drone_id, bucket_start), group in groups.items():
+            for i in range(0, len(group), self.bucket_size):
+                chunk = group[i:i + self.bucket_size]
+                operations.append(UpdateOne(
+                    {"drone_id": drone_id, "bucket_start": bucket_start, "count": {"$lte": self.bucket_size - len(chunk)}},
+                    {
+                        "$push": {"samples": {"$each": chunk}},
+                        "$inc": {"count": len(chunk)},
+                        "$min": {"first": min(sample["t"] for sample in chunk)},
+                        "$max": {"last": max(sample["t"] for sample in chunk)},
+                    },
+                    upsert=True,
+                ))
+        if operations:
+            await self.collection.bulk_write(operations, ordered=True)
+
+    async def find_range(self, drone_id: str, start: datetime, end: Optional[datetime] = None,
+                         downsample: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+        Stream the samples of a drone between start and end (the latest sample when
+        None), oldest first. The samples of one window are sorted before they are
+        streamed. With downsample (seconds), at most one sample per interval is returned.
+        """
+        query = {"drone_id": drone_id, "bucket_start": {"$gte": self.bucket_start(start)}, "last": {"$gte": start}}
+        if end is not None:
+            query["bucket_start"]["$lte"] = end
+            query["first"] = {"$lte": end}
+        projection = {"_id": 0, "bucket_start": 1, "samples": 1}
+        interval = timedelta(seconds=downsample) if downsample else None
+        next_time = None
+        cursor = self.collection.find(query, projection).sort([("bucket_start", ASCENDING), ("_id", ASCENDING)])
+        async for samples in self._windows(cursor):
+            for sample in samples:
+                timestamp = sample["t"]
+                if timestamp < start or (end is not None and timestamp > end):
+                    continue
+                if interval is not None:
+                    if next_time is not None and timestamp < next_time:
+                        continue
+                    next_time = timestamp + interval
+                yield {"drone_id": drone_id, "status": sample["s"], "dock_id": sample["d"], "timestamp": timestamp}
+
+    @staticmethod
+    async def _windows(cursor) -> AsyncIterator[List[Dict]]:
+        """
+        Group the buckets read in bucket_start order per window and yield the samples of each window in time order.
+        """
+        window = None
+        samples: List[Dict] = []
+        async for bucket in cursor:
+            if bucket["bucket_start"] != window:
+                if samples:
+                    samples.sort(key=itemgetter("t"))
+                    yield samples
+                window = bucket["bucket_start"]
+                samples = []
+            samples.extend(bucket["samples"])
+        if samples:
+            samples.sort(key=itemgetter("t"))
+            yield samples
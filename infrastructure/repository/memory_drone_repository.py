@@ -0,0 +1,144 @@
+import heapq
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+from domain.drone import Drone
+from domain.geo import LatLon, haversine_m, point_in_polygon
+from infrastructure.metrics import timed
+from infrastructure.repository.base import REPOSITORY_OP_SECONDS
+
+
+class InMemoryDroneRepository:
+    """
+    Process-local drone state repository backed by dicts.
+
+    Secondary indexes on status and dock_id keep filtered lookups proportional to
+    the number of matches instead of the fleet size. Nothing is persisted.
+    """
+    def __init__(self):
+        self.documents: Dict[str, Dict] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_dock: Dict[Optional[str], Set[str]] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_by_id"))
+    async def find_by_id(self, drone_id: str) -> Drone:
+        doc = self.documents.get(drone_id)
+        if not doc:
+            raise ValueError(f"Drone with ID {drone_id} not found")
+        return Drone.from_dict(doc)
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_many"))
+    async def find_many(self, drone_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                        dock_id: Optional[str] = None, after: Optional[str] = None,
+                        limit: Optional[int] = None) -> List[Drone]:
+        """
+        Find drones by ID and/or status and dock, using the smallest matching index. With
+        after or limit, drones are returned in drone_id order, starting after the given ID.
+        """
+        id_set = set(drone_ids) if drone_ids is not None else None
+        candidates = []
+        if id_set is not None:
+            candidates.append(id_set)
+        if status is not None:
+            candidates.append(self._by_status.get(status, ()))
+        if dock_id is not None:
+            candidates.append(self._by_dock.get(dock_id, ()))
+        keys = min(candidates, key=len) if candidates else self.documents.keys()
+
+        documents = self.documents
+        matches = []
+        for drone_id in keys:
+            doc = documents.get(drone_id)
+            if doc is None:
+                continue
+            if status is not None and doc["status"] != status:
+                continue
+            if dock_id is not None and doc.get("dock_id") != dock_id:
+                continue
+            if id_set is not None and drone_id not in id_set:
+                continue
+            if after is not None and drone_id <= after:
+                continue
+            matches.append(drone_id)
+        if limit is not None:
+            matches = heapq.nsmallest(limit, matches)
+        elif after is not None:
+            matches.sort()
+        return [Drone.from_dict(documents[drone_id]) for drone_id in matches]
+
+    async def iter_all(self, batch_size: int = 1000) -> AsyncIterator[List[Drone]]:
+        documents = list(self.documents.values())
+        for start in range(0, len(documents), batch_size):
+            yield [Drone.from_dict(doc) for doc in documents[start:start + batch_size]]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_near"))
+    async def find_near(self, latitude: float, longitude: float, radius_m: float) -> List[Drone]:
+        return [Drone.from_dict(doc) for doc in self.documents.values()
+                if doc.get("latitude") is not None and
+                haversine_m(latitude, longitude, doc["latitude"], doc["longitude"]) <= radius_m]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_within"))
+    async def find_within(self, polygon: Sequence[LatLon]) -> List[Drone]:
+        return [Drone.from_dict(doc) for doc in self.documents.values()
+                if doc.get("latitude") is not None and point_in_polygon(doc["latitude"], doc["longitude"], polygon)]
+
+    def _store(self, data: Dict):
+        drone_id = data["drone_id"]
+        current = self.documents.get(drone_id)
+        if current is None:
+            current = self.documents[drone_id] = {}
+        else:
+            self._unindex(drone_id, current)
+        current.update(data)
+        current["version"] = current.get("version", 0) + 1
+        self._by_status.setdefault(current.get("status"), set()).add(drone_id)
+        self._by_dock.setdefault(current.get("dock_id"), set()).add(drone_id)
+
+    def _unindex(self, drone_id: str, doc: Dict):
+        for index, key in ((self._by_status, doc.get("status")), (self._by_dock, doc.get("dock_id"))):
+            members = index.get(key)
+            if members is not None:
+                members.discard(drone_id)
+                if not members:
+                    del index[key]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("count_by_status_and_dock"))
+    async def count_by_status_and_dock(self) -> Dict[Tuple[str, Optional[str]], int]:
+        counts = {}
+        for doc in self.documents.values():
+            key = (doc.get("status"), doc.get("dock_id"))
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    @timed(REPOSITORY_OP_SECONDS.labels("compare_and_set"))
+    async def compare_and_set(self, data: Dict, expected_version: Optional[int]) -> bool:
+        current = self.documents.get(data["drone_id"])
+        if expected_version is None:
+            if current is not None:
+                return False
+        elif current is None or current.get("version", 0) != expected_version:
+            return False
+        self._store(data)
+        return True
+
+    @timed(REPOSITORY_OP_SECONDS.labels("save"))
+    async def save(self, data: Dict):
+        self._store(data)
+
+    @timed(REPOSITORY_OP_SECONDS.labels("save_many"))
+    async def save_many(self, documents: List[Dict]):
+        for data in documents:
+            self._store(data)
+
+    @timed(REPOSITORY_OP_SECONDS.labels("delete_drone_by_id"))
+    async def delete_drone_by_id(self, drone_id: str) -> str:
+        doc = self.documents.pop(drone_id, None)
+        if doc is not None:
+            self._unindex(drone_id, doc)
+            return f"Deleted drone with ID: {drone_id}"
+        else:
+            return f"No drone found with ID: {drone_id}"
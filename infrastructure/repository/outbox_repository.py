@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from infrastructure.metrics import Histogram, timed
+
+OUTBOX_OP_SECONDS = Histogram(
+    "drone_api_outbox_operation_duration_seconds",
+    "CommandOutboxRepository operation latency.",
+    ["operation"],
+)
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def _to_timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class CommandOutboxRepository:
+    """
+    MongoDB store of queued drone commands.
+
+    Documents are {_id, drone_id, command, priority, idempotency_key, created_at,
+    expires_at, state} where state is "queued" until the command is delivered or
+    rejected and "done" after that. Finished commands are kept until they expire,
+    so a retried request with the same idempotency key is still recognized, and a
+    TTL index on expires_at lets MongoDB delete them without a sweep.
+    """
+    def __init__(self, mongo_uri: str, collection_name: str = "command_outbox"):
+        db_name = "drone_db"
+        self.client = AsyncIOMotorClient(mongo_uri)
+        self.collection = self.client[db_name][collection_name]
+
+    async def ensure_indexes(self):
+        """
+        Create the TTL and idempotency key indexes. Safe to call on every startup.
+        """
+        await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl")
+        await self.collection.create_index(
+            [("idempotency_key", ASCENDING)], unique=True, name="idempotency_key_unique",
+            partialFilterExpression={"idempotency_key": {"$type": "string"}},
+        )
+
+    async def close(self):
+        self.client.close()
+
+    @timed(OUTBOX_OP_SECONDS.labels("insert"))
+    async def insert(self, entry: Dict) -> bool:
+        """
+        Store a queued command. Returns False when its idempotency key is already used.
+        """
+        document = {key: value for key, value in entry.items() if value is not None}
+        document["created_at"] = _to_datetime(entry["created_at"])
+        document["expires_at"] = _to_datetime(entry["expires_at"])
+        try:
+            await self.collection.insert_one(document)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @timed(OUTBOX_OP_SECONDS.labels("find_by_key"))
+    async def find_by_key(self, idempotency_key: str) -> Optional[Dict]:
+        """
+        Return the command stored with an idempotency key, or None.
+        """
+        document = await self.collection.find_one({"idempotency_key": idempotency_key})
+        if document is not None:
+            document["created_at"] = _to_timestamp(document["created_at"])
+            document["expires_at"] = _to_timestamp(document["expires_at"])
+        return document
+
+    @timed(OUTBOX_OP_SECONDS.labels("complete"))
+    async def complete(self, entry_id: str):
+        """
+        Mark a command as delivered or rejected.
+        """
+        await self.collection.update_one({"_id": entry_id}, {"$set": {"state": "done"}})
+
+    async def find_unexpired(self, now: float) -> AsyncIterator[Dict]:
+        """
+        Stream the commands that have not expired yet, queued or done, oldest first.
+        """
+        cursor = self.collection.find({"expires_at": {"$gt": _to_datetime(now)}}).sort("created_at", ASCENDING)
+        async for document in cursor:
+            document["created_at"] = _to_timestamp(document["created_at"])
+            document["expires_at"] = _to_timestamp(document["expires_at"])
+            yield document
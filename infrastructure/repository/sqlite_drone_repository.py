@@ -0,0 +1,220 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from domain.drone import Drone
+from domain.geo import LatLon, haversine_m, point_in_polygon, polygon_bounds, radius_bounds
+from infrastructure.metrics import timed
+from infrastructure.repository.base import REPOSITORY_OP_SECONDS
+
+COLUMNS = ("drone_id", "dock_id", "status", "last_updated", "latitude", "longitude", "altitude")
+# Columns added after the first release, created on databases that predate them
+ADDED_COLUMNS = {"latitude": "REAL", "longitude": "REAL", "altitude": "REAL", "version": "INTEGER NOT NULL DEFAULT 0"}
+
+INSERT = (
+    "INSERT INTO drones (drone_id, dock_id, status, last_updated, latitude, longitude, altitude, version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, 1)"
+)
+# Documents without a position keep the stored one
+UPDATE_SET = (
+    "dock_id = ?2, status = ?3, last_updated = ?4, latitude = coalesce(?5, latitude), "
+    "longitude = coalesce(?6, longitude), altitude = coalesce(?7, altitude), version = version + 1"
+)
+UPSERT = INSERT + " ON CONFLICT(drone_id) DO UPDATE SET " + UPDATE_SET
+INSERT_NEW = INSERT + " ON CONFLICT(drone_id) DO NOTHING"
+COMPARE_AND_SET = "UPDATE drones SET " + UPDATE_SET + " WHERE drone_id = ?1 AND version = ?8"
+
+
+class SQLiteDroneRepository:
+    """
+    Embedded SQLite drone state repository for single-node deployments.
+
+    The database runs in WAL mode and is accessed from one dedicated thread, so
+    queries never block the event loop. save_many writes a batch in one transaction.
+    """
+    def __init__(self, path: str = "drones.db"):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-drone-repository")
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS drones ("
+                "drone_id TEXT PRIMARY KEY, dock_id TEXT, status TEXT NOT NULL, last_updated TEXT, "
+                "latitude REAL, longitude REAL, altitude REAL, version INTEGER NOT NULL DEFAULT 0)"
+            )
+            existing = {row["name"] for row in connection.execute("PRAGMA table_info(drones)")}
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in existing:
+                    connection.execute(f"ALTER TABLE drones ADD COLUMN {column} {definition}")
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def ensure_indexes(self):
+        """
+        Create the table and the secondary indexes. Safe to call on every startup.
+        """
+        def create():
+            connection = self._connect()
+            connection.execute("CREATE INDEX IF NOT EXISTS drones_status ON drones (status)")
+            connection.execute("CREATE INDEX IF NOT EXISTS drones_dock_id ON drones (dock_id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS drones_position ON drones (latitude, longitude)")
+        await self._run(create)
+
+    async def close(self):
+        def close():
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        await self._run(close)
+        self._executor.shutdown(wait=True)
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_by_id"))
+    async def find_by_id(self, drone_id: str) -> Drone:
+        def query():
+            return self._connect().execute("SELECT * FROM drones WHERE drone_id = ?", (drone_id,)).fetchone()
+        row = await self._run(query)
+        if not row:
+            raise ValueError(f"Drone with ID {drone_id} not found")
+        return Drone.from_dict(dict(row))
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_many"))
+    async def find_many(self, drone_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                        dock_id: Optional[str] = None, after: Optional[str] = None,
+                        limit: Optional[int] = None) -> List[Drone]:
+        """
+        Find drones by ID and/or status and dock with a single query. With after or
+        limit, drones are returned in drone_id order, starting after the given ID.
+        """
+        clauses = []
+        params = []
+        if drone_ids is not None:
+            drone_ids = list(drone_ids)
+            if not drone_ids:
+                return []
+            clauses.append(f"drone_id IN ({','.join('?' * len(drone_ids))})")
+            params.extend(drone_ids)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if dock_id is not None:
+            clauses.append("dock_id = ?")
+            params.append(dock_id)
+        if after is not None:
+            clauses.append("drone_id > ?")
+            params.append(after)
+        sql = "SELECT * FROM drones" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        if after is not None or limit is not None:
+            sql += " ORDER BY drone_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        def query():
+            return self._connect().execute(sql, params).fetchall()
+        return [Drone.from_dict(dict(row)) for row in await self._run(query)]
+
+    async def iter_all(self, batch_size: int = 1000) -> AsyncIterator[List[Drone]]:
+        """
+        Stream every drone in batches of up to batch_size. Batches are fetched by drone_id
+        ranges, so no cursor is held open between them.
+        """
+        after = ""
+        while True:
+            def query():
+                return self._connect().execute(
+                    "SELECT * FROM drones WHERE drone_id > ? ORDER BY drone_id LIMIT ?", (after, batch_size)
+                ).fetchall()
+            rows = await self._run(query)
+            if not rows:
+                return
+            yield [Drone.from_dict(dict(row)) for row in rows]
+            after = rows[-1]["drone_id"]
+
+    async def _find_in_bounds(self, bounds) -> List[Drone]:
+        min_lat, min_lon, max_lat, max_lon = bounds
+
+        def query():
+            return self._connect().execute(
+                "SELECT * FROM drones WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+                (min_lat, max_lat, min_lon, max_lon),
+            ).fetchall()
+        return [Drone.from_dict(dict(row)) for row in await self._run(query)]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_near"))
+    async def find_near(self, latitude: float, longitude: float, radius_m: float) -> List[Drone]:
+        """
+        Find drones within radius_m of a point: an indexed bounding box query, refined in Python.
+        """
+        drones = await self._find_in_bounds(radius_bounds(latitude, longitude, radius_m))
+        return [drone for drone in drones if haversine_m(latitude, longitude, drone.latitude, drone.longitude) <= radius_m]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("find_within"))
+    async def find_within(self, polygon: Sequence[LatLon]) -> List[Drone]:
+        """
+        Find drones inside a polygon of (lat, lon) vertices: an indexed bounding box query, refined in Python.
+        """
+        drones = await self._find_in_bounds(polygon_bounds(polygon))
+        return [drone for drone in drones if point_in_polygon(drone.latitude, drone.longitude, polygon)]
+
+    @timed(REPOSITORY_OP_SECONDS.labels("count_by_status_and_dock"))
+    async def count_by_status_and_dock(self) -> Dict[Tuple[str, Optional[str]], int]:
+        def query():
+            return self._connect().execute(
+                "SELECT status, dock_id, COUNT(*) FROM drones GROUP BY status, dock_id"
+            ).fetchall()
+        return {(row[0], row[1]): row[2] for row in await self._run(query)}
+
+    @timed(REPOSITORY_OP_SECONDS.labels("compare_and_set"))
+    async def compare_and_set(self, data: Dict, expected_version: Optional[int]) -> bool:
+        """
+        Write the document only if the stored version is expected_version (None: insert a new drone).
+        """
+        row = tuple(data.get(column) for column in COLUMNS)
+
+        def write():
+            if expected_version is None:
+                return self._connect().execute(INSERT_NEW, row).rowcount
+            return self._connect().execute(COMPARE_AND_SET, row + (expected_version,)).rowcount
+        return await self._run(write) == 1
+
+    @timed(REPOSITORY_OP_SECONDS.labels("save"))
+    async def save(self, data: Dict):
+        await self.save_many([data])
+
+    @timed(REPOSITORY_OP_SECONDS.labels("save_many"))
+    async def save_many(self, documents: List[Dict]):
+        """
+        Upsert several drone documents in a single transaction.
+        """
+        if not documents:
+            return
+        rows = [tuple(data.get(column) for column in COLUMNS) for data in documents]
+
+        def write():
+            connection = self._connect()
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(UPSERT, rows)
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        await self._run(write)
+
+    @timed(REPOSITORY_OP_SECONDS.labels("delete_drone_by_id"))
+    async def delete_drone_by_id(self, drone_id: str) -> str:
+        def delete():
+            return self._connect().execute("DELETE FROM drones WHERE drone_id = ?", (drone_id,)).rowcount
+        if await self._run(delete):
+            return f"Deleted drone with ID: {drone_id}"
+        else:
+            return f"No drone found with ID: {drone_id}"
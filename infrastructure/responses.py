@@ -0,0 +1,13 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+from infrastructure.codec import get_codec
+
+_json_codec = get_codec()
+
+
+class CodecJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the fastest available JSON codec.
+    """
+    def render(self, content: Any) -> bytes:
+        return _json_codec.encode(content)
@@ -0,0 +1,81 @@
+import os
+import socket
+import zlib
+from typing import List
+
+
+def partition_for(drone_id: str, partitions: int) -> int:
+    """
+    Map a drone to a status partition. Stable across processes and restarts.
+    """
+    return zlib.crc32(drone_id.encode("utf-8")) % partitions
+
+
+class ShardPlan:
+    """
+    Describes which part of the status stream this worker ingests.
+
+    - Drones publishing to the partitioned topics (`drone/status/{partition}`) are
+      owned by exactly one worker (partition % worker_count == worker_index), so the
+      messages of one drone are always handled in order by the same process.
+    - The plain status and command topics are consumed through an MQTT v5 shared
+      subscription (`$share/{group}/...`) when a share group is set, so each message
+      is delivered to one worker of the group instead of all of them. Without a share
+      group only worker 0 subscribes to them.
+    """
+    def __init__(self, partitions: int = 0, worker_index: int = 0, worker_count: int = 1, share_group: str = None):
+        if worker_count < 1 or not 0 <= worker_index < worker_count:
+            raise ValueError(f"Invalid worker index {worker_index} for {worker_count} workers")
+        self.partitions = partitions
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.share_group = share_group
+
+    @property
+    def sharded(self) -> bool:
+        return self.worker_count > 1 or bool(self.share_group)
+
+    def owned_partitions(self) -> List[int]:
+        return [p for p in range(self.partitions) if p % self.worker_count == self.worker_index]
+
+    def owns(self, drone_id: str) -> bool:
+        """
+        Return whether this worker receives every status message of a drone, assuming
+        drones publish on the partitioned topics when there are partitions. Without
+        partitions, a share group spreads the messages of a drone over its workers, so
+        no worker owns it.
+        """
+        if self.partitions:
+            return partition_for(drone_id, self.partitions) % self.worker_count == self.worker_index
+        return not self.share_group and self.worker_index == 0
+
+    def client_id(self, base: str) -> str:
+        """
+        Return an MQTT client ID that is unique per worker process when sharding.
+        """
+        if not self.sharded:
+            return base
+        return f"{base}-{socket.gethostname()}-{os.getpid()}"
+
+    def shared(self, topic: str) -> str:
+        return f"$share/{self.share_group}/{topic}" if self.share_group else topic
+
+    def plain_subscriptions(self, topic: str) -> List[str]:
+        """
+        Return the subscriptions of this worker to an un-partitioned topic, so each of
+        its messages is handled by one worker.
+        """
+        if self.share_group or self.worker_index == 0:
+            return [self.shared(topic)]
+        return []
+
+    def status_subscriptions(self, status_topic: str) -> List[str]:
+        return self.plain_subscriptions(status_topic) + [f"{status_topic}/{p}" for p in self.owned_partitions()]
+
+    def status_topic_for(self, status_topic: str, drone_id: str) -> str:
+        """
+        Return the topic status updates of a drone should be published on.
+        """
+        if not self.partitions:
+            return status_topic
+        return f"{status_topic}/{partition_for(drone_id, self.partitions)}"
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+
+from domain.drone import Drone, DroneStatus
+from infrastructure.repository.base import DroneRepositoryProtocol
+
+# File layout, little endian:
+#   header  magic, version, record count, created_at (unix seconds), crc32 of everything after the header
+#   records one fixed-size record per drone, so record i is at HEADER.size + i * RECORD.size
+#   strings utf-8 drone and dock IDs referenced by (offset, length) from the records
+MAGIC = b"DRSN"
+VERSION = 1
+HEADER = struct.Struct("<4sHIqI")
+#   drone_id offset/length, dock_id offset/length (NO_DOCK when None), status, last_updated, lat, lon, alt (NaN when None)
+RECORD = struct.Struct("<IHIHBqddd")
+NO_DOCK = 0xFFFF
+# Longest drone or dock ID a record can reference, in utf-8 bytes
+MAX_ID_LENGTH = NO_DOCK - 1
+
+# Status codes are positions in this list, so new statuses must be appended
+_STATUSES = list(DroneStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+_EPOCH = datetime(1970, 1, 1)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _to_seconds(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((value - _EPOCH).total_seconds())
+
+
+def _optional(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def encode_snapshot(drones: Iterable[Drone], created_at: Optional[float] = None) -> bytes:
+    """
+    Encode drones into the snapshot format. Drones with an ID longer than
+    MAX_ID_LENGTH bytes are left out; the warm-up loads them from the repository.
+    """
+    records = bytearray()
+    strings = bytearray()
+    count = 0
+    skipped = 0
+    for drone in drones:
+        drone_id = drone.drone_id.encode()
+        dock_id = str(drone.dock_id).encode() if drone.dock_id is not None else None
+        if len(drone_id) > MAX_ID_LENGTH or (dock_id is not None and len(dock_id) > MAX_ID_LENGTH):
+            skipped += 1
+            continue
+        id_offset = len(strings)
+        strings += drone_id
+        if dock_id is None:
+            dock_offset, dock_length = 0, NO_DOCK
+        else:
+            dock_offset, dock_length = len(strings), len(dock_id)
+            strings += dock_id
+        records += RECORD.pack(
+            id_offset, len(drone_id), dock_offset, dock_length, _STATUS_CODES[drone.status],
+            _to_seconds(drone.last_updated), _optional(drone.latitude), _optional(drone.longitude),
+            _optional(drone.altitude),
+        )
+        count += 1
+    if skipped:
+        logging.warning("Left %d drones with IDs longer than %d bytes out of the snapshot", skipped, MAX_ID_LENGTH)
+    body = bytes(records) + bytes(strings)
+    created_at = time.time() if created_at is None else created_at
+    return HEADER.pack(MAGIC, VERSION, count, int(created_at), zlib.crc32(body)) + body
+
+
+def _write_file(path: str, data: bytes):
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def write_snapshot(path: str, drones: Iterable[Drone]) -> int:
+    """
+    Atomically write a snapshot of the drones to path and return its size in bytes.
+    """
+    data = encode_snapshot(drones)
+    _write_file(path, data)
+    return len(data)
+
+
+class SnapshotReader:
+    """
+    Memory-mapped reader of a fleet snapshot file.
+
+    Records are decoded lazily from the mapping, so opening a snapshot costs one
+    checksum pass and reading it never copies the whole file.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise SnapshotError(f"Snapshot {path} is truncated")
+            magic, version, self.count, self.created_at, crc = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != VERSION:
+                raise SnapshotError(f"Snapshot {path} has an unknown format")
+            self._strings = HEADER.size + self.count * RECORD.size
+            if len(self._mmap) < self._strings or zlib.crc32(memoryview(self._mmap)[HEADER.size:]) != crc:
+                raise SnapshotError(f"Snapshot {path} is corrupt")
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._mmap[start:start + length].decode()
+
+    def __getitem__(self, index: int) -> Drone:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        (id_offset, id_length, dock_offset, dock_length, status, last_updated,
+         latitude, longitude, altitude) = RECORD.unpack_from(self._mmap, HEADER.size + index * RECORD.size)
+        return Drone(
+            self._string(id_offset, id_length),
+            None if dock_length == NO_DOCK else self._string(dock_offset, dock_length),
+            _STATUSES[status] if status < len(_STATUSES) else DroneStatus.UNKNOWN,
+            datetime.fromtimestamp(last_updated, timezone.utc).replace(tzinfo=None),
+            None if math.isnan(latitude) else latitude,
+            None if math.isnan(longitude) else longitude,
+            None if math.isnan(altitude) else altitude,
+        )
+
+    def __iter__(self) -> Iterator[Drone]:
+        for index in range(self.count):
+            yield self[index]
+
+    def batches(self, batch_size: int = 1000) -> Iterator[List[Drone]]:
+        for start in range(0, self.count, batch_size):
+            yield [self[index] for index in range(start, min(start + batch_size, self.count))]
+
+
+class SnapshotWriter:
+    """
+    Periodically writes a snapshot of the repository to a local file.
+
+    The fleet is streamed from the repository in batches, then encoded and written
+    from a worker thread to a temporary file that replaces the previous snapshot,
+    so the event loop only collects the drones.
+    """
+    def __init__(self, repository: DroneRepositoryProtocol, path: str, interval: float = 300.0, batch_size: int = 1000):
+        self.repository = repository
+        self.path = path
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+        # metrics
+        self.snapshots = 0
+        self.failures = 0
+        self.last_duration = 0.0
+        self.last_size = 0
+
+    async def write(self):
+        """
+        Write a snapshot now.
+        """
+        started = time.perf_counter()
+        drones = []
+        async for batch in self.repository.iter_all(self.batch_size):
+            drones.extend(batch)
+        # The repository returns new Drone objects, so the thread has them to itself
+        size = await asyncio.to_thread(write_snapshot, self.path, drones)
+        self.snapshots += 1
+        self.last_size = size
+        self.last_duration = time.perf_counter() - started
+        logging.info("Wrote fleet snapshot of %d drones (%d bytes) in %.2fs", len(drones), size, self.last_duration)
+
+    async def _write_logged(self):
+        try:
+            await self.write()
+        except Exception as e:
+            self.failures += 1
+            logging.error("Failed to write fleet snapshot to %s: %s", self.path, e)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            await self._write_logged()
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the periodic writer, letting a write in progress finish, and write a final
+        snapshot for the next start.
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self._write_logged()
+
+    def metrics(self) -> dict:
+        return {
+            "snapshots": self.snapshots,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "last_size": self.last_size,
+        }
@@ -0,0 +1,118 @@
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from domain.drone import Drone
+from domain.geo import LatLon, haversine_m, point_in_polygon, polygon_bounds, radius_bounds
+
+# (latitude, longitude, altitude)
+Position = Tuple[float, float, Optional[float]]
+
+
+class SpatialIndex:
+    """
+    In-memory grid index of the last known drone positions.
+
+    Positions are bucketed into cells of cell_size degrees. update() moves a drone
+    between cells in O(1) as telemetry arrives, and queries only visit the cells
+    overlapping the bounding box of the searched area. `ready` is set once the
+    index has been loaded from the repository, so callers can query the database
+    until then.
+    """
+    def __init__(self, cell_size: float = 0.05):
+        self.cell_size = cell_size
+        self.ready = False
+        self._positions: Dict[str, Position] = {}
+        self._cell_of: Dict[str, Tuple[int, int]] = {}
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    def update(self, drone: Drone):
+        """
+        Record the position of a drone. Drones without a position keep their last known one.
+        """
+        if not drone.has_position:
+            return
+        drone_id = drone.drone_id
+        self._positions[drone_id] = (drone.latitude, drone.longitude, drone.altitude)
+        cell = self._cell(drone.latitude, drone.longitude)
+        previous = self._cell_of.get(drone_id)
+        if previous == cell:
+            return
+        if previous is not None:
+            self._discard(drone_id, previous)
+        self._cell_of[drone_id] = cell
+        self._cells.setdefault(cell, set()).add(drone_id)
+
+    def load(self, drones: Iterable[Drone]):
+        """
+        Load positions in bulk and mark the index ready.
+        """
+        for drone in drones:
+            self.update(drone)
+        self.ready = True
+
+    def remove(self, drone_id: str):
+        self._positions.pop(drone_id, None)
+        cell = self._cell_of.pop(drone_id, None)
+        if cell is not None:
+            self._discard(drone_id, cell)
+
+    def _discard(self, drone_id: str, cell: Tuple[int, int]):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(drone_id)
+            if not members:
+                del self._cells[cell]
+
+    def position(self, drone_id: str) -> Optional[Position]:
+        return self._positions.get(drone_id)
+
+    def _candidates(self, bounds: Tuple[float, float, float, float]) -> List[str]:
+        min_lat, min_lon, max_lat, max_lon = bounds
+        low_row, low_col = self._cell(min_lat, min_lon)
+        high_row, high_col = self._cell(max_lat, max_lon)
+        cells = self._cells
+        candidates = []
+        if (high_row - low_row + 1) * (high_col - low_col + 1) > len(cells):
+            # Fewer occupied cells than cells in the box: filter the occupied ones instead
+            for (row, col), members in cells.items():
+                if low_row <= row <= high_row and low_col <= col <= high_col:
+                    candidates.extend(members)
+            return candidates
+        for row in range(low_row, high_row + 1):
+            for col in range(low_col, high_col + 1):
+                members = cells.get((row, col))
+                if members:
+                    candidates.extend(members)
+        return candidates
+
+    def within_radius(self, latitude: float, longitude: float, radius_m: float) -> List[Tuple[str, Position, float]]:
+        """
+        Return (drone_id, position, distance_m) of the drones within radius_m, nearest first.
+        """
+        positions = self._positions
+        result = []
+        for drone_id in self._candidates(radius_bounds(latitude, longitude, radius_m)):
+            position = positions[drone_id]
+            distance = haversine_m(latitude, longitude, position[0], position[1])
+            if distance <= radius_m:
+                result.append((drone_id, position, distance))
+        result.sort(key=lambda item: item[2])
+        return result
+
+    def within_polygon(self, polygon: Sequence[LatLon]) -> List[Tuple[str, Position]]:
+        """
+        Return (drone_id, position) of the drones inside a polygon of (lat, lon) vertices.
+        """
+        positions = self._positions
+        result = []
+        for drone_id in self._candidates(polygon_bounds(polygon)):
+            position = positions[drone_id]
+            if point_in_polygon(position[0], position[1], polygon):
+                result.append((drone_id, position))
+        return result
@@ -0,0 +1,103 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+from domain.drone import Drone, DroneStatus
+
+
+class StatusSubscription:
+    """
+    A subscriber of the live status stream.
+
+    Pending updates are conflated per drone: a newer status replaces an undelivered
+    older one, so a slow consumer only ever sees the latest state. At most
+    max_pending drones are buffered; beyond that the oldest pending update is dropped.
+    """
+    def __init__(self, drone_ids: Optional[Iterable[str]] = None, status: Optional[DroneStatus] = None,
+                 max_pending: int = 1000):
+        self.drone_ids: Optional[Set[str]] = set(drone_ids) if drone_ids else None
+        self.status = status
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self._event = asyncio.Event()
+
+        # metrics
+        self.delivered = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    def offer(self, drone_id: str, payload: Dict):
+        """
+        Queue an update without ever blocking the publisher.
+        """
+        pending = self._pending
+        if drone_id in pending:
+            pending[drone_id] = payload
+            self.conflated += 1
+        else:
+            if len(pending) >= self.max_pending:
+                pending.popitem(last=False)
+                self.dropped += 1
+            pending[drone_id] = payload
+        self._event.set()
+
+    async def get(self) -> List[Dict]:
+        """
+        Wait for updates and return all of them.
+        """
+        await self._event.wait()
+        self._event.clear()
+        updates = list(self._pending.values())
+        self._pending.clear()
+        self.delivered += len(updates)
+        return updates
+
+
+class StatusBroadcaster:
+    """
+    In-process pub/sub fan-out of drone status updates to stream subscribers.
+    """
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._by_drone: Dict[str, Set[StatusSubscription]] = {}
+        self._all: Set[StatusSubscription] = set()
+
+    def __len__(self) -> int:
+        return len(self._all) + len({sub for subs in self._by_drone.values() for sub in subs})
+
+    def subscribe(self, drone_ids: Optional[Iterable[str]] = None, status: Optional[DroneStatus] = None) -> StatusSubscription:
+        subscription = StatusSubscription(drone_ids, status, self.max_pending)
+        if subscription.drone_ids is None:
+            self._all.add(subscription)
+        else:
+            for drone_id in subscription.drone_ids:
+                self._by_drone.setdefault(drone_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        if subscription.drone_ids is None:
+            self._all.discard(subscription)
+            return
+        for drone_id in subscription.drone_ids:
+            subscribers = self._by_drone.get(drone_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_drone[drone_id]
+
+    def publish(self, drone: Drone):
+        """
+        Fan a status update out to the matching subscribers. Never blocks.
+        """
+        subscribers = self._by_drone.get(drone.drone_id)
+        if not subscribers and not self._all:
+            return
+        payload = None
+        for group in (subscribers, self._all):
+            if not group:
+                continue
+            for subscription in group:
+                if subscription.status is not None and subscription.status != drone.status:
+                    continue
+                if payload is None:
+                    payload = drone.to_dict()
+                subscription.offer(drone.drone_id, payload)
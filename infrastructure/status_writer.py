@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+from infrastructure.repository.base import DroneRepositoryProtocol
+from infrastructure.metrics import Histogram
+
+STATUS_FLUSH_SECONDS = Histogram(
+    "drone_api_status_flush_duration_seconds",
+    "Latency of status write-behind bulk writes.",
+)
+
+_STOP = object()
+
+
+class StatusWriter:
+    """
+    Write-behind stage for drone status documents.
+
+    Status documents are queued on a bounded asyncio queue and committed in
+    batches by a background flusher. Documents for the same drone that arrive
+    before a flush are coalesced, so only the latest one is written. When a bulk
+    write fails, its documents go back to the pending map (unless a newer document
+    for the same drone arrived meanwhile) and the flush is retried with jittered
+    exponential backoff, coalescing what arrives in between.
+    """
+    def __init__(self, repository: DroneRepositoryProtocol, batch_size: int = 500,
+                 flush_interval: float = 0.2, max_queue_size: int = 10000,
+                 retry_base: float = 0.5, retry_max: float = 30.0):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+
+        self._pending: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+
+        # metrics
+        self.flush_count = 0
+        self.flushed_documents = 0
+        self.coalesced_documents = 0
+        self.failed_flushes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize() + len(self._pending)
+
+    def metrics(self) -> Dict:
+        """
+        Return a snapshot of the writer metrics.
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "flush_count": self.flush_count,
+            "flushed_documents": self.flushed_documents,
+            "coalesced_documents": self.coalesced_documents,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+        }
+
+    def start(self):
+        """
+        Start the background flusher.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background flusher and flush everything still queued.
+        """
+        if self._task is not None:
+            await self.queue.put(_STOP)
+            await self._task
+            self._task = None
+        while not self.queue.empty():
+            data = self.queue.get_nowait()
+            if data is not _STOP:
+                self._add_pending(data)
+        await self.flush()
+
+    async def submit(self, data: Dict):
+        """
+        Queue a status document for writing. Waits while the queue is full.
+        """
+        await self.queue.put(data)
+
+    def _add_pending(self, data: Dict):
+        if data["drone_id"] in self._pending:
+            self.coalesced_documents += 1
+        self._pending[data["drone_id"]] = data
+
+    def _backoff(self) -> float:
+        return min(self.retry_max, self.retry_base * 2 ** (self._failures - 1)) * random.uniform(0.5, 1.0)
+
+    async def flush(self) -> bool:
+        """
+        Commit the pending documents with a single bulk write. Returns False when the
+        write failed and the documents were put back to be retried.
+        """
+        if not self._pending:
+            return True
+        batch = list(self._pending.values())
+        self._pending = {}
+
+        started = time.perf_counter()
+        try:
+            await self.repository.save_many(batch)
+        except Exception as e:
+            self.failed_flushes += 1
+            self._failures += 1
+            for data in batch:
+                # Documents queued during the write are newer
+                self._pending.setdefault(data["drone_id"], data)
+            logging.error("Failed to flush %d drone status documents (attempt %d), retrying: %s",
+                          len(batch), self._failures, e)
+            return False
+        self._failures = 0
+        latency = time.perf_counter() - started
+        STATUS_FLUSH_SECONDS.observe(latency)
+
+        self.flush_count += 1
+        self.flushed_documents += len(batch)
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        return True
+
+    async def _next(self, timeout: float):
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                data = await self.queue.get()
+                if data is _STOP:
+                    return
+                self._add_pending(data)
+
+            # After a failed write, wait out the backoff whatever the batch size
+            deadline = loop.time() + (self._backoff() if self._failures else self.flush_interval)
+            stopping = False
+            while self._failures or len(self._pending) < self.batch_size:
+                data = await self._next(deadline - loop.time())
+                if data is None:
+                    break
+                if data is _STOP:
+                    stopping = True
+                    break
+                self._add_pending(data)
+
+            await self.flush()
+            if stopping:
+                return
@@ -1,36 +1,233 @@
-from fastapi import FastAPI, HTTPException , APIRouter, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException , APIRouter, Header, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
+from typing import List, Optional, Tuple
+from datetime import datetime
 import asyncio
+import json
 import uvicorn
-from domain.drone import DroneStatus, Drone
+from domain.drone import DroneStatus, Drone, InvalidTransitionError, parse_timestamp
 import logging
 
 import os
 from gmqtt import Client as MQTTClient
 from infrastructure.mqtt_handler import MQTTHandler
-from infrastructure.repository.drone_repository import DroneRepository
+from infrastructure.mqtt_publisher import InflightWindow, MQTTPublisher
+from infrastructure.repository.factory import create_drone_repository
+from infrastructure.repository.history_repository import DroneHistoryRepository
+from infrastructure.repository.outbox_repository import CommandOutboxRepository
+from infrastructure.history_recorder import HistoryRecorder
+from infrastructure.status_writer import StatusWriter
+from infrastructure.drone_cache import DroneStateCache
+from infrastructure.codec import get_codec
+from infrastructure.responses import CodecJSONResponse
+from infrastructure.sharding import ShardPlan
+from infrastructure.status_broadcaster import StatusBroadcaster
+from infrastructure.change_detector import ChangeDetector
+from infrastructure.spatial_index import SpatialIndex
+from infrastructure.snapshot import SnapshotWriter
+from infrastructure.liveness import LivenessMonitor
+from infrastructure.fleet_stats import FleetStats
+from infrastructure.metrics import REGISTRY, Gauge, RouteLatencyMiddleware
+from infrastructure.logging_setup import LoggingPipeline
 import application.drone_command_service as drone_command_service
+from application.command_tracker import CommandTracker, CommandInFlightError
+from application.drone_command_service import ConcurrentUpdateError
+from application.fleet_warmup import FleetWarmup
+from application.command_outbox import CommandOutbox
+
+# Logging: records are written as JSON (LOG_FORMAT=json) or text by a background thread.
+# Records below WARNING can be sampled (LOG_SAMPLE_RATE, or per topic with a JSON object
+# of topic -> rate in LOG_TOPIC_SAMPLE_RATES), and repeated warnings and errors are
+# limited to LOG_ERROR_BURST per LOG_ERROR_INTERVAL seconds.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_TOPIC_SAMPLE_RATES = json.loads(os.getenv("LOG_TOPIC_SAMPLE_RATES", "{}"))
+LOG_ERROR_BURST = int(os.getenv("LOG_ERROR_BURST", "10"))
+LOG_ERROR_INTERVAL = float(os.getenv("LOG_ERROR_INTERVAL", "60"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+logging_pipeline = LoggingPipeline(
+    level=LOG_LEVEL,
+    json_format=LOG_FORMAT == "json",
+    sample_rate=LOG_SAMPLE_RATE,
+    topic_sample_rates=LOG_TOPIC_SAMPLE_RATES,
+    error_burst=LOG_ERROR_BURST,
+    error_interval=LOG_ERROR_INTERVAL,
+    queue_size=LOG_QUEUE_SIZE,
+)
+logging_pipeline.start()
 
 # MQTT configuration
 COMMAND_TOPIC = "drone/command"
 STATUS_TOPIC = "drone/status"
+ACK_TOPIC = os.getenv("COMMAND_ACK_TOPIC", "drone/ack")
+# Commands queued for offline drones are forwarded on this topic to the worker owning the drone
+OUTBOX_TOPIC = os.getenv("COMMAND_OUTBOX_TOPIC", "drone/outbox")
+
+# MQTT ingestion sharding
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "drone-api-server")
+MQTT_SHARE_GROUP = os.getenv("MQTT_SHARE_GROUP") or None
+MQTT_STATUS_PARTITIONS = int(os.getenv("MQTT_STATUS_PARTITIONS", "0"))
+MQTT_WORKER_INDEX = int(os.getenv("MQTT_WORKER_INDEX", "0"))
+MQTT_WORKER_COUNT = int(os.getenv("MQTT_WORKER_COUNT", "1"))
+
+# Outbound MQTT publishing
+MQTT_PUBLISH_QUEUE_SIZE = int(os.getenv("MQTT_PUBLISH_QUEUE_SIZE", "10000"))
+MQTT_MAX_INFLIGHT = int(os.getenv("MQTT_MAX_INFLIGHT", "100"))
+MQTT_COMMAND_QOS = int(os.getenv("MQTT_COMMAND_QOS", "1"))
+MQTT_STATUS_ECHO_QOS = int(os.getenv("MQTT_STATUS_ECHO_QOS", "0"))
 
-# MongoDB configuration
+# MQTT payload codec: auto, json, orjson or msgpack
+MQTT_CODEC = os.getenv("MQTT_CODEC", "auto")
+
+# Repository configuration: mongo, memory or sqlite
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "mongo")
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "drones.db")
+
+# Status write-behind configuration
+STATUS_BATCH_SIZE = int(os.getenv("STATUS_BATCH_SIZE", "500"))
+STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.2"))
+STATUS_QUEUE_SIZE = int(os.getenv("STATUS_QUEUE_SIZE", "10000"))
+STATUS_HEARTBEAT_INTERVAL = float(os.getenv("STATUS_HEARTBEAT_INTERVAL", "30"))
+
+# Drone state cache configuration
+# Unchanged telemetry refreshes a cached drone once per STATUS_HEARTBEAT_INTERVAL, so the TTL
+# must be longer for steady drones, including those loaded by the warm-up, to stay cached
+DRONE_CACHE_SIZE = int(os.getenv("DRONE_CACHE_SIZE", "100000"))
+DRONE_CACHE_TTL = float(os.getenv("DRONE_CACHE_TTL", "90"))
+
+# Fleet command configuration
+FLEET_COMMAND_CONCURRENCY = int(os.getenv("FLEET_COMMAND_CONCURRENCY", "32"))
+FLEET_STATUS_PAGE_SIZE = int(os.getenv("FLEET_STATUS_PAGE_SIZE", "1000"))
+FLEET_STATUS_MAX_PAGE_SIZE = int(os.getenv("FLEET_STATUS_MAX_PAGE_SIZE", "10000"))
+COMMAND_ACK_TIMEOUT = float(os.getenv("COMMAND_ACK_TIMEOUT", "10"))
+
+# Live status stream configuration
+STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", "1000"))
+STREAM_KEEPALIVE = float(os.getenv("STREAM_KEEPALIVE", "15"))
+
+# Spatial index configuration
+SPATIAL_CELL_SIZE = float(os.getenv("SPATIAL_CELL_SIZE", "0.05"))
+# JSON object of dock_id -> [latitude, longitude], used by /drones/nearby?dock_id=
+DOCK_LOCATIONS = json.loads(os.getenv("DOCK_LOCATIONS", "{}"))
+
+# Liveness: drones silent for LIVENESS_TIMEOUT seconds are marked lost (0 disables)
+LIVENESS_TIMEOUT = float(os.getenv("LIVENESS_TIMEOUT", "90"))
+LIVENESS_TICK = float(os.getenv("LIVENESS_TICK", "1"))
+
+# Command outbox: commands for drones the liveness monitor considers offline are queued
+# and delivered when the drone reports again. Durable with the mongo backend only.
+COMMAND_OUTBOX_ENABLED = os.getenv("COMMAND_OUTBOX_ENABLED", "true").lower() == "true"
+COMMAND_OUTBOX_TTL = float(os.getenv("COMMAND_OUTBOX_TTL", "3600"))
+COMMAND_OUTBOX_MAX_ATTEMPTS = int(os.getenv("COMMAND_OUTBOX_MAX_ATTEMPTS", "5"))
+
+# Fleet summary counters are reconciled with the repository every FLEET_STATS_RECONCILE_INTERVAL seconds (0 disables)
+FLEET_STATS_RECONCILE_INTERVAL = float(os.getenv("FLEET_STATS_RECONCILE_INTERVAL", "60"))
+
+# Startup warm-up and fleet snapshot configuration
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "1000"))
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH") or None
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", "3600"))
+
+# Telemetry history configuration
+# The history store is MongoDB-only, so it is off by default with the other backends
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true" if REPOSITORY_BACKEND == "mongo" else "false").lower() == "true"
+HISTORY_BUCKET_SECONDS = int(os.getenv("HISTORY_BUCKET_SECONDS", "3600"))
+HISTORY_BUCKET_SIZE = int(os.getenv("HISTORY_BUCKET_SIZE", "200"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "1000"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
 
 
 # Initialize MQTT client and repository
-mqtt_client = MQTTClient("drone-api-server")
-repository = DroneRepository(mongo_uri=MONGODB_URI)
+shard_plan = ShardPlan(
+    partitions=MQTT_STATUS_PARTITIONS,
+    worker_index=MQTT_WORKER_INDEX,
+    worker_count=MQTT_WORKER_COUNT,
+    share_group=MQTT_SHARE_GROUP,
+)
+publish_window = InflightWindow()
+mqtt_client = MQTTClient(shard_plan.client_id(MQTT_CLIENT_ID), persistent_storage=publish_window)
+mqtt_publisher = MQTTPublisher(
+    mqtt_client,
+    window=publish_window,
+    qos_policy={"command": MQTT_COMMAND_QOS, "status": MQTT_STATUS_ECHO_QOS},
+    max_queue_size=MQTT_PUBLISH_QUEUE_SIZE,
+    max_inflight=MQTT_MAX_INFLIGHT,
+)
+repository = create_drone_repository(REPOSITORY_BACKEND, mongo_uri=MONGODB_URI, sqlite_path=SQLITE_PATH)
+status_writer = StatusWriter(
+    repository,
+    batch_size=STATUS_BATCH_SIZE,
+    flush_interval=STATUS_FLUSH_INTERVAL,
+    max_queue_size=STATUS_QUEUE_SIZE,
+)
+
+change_detector = ChangeDetector(heartbeat_interval=STATUS_HEARTBEAT_INTERVAL) if STATUS_HEARTBEAT_INTERVAL > 0 else None
 
 # Initialize MQTT handler
-mqtt_handler = MQTTHandler(mqtt_client, COMMAND_TOPIC, STATUS_TOPIC, repository)
+mqtt_handler = MQTTHandler(mqtt_client, COMMAND_TOPIC, STATUS_TOPIC, repository, status_writer=status_writer,
+                           codec=get_codec(MQTT_CODEC), shard_plan=shard_plan, ack_topic=ACK_TOPIC,
+                           change_detector=change_detector, publisher=mqtt_publisher,
+                           outbox_topic=OUTBOX_TOPIC if shard_plan.sharded and COMMAND_OUTBOX_ENABLED else None)
+
+
+# Initialize drone state cache and DroneCommandService
+if 0 < STATUS_HEARTBEAT_INTERVAL and DRONE_CACHE_TTL <= STATUS_HEARTBEAT_INTERVAL:
+    logging.warning("DRONE_CACHE_TTL (%ss) is not longer than STATUS_HEARTBEAT_INTERVAL (%ss): "
+                    "steady drones will expire from the cache between heartbeats", DRONE_CACHE_TTL, STATUS_HEARTBEAT_INTERVAL)
+drone_cache = DroneStateCache(max_size=DRONE_CACHE_SIZE, ttl=DRONE_CACHE_TTL)
+status_broadcaster = StatusBroadcaster(max_pending=STREAM_MAX_PENDING)
+mqtt_handler.add_status_listener(status_broadcaster.publish)
+stream_codec = get_codec()
+
+history_repository = DroneHistoryRepository(MONGODB_URI, bucket_seconds=HISTORY_BUCKET_SECONDS, bucket_size=HISTORY_BUCKET_SIZE)
+history_recorder = HistoryRecorder(history_repository, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL)
+if HISTORY_ENABLED:
+    mqtt_handler.add_status_listener(history_recorder.record)
 
+command_tracker = CommandTracker(ack_timeout=COMMAND_ACK_TIMEOUT)
+spatial_index = SpatialIndex(cell_size=SPATIAL_CELL_SIZE)
+# A sharded worker only tracks the drones whose status messages it receives. A share
+# group without partitions spreads every drone over the workers, so none can track it.
+liveness_monitor = None
+if LIVENESS_TIMEOUT > 0 and shard_plan.share_group and not shard_plan.partitions:
+    logging.warning("Liveness monitoring is disabled: MQTT_SHARE_GROUP requires MQTT_STATUS_PARTITIONS to track drones")
+elif LIVENESS_TIMEOUT > 0:
+    liveness_monitor = LivenessMonitor(timeout=LIVENESS_TIMEOUT, tick=LIVENESS_TICK,
+                                       owns=shard_plan.owns if shard_plan.sharded else None)
+# Offline drones are detected by the liveness monitor, so the outbox needs it
+outbox_repository = CommandOutboxRepository(MONGODB_URI) if REPOSITORY_BACKEND == "mongo" else None
+command_outbox = CommandOutbox(outbox_repository, ttl=COMMAND_OUTBOX_TTL, max_attempts=COMMAND_OUTBOX_MAX_ATTEMPTS,
+                               owns=shard_plan.owns if shard_plan.sharded else None) if COMMAND_OUTBOX_ENABLED and liveness_monitor is not None else None
+fleet_stats = FleetStats(repository, reconcile_interval=FLEET_STATS_RECONCILE_INTERVAL, batch_size=WARMUP_BATCH_SIZE,
+                         settle=max(1.0, 2 * STATUS_FLUSH_INTERVAL))
+drone_command_service = drone_command_service.DroneCommandService(drone_repository=repository, mqtt_handler=mqtt_handler, drone_cache=drone_cache,
+                                                                  command_tracker=command_tracker, publisher=mqtt_publisher,
+                                                                  spatial_index=spatial_index, liveness_monitor=liveness_monitor,
+                                                                  command_outbox=command_outbox, fleet_stats=fleet_stats)
+fleet_warmup = FleetWarmup(repository, drone_cache=drone_cache, spatial_index=spatial_index, snapshot_path=SNAPSHOT_PATH,
+                           snapshot_max_age=SNAPSHOT_MAX_AGE, batch_size=WARMUP_BATCH_SIZE, liveness_monitor=liveness_monitor,
+                           fleet_stats=fleet_stats)
+snapshot_writer = SnapshotWriter(repository, SNAPSHOT_PATH, interval=SNAPSHOT_INTERVAL,
+                                 batch_size=WARMUP_BATCH_SIZE) if SNAPSHOT_PATH else None
 
-# Initialize DroneCommandService
-drone_command_service = drone_command_service.DroneCommandService(drone_repository=repository, mqtt_handler=mqtt_handler)
+# Gauges read at scrape time
+Gauge("drone_api_drone_cache_size", "Drones in the state cache.").set_function(lambda: len(drone_cache))
+Gauge("drone_api_status_queue_depth", "Status documents waiting to be written.").set_function(lambda: status_writer.queue_depth)
+Gauge("drone_api_pending_commands", "Commands waiting for a drone ack.").set_function(lambda: len(command_tracker))
+Gauge("drone_api_mqtt_publish_queue_depth", "Outbound MQTT messages waiting to be published.").set_function(lambda: mqtt_publisher.queue_depth)
+Gauge("drone_api_mqtt_inflight", "Published QoS 1/2 messages not yet acknowledged by the broker.").set_function(lambda: mqtt_publisher.inflight)
+Gauge("drone_api_spatial_index_size", "Drones with a known position in the spatial index.").set_function(lambda: len(spatial_index))
+Gauge("drone_api_liveness_tracked_drones", "Drones tracked by the liveness monitor.").set_function(
+    lambda: len(liveness_monitor) if liveness_monitor is not None else 0)
+Gauge("drone_api_outbox_queued_commands", "Commands queued for offline drones.").set_function(
+    lambda: len(command_outbox) if command_outbox is not None else 0)
+Gauge("drone_api_stream_subscribers", "Live status stream subscribers.").set_function(lambda: len(status_broadcaster))
 
 
 # region Response definition
@@ -40,36 +237,226 @@ class DroneStatusResponse(BaseModel):
 
 class DroneCommandResponse(BaseModel):
     message: str
+
+class FleetStatusItem(BaseModel):
+    drone_id: str
+    dock_id: Optional[str] = None
+    drone_status: DroneStatus
+
+class FleetStatusResponse(BaseModel):
+    drones: List[FleetStatusItem]
+    next_cursor: Optional[str] = None
+
+class FleetCommand(BaseModel):
+    drone_id: str
+    command: str
+
+class FleetCommandRequest(BaseModel):
+    commands: List[FleetCommand]
+
+class FleetCommandResult(BaseModel):
+    drone_id: str
+    command: str
+    success: bool
+    message: str
+
+class FleetCommandResponse(BaseModel):
+    results: List[FleetCommandResult]
+
+class DronePosition(BaseModel):
+    drone_id: str
+    latitude: float
+    longitude: float
+    altitude: Optional[float] = None
+    distance_m: Optional[float] = None
+
+class DronePositionsResponse(BaseModel):
+    drones: List[DronePosition]
+
+class GeofenceRequest(BaseModel):
+    polygon: List[Tuple[float, float]]
+
+class LogLevelRequest(BaseModel):
+    level: str
+    logger: Optional[str] = None
 # endregion
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
-    Start the MQTT client.
+    Ensure the database indexes, then start the status writer and the MQTT client.
     """
+    await repository.ensure_indexes()
+    status_writer.start()
+    if HISTORY_ENABLED:
+        await history_repository.ensure_indexes()
+        history_recorder.start()
+    if command_outbox is not None:
+        if outbox_repository is not None:
+            await outbox_repository.ensure_indexes()
+        await command_outbox.load()
+    # Load the fleet state in the background; /ready reports 503 until it is warm
+    warmup = asyncio.create_task(fleet_warmup.run())
+    if snapshot_writer is not None:
+        snapshot_writer.start()
+    if liveness_monitor is not None:
+        liveness_monitor.start()
+    if FLEET_STATS_RECONCILE_INTERVAL > 0:
+        fleet_stats.start()
     await mqtt_handler.connect()
     #logging.info(f"Connected to MQTT broker at {MQTT_HOST}:{MQTT_PORT}")
     mqtt_handler.subscribe_to_topics()
+    mqtt_publisher.start()
     
     yield
     #mqtt_client.unsubscribe(COMMAND_TOPIC)
     #logging.info(f"Unsubscribed from topic {COMMAND_TOPIC}")
+    if command_outbox is not None:
+        await command_outbox.stop()
+    await mqtt_publisher.stop()
+    warmup.cancel()
+    await fleet_stats.stop()
+    if liveness_monitor is not None:
+        await liveness_monitor.stop()
     await mqtt_client.disconnect()
     logging.info("Disconnected from MQTT broker")
+    await status_writer.stop()
+    if HISTORY_ENABLED:
+        await history_recorder.stop()
+    logging.info("Flushed pending drone status updates")
+    if snapshot_writer is not None:
+        await snapshot_writer.stop()
+    if outbox_repository is not None:
+        await outbox_repository.close()
+    await repository.close()
+    logging_pipeline.stop()
     
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=CodecJSONResponse)
+app.add_middleware(RouteLatencyMiddleware)
 app.title = "Drone Command API"
 app.description = "API for controlling drones and retrieving their status."
 app.version = "1.0.0"
 router = APIRouter()
 
-@router.get("/drones/{drone_id}/status")
+@router.get("/drones/status", response_model=FleetStatusResponse)
+async def get_fleet_status(ids: Optional[List[str]] = Query(None), drone_status: Optional[DroneStatus] = Query(None, alias="status"),
+                           dock_id: Optional[str] = None,
+                           limit: int = Query(FLEET_STATUS_PAGE_SIZE, gt=0, le=FLEET_STATUS_MAX_PAGE_SIZE),
+                           cursor: Optional[str] = None):
+    """
+    Look up several drones at once. `ids` may be repeated or comma separated.
+    Without `ids`, drones are returned `limit` at a time in drone_id order; pass
+    the returned `next_cursor` as `cursor` to get the next page.
+    """
+    drone_ids = [drone_id for value in ids for drone_id in value.split(",") if drone_id] if ids else None
+    if drone_ids is not None and len(drone_ids) > limit:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {limit} drone IDs per request")
+    try:
+        drones = await drone_command_service.get_statuses(drone_ids, status=drone_status, dock_id=dock_id,
+                                                          after=cursor, limit=limit)
+        next_cursor = drones[-1].drone_id if drone_ids is None and len(drones) == limit else None
+        return CodecJSONResponse({"drones": [
+            {"drone_id": drone.drone_id, "dock_id": drone.dock_id, "drone_status": drone.status.value} for drone in drones
+        ], "next_cursor": next_cursor})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Request timed out")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/drones/stream")
+async def stream_drone_status(ids: Optional[List[str]] = Query(None), drone_status: Optional[DroneStatus] = Query(None, alias="status")):
+    """
+    Server-sent events stream of status updates, optionally filtered by drone IDs and current status.
+    """
+    drone_ids = [drone_id for value in ids for drone_id in value.split(",") if drone_id] if ids else None
+    subscription = status_broadcaster.subscribe(drone_ids, status=drone_status)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    updates = await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(b"data: " + stream_codec.encode(update) + b"\n\n" for update in updates)
+        finally:
+            status_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/drones/{drone_id}/history")
+async def get_drone_history(drone_id: str, start: datetime = Query(..., alias="from"), end: Optional[datetime] = Query(None, alias="to"),
+                            downsample: Optional[float] = Query(None, gt=0)):
+    """
+    Stream the status history of a drone as newline-delimited JSON.
+    `downsample` (seconds) keeps at most one sample per interval.
+    """
+    if not HISTORY_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Telemetry history is disabled")
+    # Stored sample times are naive UTC; without `to` the range ends at the latest sample
+    samples = history_repository.find_range(drone_id, parse_timestamp(start),
+                                            parse_timestamp(end) if end is not None else None, downsample=downsample)
+
+    async def lines():
+        async for sample in samples:
+            yield stream_codec.encode(sample) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/drones/nearby", response_model=DronePositionsResponse)
+async def get_nearby_drones(radius: float = Query(..., gt=0), latitude: Optional[float] = None,
+                            longitude: Optional[float] = None, dock_id: Optional[str] = None):
+    """
+    Drones within `radius` meters of a point, or of a dock from DOCK_LOCATIONS, nearest first.
+    """
+    if dock_id is not None:
+        if dock_id not in DOCK_LOCATIONS:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown dock location: {dock_id}")
+        latitude, longitude = DOCK_LOCATIONS[dock_id]
+    elif latitude is None or longitude is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Either latitude and longitude or dock_id is required")
+    try:
+        drones = await drone_command_service.find_nearby(latitude, longitude, radius)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return CodecJSONResponse({"drones": drones})
+
+
+@router.post("/drones/within", response_model=DronePositionsResponse)
+async def get_drones_within(request: GeofenceRequest):
+    """
+    Drones inside a geofence polygon given as [latitude, longitude] vertices.
+    """
+    try:
+        drones = await drone_command_service.find_in_polygon(request.polygon)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    return CodecJSONResponse({"drones": drones})
+
+
+@router.post("/drones/commands")
+async def execute_fleet_commands(request: FleetCommandRequest):
+    """
+    Send commands to several drones concurrently and report the result per drone.
+    """
+    results = await drone_command_service.execute_commands(
+        [(item.drone_id, item.command) for item in request.commands],
+        concurrency=FLEET_COMMAND_CONCURRENCY,
+    )
+    return FleetCommandResponse(results=results)
+
+
+@router.get("/drones/{drone_id}/status", response_model=DroneStatusResponse)
 async def get_drone_status(drone_id: str):
     
     try:
         result = await drone_command_service.get_status(drone_id)
-        return DroneStatusResponse(drone_id=drone_id, drone_status=result)
+        return CodecJSONResponse({"drone_id": drone_id, "drone_status": result.value})
     except ValueError as ve:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
     except asyncio.TimeoutError:
@@ -79,12 +466,16 @@ async def get_drone_status(drone_id: str):
 
 
 @router.post("/drones/{drone_id}/takeoff")
-async def takeoff_drone(drone_id: str):
+async def takeoff_drone(drone_id: str, wait: bool = False, timeout: Optional[float] = None, ttl: Optional[float] = None,
+                       idempotency_key: Optional[str] = Header(None)):
     
     try:
         logging.info("takeoff start.")
-        result = await drone_command_service.execute_takeoff(drone_id=drone_id)
+        result = await drone_command_service.execute_takeoff(drone_id=drone_id, wait=wait, timeout=timeout,
+                                                             idempotency_key=idempotency_key, ttl=ttl)
         return DroneCommandResponse(message=result)
+    except (CommandInFlightError, InvalidTransitionError, ConcurrentUpdateError) as ce:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(ce))
     except ValueError as ve:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
     except asyncio.TimeoutError:
@@ -94,11 +485,15 @@ async def takeoff_drone(drone_id: str):
 
 
 @router.post("/drones/{drone_id}/land")
-async def land_drone(drone_id: str):
+async def land_drone(drone_id: str, wait: bool = False, timeout: Optional[float] = None, ttl: Optional[float] = None,
+                    idempotency_key: Optional[str] = Header(None)):
     
     try:
-        result = await drone_command_service.execute_land(drone_id=drone_id)
+        result = await drone_command_service.execute_land(drone_id=drone_id, wait=wait, timeout=timeout,
+                                                          idempotency_key=idempotency_key, ttl=ttl)
         return DroneCommandResponse(message=result)
+    except (CommandInFlightError, InvalidTransitionError, ConcurrentUpdateError) as ce:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(ce))
     except ValueError as ve:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
     except asyncio.TimeoutError:
@@ -108,11 +503,15 @@ async def land_drone(drone_id: str):
 
 
 @router.post("/drones/{drone_id}/return-home")
-async def return_home(drone_id: str):
+async def return_home(drone_id: str, wait: bool = False, timeout: Optional[float] = None, ttl: Optional[float] = None,
+                     idempotency_key: Optional[str] = Header(None)):
     
     try:
-        result = await drone_command_service.execute_return_home(drone_id=drone_id)
+        result = await drone_command_service.execute_return_home(drone_id=drone_id, wait=wait, timeout=timeout,
+                                                                 idempotency_key=idempotency_key, ttl=ttl)
         return DroneCommandResponse(message=result)
+    except (CommandInFlightError, InvalidTransitionError, ConcurrentUpdateError) as ce:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(ce))
     except ValueError as ve:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
     except asyncio.TimeoutError:
@@ -120,6 +519,125 @@ async def return_home(drone_id: str):
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+
+@router.get("/drones/{drone_id}/commands/queued")
+async def get_queued_commands(drone_id: str):
+    """
+    Commands queued for an offline drone, in delivery order.
+    """
+    if command_outbox is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The command outbox is disabled")
+    return {"drone_id": drone_id, "commands": [
+        {"command": entry.command, "idempotency_key": entry.idempotency_key, "attempts": entry.attempts,
+         "queued_at": datetime.fromtimestamp(entry.created_at).isoformat(timespec="seconds"),
+         "expires_at": datetime.fromtimestamp(entry.expires_at).isoformat(timespec="seconds")}
+        for entry in command_outbox.pending_for(drone_id)
+    ]}
+
+
+@router.get("/fleet/summary")
+async def fleet_summary():
+    """
+    Drone counts per status and per dock, from counters kept up to date by telemetry.
+    """
+    if not fleet_stats.ready:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="The fleet state is still loading")
+    return fleet_stats.summary()
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 503 until the fleet state has been loaded.
+    """
+    if not fleet_warmup.ready:
+        return CodecJSONResponse(fleet_warmup.metrics(), status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return fleet_warmup.metrics()
+
+
+@router.get("/admin/log-level")
+async def get_log_level(logger: Optional[str] = None):
+    return {"logger": logger or "root", "level": logging_pipeline.get_level(logger)}
+
+
+@router.put("/admin/log-level")
+async def set_log_level(request: LogLevelRequest):
+    """
+    Change the level of the root logger, or of a named logger, without a restart.
+    """
+    try:
+        level = logging_pipeline.set_level(request.level, request.logger)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+    logging.warning("Log level of %s set to %s", request.logger or "root", level)
+    return {"logger": request.logger or "root", "level": level}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=REGISTRY.content_type)
+
+
+@router.get("/metrics/status-writer")
+async def status_writer_metrics():
+    return status_writer.metrics()
+
+
+@router.get("/metrics/drone-cache")
+async def drone_cache_metrics():
+    return drone_cache.metrics()
+
+
+@router.get("/metrics/drone-loader")
+async def drone_loader_metrics():
+    return drone_command_service.drone_loader.metrics()
+
+
+@router.get("/metrics/command-lanes")
+async def command_lanes_metrics():
+    return drone_command_service.command_lanes.metrics()
+
+
+@router.get("/metrics/command-outbox")
+async def command_outbox_metrics():
+    if command_outbox is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The command outbox is disabled")
+    return command_outbox.metrics()
+
+
+@router.get("/metrics/fleet-stats")
+async def fleet_stats_metrics():
+    return fleet_stats.metrics()
+
+
+@router.get("/metrics/logging")
+async def logging_metrics():
+    return logging_pipeline.metrics()
+
+
+@router.get("/metrics/mqtt-publisher")
+async def mqtt_publisher_metrics():
+    return mqtt_publisher.metrics()
+
+
+@router.get("/metrics/snapshot")
+async def snapshot_metrics():
+    if snapshot_writer is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fleet snapshots are disabled")
+    return snapshot_writer.metrics()
+
+
+@router.get("/metrics/liveness")
+async def liveness_metrics():
+    if liveness_monitor is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Liveness monitoring is disabled")
+    return liveness_monitor.metrics()
+
+
+@router.get("/metrics/commands")
+async def command_metrics():
+    return command_tracker.metrics()
+
 app.include_router(router)
 
 if __name__ == "__main__":
@@ -7,4 +7,10 @@ mongosh -- "$MONGO_INITDB_DATABASE" <<EOF
   var _passwd = "$MONGO_INITDB_PASSWORD";
   database.createUser({user: _user, pwd: _passwd, roles: [ {role: "dbOwner", db: "$MONGO_INITDB_DATABASE"} ]});
   database.createCollection('drones');
+  database.drones.createIndex({drone_id: 1}, {unique: true, name: "drone_id_unique"});
+  database.drones.createIndex({status: 1}, {name: "status"});
+  database.drones.createIndex({dock_id: 1}, {name: "dock_id"});
+  database.drones.createIndex({location: "2dsphere"}, {name: "location_2dsphere"});
+  database.command_outbox.createIndex({expires_at: 1}, {expireAfterSeconds: 0, name: "expires_at_ttl"});
+  database.command_outbox.createIndex({idempotency_key: 1}, {unique: true, name: "idempotency_key_unique", partialFilterExpression: {idempotency_key: {\$type: "string"}}});
 EOF
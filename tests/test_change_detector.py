@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch
+from infrastructure.change_detector import ChangeDetector
+
+
+class TestChangeDetector(unittest.TestCase):
+    def test_drops_unchanged_status_until_heartbeat(self):
+        """
+        Test that repeats are dropped and let through again once the heartbeat interval elapses.
+        """
+        detector = ChangeDetector(heartbeat_interval=10)
+        with patch("infrastructure.change_detector.time.monotonic", return_value=100.0):
+            self.assertTrue(detector.should_process("drone-1", "flying", None))
+            self.assertFalse(detector.should_process("drone-1", "flying", None))
+        with patch("infrastructure.change_detector.time.monotonic", return_value=110.0):
+            self.assertTrue(detector.should_process("drone-1", "flying", None))
+        self.assertEqual((detector.passed, detector.dropped), (2, 1))
+
+    def test_transitions_are_immediate(self):
+        """
+        Test that a status or dock change is processed right away.
+        """
+        detector = ChangeDetector(heartbeat_interval=10)
+        self.assertTrue(detector.should_process("drone-1", "flying", None))
+        self.assertTrue(detector.should_process("drone-1", "returning", None))
+        self.assertTrue(detector.should_process("drone-1", "docked", "dock-1"))
+        self.assertTrue(detector.should_process("drone-1", "docked", "dock-2"))
+        self.assertTrue(detector.should_process("drone-2", "docked", "dock-2"))
+
+    def test_position_changes_are_processed(self):
+        """
+        Test that a moving drone is processed even when its status stays the same.
+        """
+        detector = ChangeDetector(heartbeat_interval=10)
+        self.assertTrue(detector.should_process("drone-1", "flying", None, (52.0, 4.0, 100.0)))
+        self.assertTrue(detector.should_process("drone-1", "flying", None, (52.001, 4.0, 100.0)))
+        self.assertFalse(detector.should_process("drone-1", "flying", None, (52.001, 4.0, 100.0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
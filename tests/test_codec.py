@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime
+from domain.drone import DroneStatus
+from infrastructure.codec import JsonCodec, get_codec, orjson
+
+
+class TestCodec(unittest.TestCase):
+    def test_json_round_trip(self):
+        """
+        Test that the stdlib codec encodes enums and timestamps used in drone payloads.
+        """
+        codec = JsonCodec()
+        payload = codec.encode({"drone_id": "drone-1", "status": DroneStatus.FLYING,
+                                "last_updated": datetime(2025, 4, 5, 13, 28, 28)})
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(codec.decode(payload), {"drone_id": "drone-1", "status": "flying",
+                                                 "last_updated": "2025-04-05T13:28:28"})
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_matches_stdlib(self):
+        """
+        Test that the orjson codec produces the same wire format as the stdlib codec.
+        """
+        message = {"drone_id": "drone-1", "dock_id": None, "status": DroneStatus.DOCKED,
+                   "timestamp": datetime(2025, 1, 1, 1, 1, 1, 123456)}
+        self.assertEqual(get_codec("orjson").encode(message), JsonCodec().encode(message))
+
+    def test_unknown_codec(self):
+        """
+        Test that an unknown codec name is rejected.
+        """
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
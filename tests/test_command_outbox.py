@@ -0,0 +1,224 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from domain.drone import Drone, DroneStatus, InvalidTransitionError
+from infrastructure.liveness import LivenessMonitor
+from infrastructure.mqtt_handler import MQTTHandler
+from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+from infrastructure.sharding import ShardPlan, partition_for
+from infrastructure.status_writer import StatusWriter
+from application.command_outbox import CommandOutbox, QueuedCommand
+from application.command_tracker import CommandTracker
+from application.drone_command_service import DroneCommandService
+
+
+class TestCommandOutbox(unittest.IsolatedAsyncioTestCase):
+    async def test_priority_idempotency_and_expiry(self):
+        """
+        Test that return-home is delivered first, repeated keys are not queued twice and expired commands are skipped.
+        """
+        outbox = CommandOutbox(ttl=60)
+        delivered = []
+
+        async def handler(entry, reported):
+            delivered.append(entry.command)
+
+        outbox.set_handler(handler)
+        await outbox.enqueue("drone-1", "takeoff", idempotency_key="key-1")
+        await outbox.enqueue("drone-1", "land", ttl=0)
+        await outbox.enqueue("drone-1", "return-home")
+        _, added = await outbox.enqueue("drone-1", "takeoff", idempotency_key="key-1")
+        self.assertFalse(added)
+        with self.assertRaises(ValueError):
+            await outbox.enqueue("drone-2", "land", idempotency_key="key-1")
+
+        outbox.notify(Drone("drone-1"))
+        await asyncio.gather(*outbox._draining.values())
+
+        self.assertEqual(delivered, ["return-home", "takeoff"])
+        self.assertEqual((len(outbox), outbox.expired, outbox.duplicates), (0, 1, 1))
+        self.assertNotIn("drone-1", outbox)
+
+    async def test_unacknowledged_command_stays_queued(self):
+        outbox = CommandOutbox(max_attempts=2)
+        outbox.set_handler(MagicMock(side_effect=asyncio.TimeoutError()))
+        await outbox.enqueue("drone-1", "return-home")
+
+        outbox.notify(Drone("drone-1"))
+        await asyncio.gather(*outbox._draining.values())
+        self.assertEqual(len(outbox.pending_for("drone-1")), 1)
+
+        outbox.notify(Drone("drone-1"))
+        await asyncio.gather(*outbox._draining.values())
+        self.assertEqual((len(outbox), outbox.rejected), (0, 1))
+
+    async def test_load_skips_commands_for_drones_owned_by_another_worker(self):
+        """
+        Test that a worker only loads the stored commands of drones it owns, so no command is delivered twice.
+        """
+        now = time.time()
+        documents = [QueuedCommand(f"entry-{drone_id}", drone_id, "land", 1, f"key-{drone_id}", now, now + 60).to_dict()
+                     for drone_id in ("drone-1", "drone-2")]
+
+        class Store:
+            async def find_unexpired(self, at):
+                for document in documents:
+                    yield document
+
+        outbox = CommandOutbox(store=Store(), owns=lambda drone_id: drone_id == "drone-1")
+        await outbox.load()
+
+        self.assertIn("drone-1", outbox)
+        self.assertNotIn("drone-2", outbox)
+        self.assertEqual(len(outbox), 1)
+        _, added = await outbox.enqueue("drone-2", "land", idempotency_key="key-drone-2")
+        self.assertFalse(added)
+
+    async def test_command_rejected_by_a_lost_drone_stays_queued(self):
+        outbox = CommandOutbox()
+        outbox.set_handler(MagicMock(side_effect=InvalidTransitionError("drone-1", DroneStatus.LOST, DroneStatus.FLYING)))
+        await outbox.enqueue("drone-1", "takeoff")
+
+        outbox.notify(Drone("drone-1"))
+        await asyncio.gather(*outbox._draining.values())
+        self.assertEqual((len(outbox), outbox.retries), (1, 1))
+
+        outbox.set_handler(MagicMock(side_effect=InvalidTransitionError("drone-1", DroneStatus.FLYING, DroneStatus.FLYING)))
+        outbox.notify(Drone("drone-1"))
+        await asyncio.gather(*outbox._draining.values())
+        self.assertEqual((len(outbox), outbox.rejected), (0, 1))
+
+    async def test_command_queued_by_another_instance_is_returned(self):
+        """
+        Test that a key already stored by another instance returns the stored command, not an unstored one.
+        """
+        now = time.time()
+        stored = QueuedCommand("entry-1", "drone-1", "land", 1, "key-1", now, now + 60).to_dict()
+        store = MagicMock()
+        store.insert = AsyncMock(return_value=False)
+        store.find_by_key = AsyncMock(return_value=stored)
+        outbox = CommandOutbox(store=store)
+
+        entry, added = await outbox.enqueue("drone-1", "land", idempotency_key="key-1")
+        self.assertEqual((entry.entry_id, added, outbox.duplicates), ("entry-1", False, 1))
+        store.find_by_key.assert_awaited_once_with("key-1")
+        with self.assertRaises(ValueError):
+            await outbox.enqueue("drone-2", "land", idempotency_key="key-1")
+
+
+class TestOfflineDelivery(unittest.IsolatedAsyncioTestCase):
+    async def test_command_for_offline_drone_is_delivered_when_it_reports(self):
+        """
+        Test that a command to a silent drone is queued instead of published, and sent on its next status message.
+        """
+        repository = InMemoryDroneRepository()
+        await repository.save(Drone("drone-1", "dock-1", DroneStatus.LOST).to_dict())
+        mqtt_client = MagicMock()
+        handler = MQTTHandler(mqtt_client, "drone/command", "drone/status", repository)
+        outbox = CommandOutbox()
+        service = DroneCommandService(repository, handler, command_tracker=CommandTracker(ack_timeout=1),
+                                      liveness_monitor=LivenessMonitor(timeout=10), command_outbox=outbox)
+
+        message = await service.execute_return_home("drone-1", idempotency_key="key-1")
+        self.assertIn("queued", message)
+        self.assertIn("already queued", await service.execute_return_home("drone-1", idempotency_key="key-1"))
+        mqtt_client.publish.assert_not_called()
+
+        status = {"drone_id": "drone-1", "status": "flying", "last_updated": "2025-04-05T13:28:28"}
+        await handler.on_message(None, "drone/status", handler.codec.encode(status), 1, None)
+        await asyncio.sleep(0)
+        envelope = handler.codec.decode(mqtt_client.publish.call_args_list[0].args[1])
+        self.assertEqual(envelope["data"]["command"], "return-home")
+
+        ack = dict(status, tid=envelope["tid"], status="returning")
+        await handler.on_message(None, "drone/status", handler.codec.encode(ack), 1, None)
+        await asyncio.gather(*outbox._draining.values())
+        self.assertEqual((len(outbox), outbox.delivered), (0, 1))
+
+    async def test_command_is_validated_against_a_report_not_written_yet(self):
+        """
+        Test that a command queued for a lost drone is delivered on its next report while
+        the write-behind stage still holds that report and the stored drone is lost.
+        """
+        repository = InMemoryDroneRepository()
+        await repository.save(Drone("drone-1", "dock-1", DroneStatus.LOST, datetime(2025, 4, 5, 13, 0)).to_dict())
+        writer = StatusWriter(repository, flush_interval=0.2)
+        writer.start()
+        self.addAsyncCleanup(writer.stop)
+        mqtt_client = MagicMock()
+        handler = MQTTHandler(mqtt_client, "drone/command", "drone/status", repository, status_writer=writer)
+        outbox = CommandOutbox()
+        service = DroneCommandService(repository, handler, command_tracker=CommandTracker(ack_timeout=1),
+                                      liveness_monitor=LivenessMonitor(timeout=10), command_outbox=outbox)
+        self.assertIn("queued", await service.execute_takeoff("drone-1"))
+
+        status = {"drone_id": "drone-1", "dock_id": "dock-1", "status": "docked", "last_updated": "2025-04-05T13:28:28"}
+        await handler.on_message(None, "drone/status", handler.codec.encode(status), 1, None)
+        await asyncio.sleep(0)
+        envelope = handler.codec.decode(mqtt_client.publish.call_args_list[0].args[1])
+        self.assertEqual(envelope["data"]["command"], "takeoff")
+
+        ack = dict(status, tid=envelope["tid"], status="flying")
+        await handler.on_message(None, "drone/status", handler.codec.encode(ack), 1, None)
+        await asyncio.gather(*outbox._draining.values())
+        self.assertEqual((len(outbox), outbox.delivered, outbox.rejected), (0, 1, 0))
+
+    async def test_untracked_drone_is_online(self):
+        """
+        Test that a command to a drone the monitor does not track yet, e.g. before the warm-up, is sent.
+        """
+        repository = InMemoryDroneRepository()
+        await repository.save(Drone("drone-1", "dock-1", DroneStatus.DOCKED).to_dict())
+        mqtt_client = MagicMock()
+        handler = MQTTHandler(mqtt_client, "drone/command", "drone/status", repository)
+        outbox = CommandOutbox()
+        service = DroneCommandService(repository, handler, liveness_monitor=LivenessMonitor(timeout=10),
+                                      command_outbox=outbox)
+
+        self.assertIn("sent", await service.execute_takeoff("drone-1"))
+        self.assertEqual(len(outbox), 0)
+
+    async def test_command_queued_on_another_worker_is_delivered_by_the_owner(self):
+        """
+        Test that a worker not owning the drone forwards the queued command, and the owner delivers it.
+        """
+        repository = InMemoryDroneRepository()
+        await repository.save(Drone("drone-1", "dock-1", DroneStatus.LOST).to_dict())
+        owner_index = partition_for("drone-1", 2)
+
+        def worker(index):
+            mqtt_client = MagicMock()
+            plan = ShardPlan(partitions=2, worker_index=index, worker_count=2)
+            handler = MQTTHandler(mqtt_client, "drone/command", "drone/status", repository, shard_plan=plan,
+                                  outbox_topic="drone/outbox")
+            outbox = CommandOutbox(owns=plan.owns)
+            service = DroneCommandService(repository, handler, command_tracker=CommandTracker(ack_timeout=1),
+                                          liveness_monitor=LivenessMonitor(timeout=10, owns=plan.owns),
+                                          command_outbox=outbox)
+            return mqtt_client, handler, outbox, service
+
+        workers = [worker(index) for index in range(2)]
+        client, _, outbox, service = workers[1 - owner_index]
+        owner_client, owner_handler, owner_outbox, _ = workers[owner_index]
+
+        self.assertIn("queued", await service.execute_return_home("drone-1"))
+        topic, payload = client.publish.call_args.args[:2]
+        self.assertEqual((topic, outbox.forwarded), ("drone/outbox", 1))
+        self.assertEqual(outbox.pending_for("drone-1"), [])
+
+        for _, handler, _, _ in workers:
+            await handler.on_message(None, topic, payload, 1, None)
+        self.assertEqual(len(owner_outbox.pending_for("drone-1")), 1)
+
+        status = {"drone_id": "drone-1", "status": "flying", "last_updated": "2025-04-05T13:28:28"}
+        await owner_handler.on_message(None, f"drone/status/{owner_index}", owner_handler.codec.encode(status), 1, None)
+        await asyncio.sleep(0)
+        envelope = owner_handler.codec.decode(owner_client.publish.call_args_list[0].args[1])
+        self.assertEqual(envelope["data"]["command"], "return-home")
+        self.assertEqual(outbox.pending_for("drone-1"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import asyncio
+from application.command_tracker import CommandTracker, CommandInFlightError
+
+
+class TestCommandTracker(unittest.IsolatedAsyncioTestCase):
+    async def test_resolve_by_tid(self):
+        """
+        Test that an ack with the matching tid resolves the waiting command.
+        """
+        tracker = CommandTracker(ack_timeout=5)
+        pending = tracker.register("drone-1", "takeoff")
+        waiter = asyncio.create_task(tracker.wait(pending, timeout=1))
+        await asyncio.sleep(0)
+
+        self.assertTrue(tracker.resolve(str(pending.tid), {"status": "flying"}))
+        self.assertEqual(await waiter, {"status": "flying"})
+        self.assertEqual(len(tracker), 0)
+        self.assertEqual(tracker.metrics()["acked"], 1)
+        self.assertFalse(tracker.resolve(str(pending.tid), {"status": "flying"}))
+
+    async def test_rejects_overlapping_commands(self):
+        """
+        Test that a drone cannot receive a new command while one is unacknowledged.
+        """
+        tracker = CommandTracker(ack_timeout=5)
+        pending = tracker.register("drone-1", "takeoff")
+        with self.assertRaises(CommandInFlightError):
+            tracker.register("drone-1", "land")
+        tracker.register("drone-2", "land")
+
+        tracker.resolve(pending.tid, {})
+        tracker.register("drone-1", "land")
+
+    async def test_entries_expire(self):
+        """
+        Test that unacknowledged commands expire and release the drone.
+        """
+        tracker = CommandTracker(ack_timeout=0.01)
+        pending = tracker.register("drone-1", "takeoff")
+        with self.assertRaises(asyncio.TimeoutError):
+            await tracker.wait(pending)
+
+        self.assertEqual(len(tracker), 0)
+        self.assertEqual(tracker.expired, 1)
+        self.assertIsNone(tracker.pending_for("drone-1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
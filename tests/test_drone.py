@@ -1,30 +1,14 @@
 import unittest
-from unittest.mock import AsyncMock, MagicMock
 from datetime import datetime
-from domain.drone import Drone, DroneStatus
-import asyncio
+from domain.drone import Drone, DroneStatus, InvalidTransitionError
 
 class TestDrone(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         """
         Set up a test drone object before each test.
         """
-        # Mock MQTTClient
-        mqtt_client = MagicMock()
-        mqtt_client.connect = AsyncMock(return_value=None)  # Mock connect method
-        mqtt_client.publish = AsyncMock(return_value=None)  # Mock publish method
-
-        # Initialize Drone with mocked MQTT client
-        self.drone = asyncio.run(self._initialize_drone(mqtt_client))
-
-    async def _initialize_drone(self, mqtt_client):
-        """
-        Helper method to initialize the drone asynchronously.
-        """
-        return Drone(
+        self.drone = Drone(
             drone_id="drone-123",
-            mqtt_client=mqtt_client,
-            status_topic="drone/status",
             dock_id="dock-1",
             status=DroneStatus.IDLE
         )
@@ -63,6 +47,18 @@ class TestDrone(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(self.drone.status, DroneStatus.RETURNING)
         self.assertIsInstance(self.drone.last_updated, datetime)
 
+    async def test_invalid_transition(self):
+        """
+        Test that a command not allowed in the current status is rejected and leaves the drone unchanged.
+        """
+        self.drone.land()
+        with self.assertRaises(InvalidTransitionError) as context:
+            self.drone.land()
+        self.assertEqual((context.exception.current, context.exception.target), (DroneStatus.DOCKED, DroneStatus.DOCKED))
+        with self.assertRaises(InvalidTransitionError):
+            self.drone.return_home()
+        self.assertEqual(self.drone.status, DroneStatus.DOCKED)
+
     async def test_from_dict(self):
         """
         Test the from_dict class method.
@@ -79,6 +75,44 @@ class TestDrone(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(drone.status, DroneStatus.FLYING)
         self.assertIsInstance(drone.last_updated, datetime)
 
+    async def test_to_dict_round_trip(self):
+        """
+        Test that to_dict and from_dict preserve the drone state.
+        """
+        drone_data = {
+            "drone_id": "drone-456",
+            "dock_id": "dock-3",
+            "status": "RETURNING",
+            "last_updated": "2025-04-05T13:28:28"
+        }
+        drone = Drone.from_dict(drone_data)
+        self.assertEqual(drone.status, DroneStatus.RETURNING)
+        self.assertEqual(drone.last_updated, datetime(2025, 4, 5, 13, 28, 28))
+        self.assertEqual(drone.to_dict(), dict(drone_data, status="returning"))
+
+    async def test_from_dict_invalid_status(self):
+        """
+        Test that from_dict rejects an unknown status.
+        """
+        with self.assertRaises(ValueError):
+            Drone.from_dict({"drone_id": "drone-456", "status": "hovering"})
+
+    async def test_from_dict_normalizes_offsets_to_naive_utc(self):
+        """
+        Test that timestamps with an offset are converted to naive UTC and compare with naive ones.
+        """
+        drone = Drone.from_dict({"drone_id": "drone-456", "status": "flying", "last_updated": "2025-04-05T15:28:28+02:00"})
+        self.assertEqual(drone.last_updated, datetime(2025, 4, 5, 13, 28, 28))
+        drone = Drone.from_dict({"drone_id": "drone-456", "last_updated": "2025-04-05T13:28:28Z"})
+        self.assertEqual(drone.last_updated, datetime(2025, 4, 5, 13, 28, 28))
+        self.assertLess(datetime(2025, 4, 5, 13, 0), drone.last_updated)
+
+    async def test_slots(self):
+        """
+        Test that Drone instances do not carry a per-instance __dict__.
+        """
+        self.assertFalse(hasattr(self.drone, "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
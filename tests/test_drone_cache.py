@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+from domain.drone import Drone, DroneStatus
+from infrastructure.drone_cache import DroneStateCache
+
+
+def make_drone(drone_id: str) -> Drone:
+    return Drone(drone_id, dock_id="dock-1", status=DroneStatus.DOCKED)
+
+
+class TestDroneStateCache(unittest.TestCase):
+    def test_get_returns_latest_state(self):
+        """
+        Test that the cache serves the most recently stored drone.
+        """
+        cache = DroneStateCache(max_size=10, ttl=30)
+        cache.put(make_drone("drone-1"))
+        flying = make_drone("drone-1")
+        flying.status = DroneStatus.FLYING
+        cache.put(flying)
+
+        self.assertIs(cache.get("drone-1"), flying)
+        self.assertIsNone(cache.get("drone-2"))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used drone is evicted once the cache is full.
+        """
+        cache = DroneStateCache(max_size=2, ttl=30)
+        cache.put(make_drone("drone-1"))
+        cache.put(make_drone("drone-2"))
+        cache.get("drone-1")
+        cache.put(make_drone("drone-3"))
+
+        self.assertIsNotNone(cache.get("drone-1"))
+        self.assertIsNone(cache.get("drone-2"))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_stale_entries_expire(self):
+        """
+        Test that entries older than the staleness bound are treated as missing.
+        """
+        cache = DroneStateCache(max_size=10, ttl=5)
+        with patch("infrastructure.drone_cache.time.monotonic", return_value=100.0):
+            cache.put(make_drone("drone-1"))
+        with patch("infrastructure.drone_cache.time.monotonic", return_value=106.0):
+            self.assertIsNone(cache.get("drone-1"))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from domain.drone import Drone, DroneStatus, InvalidTransitionError
+from infrastructure.change_detector import ChangeDetector
+from infrastructure.drone_cache import DroneStateCache
+from infrastructure.mqtt_handler import MQTTHandler
+from infrastructure.sharding import ShardPlan
+from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+from application.drone_command_service import ConcurrentUpdateError, DroneCommandService
+
+
+def make_drone(drone_id: str, status: DroneStatus = DroneStatus.DOCKED, dock_id: str = "dock-1") -> Drone:
+    return Drone(drone_id, dock_id=dock_id, status=status)
+
+
+class TestDroneCommandService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """
+        Set up a command service with a mocked repository and MQTT client.
+        """
+        self.repository = MagicMock()
+        self.repository.find_many = AsyncMock(return_value=[])
+        self.mqtt_client = MagicMock()
+        self.mqtt_handler = MQTTHandler(self.mqtt_client, "drone/command", "drone/status", self.repository)
+        self.cache = DroneStateCache(max_size=100, ttl=30)
+        self.service = DroneCommandService(self.repository, self.mqtt_handler, drone_cache=self.cache)
+
+    async def test_get_statuses_queries_only_cache_misses(self):
+        """
+        Test that cached drones are served from memory and misses are loaded in one query.
+        """
+        self.cache.put(make_drone("drone-1"))
+        self.repository.find_many.return_value = [make_drone("drone-2", DroneStatus.FLYING)]
+
+        drones = await self.service.get_statuses(["drone-1", "drone-2", "drone-3"])
+
+        self.repository.find_many.assert_awaited_once_with(["drone-2", "drone-3"])
+        self.assertEqual([drone.drone_id for drone in drones], ["drone-1", "drone-2"])
+        self.assertIsNotNone(self.cache.get("drone-2"))
+
+    async def test_get_statuses_applies_filters(self):
+        """
+        Test that status and dock filters are applied to cached drones.
+        """
+        self.cache.put(make_drone("drone-1", DroneStatus.FLYING))
+        self.cache.put(make_drone("drone-2", DroneStatus.DOCKED))
+
+        drones = await self.service.get_statuses(["drone-1", "drone-2"], status=DroneStatus.FLYING)
+
+        self.assertEqual([drone.drone_id for drone in drones], ["drone-1"])
+        self.repository.find_many.assert_not_awaited()
+
+    async def test_execute_commands_reports_per_drone_results(self):
+        """
+        Test that fleet commands return one result per drone, including failures.
+        """
+        drone = make_drone("drone-1", DroneStatus.FLYING)
+        drone.version = 1
+
+        async def find_by_id(drone_id):
+            if drone_id != "drone-1":
+                raise ValueError(f"Drone with ID {drone_id} not found")
+            return drone
+
+        self.repository.find_by_id = AsyncMock(side_effect=find_by_id)
+        self.repository.compare_and_set = AsyncMock(return_value=True)
+
+        results = await self.service.execute_commands([
+            ("drone-1", "return-home"),
+            ("drone-2", "return-home"),
+            ("drone-1", "hover"),
+        ], concurrency=2)
+
+        self.assertEqual([result["success"] for result in results], [True, False, False])
+        self.assertEqual(results[1]["message"], "Drone with ID drone-2 not found")
+        self.assertEqual(results[2]["message"], "Unknown command: hover")
+        topics = [call.args[0] for call in self.mqtt_client.publish.call_args_list]
+        self.assertEqual(topics, ["drone/command", "drone/status"])
+
+    async def test_wait_for_ack(self):
+        """
+        Test that a command waits for the status message carrying its tid.
+        """
+        self.repository.find_by_id = AsyncMock(return_value=make_drone("drone-1", DroneStatus.FLYING))
+        self.repository.compare_and_set = AsyncMock(return_value=True)
+        self.repository.save = AsyncMock(return_value=None)
+        command = asyncio.create_task(self.service.execute_return_home("drone-1", wait=True, timeout=1))
+        await asyncio.sleep(0)
+
+        envelope = self.mqtt_handler.codec.decode(self.mqtt_client.publish.call_args_list[0].args[1])
+        self.assertEqual(envelope["data"], {"drone_id": "drone-1", "command": "return-home", "dock_id": "dock-1"})
+        ack = {"tid": envelope["tid"], "drone_id": "drone-1", "status": "returning", "last_updated": "2025-04-05T13:28:28"}
+        await self.mqtt_handler.on_message(None, "drone/status", self.mqtt_handler.codec.encode(ack), 1, None)
+
+        self.assertIn("return_home command acknowledged by Drone drone-1", await command)
+        self.assertEqual(self.cache.get("drone-1").status, DroneStatus.RETURNING)
+
+    async def test_status_ack_is_relayed_to_the_issuing_worker(self):
+        """
+        Test that a worker receiving the status ack of another worker's command relays it on the unshared ack topic.
+        """
+        def worker(index):
+            mqtt_client = MagicMock()
+            handler = MQTTHandler(mqtt_client, "drone/command", "drone/status", self.repository, ack_topic="drone/ack",
+                                  shard_plan=ShardPlan(partitions=2, worker_index=index, worker_count=2, share_group="ingest"))
+            return mqtt_client, handler, DroneCommandService(self.repository, handler)
+
+        client_a, handler_a, service_a = worker(0)
+        client_b, handler_b, _ = worker(1)
+        handler_b.subscribe_to_topics()
+        self.assertIn("drone/ack", [call.args[0] for call in client_b.subscribe.call_args_list])
+
+        self.repository.find_by_id = AsyncMock(return_value=make_drone("drone-1", DroneStatus.FLYING))
+        self.repository.compare_and_set = AsyncMock(return_value=True)
+        self.repository.save = AsyncMock(return_value=None)
+        command = asyncio.create_task(service_a.execute_return_home("drone-1", wait=True, timeout=1))
+        while not client_a.publish.called:
+            await asyncio.sleep(0)
+
+        envelope = handler_a.codec.decode(client_a.publish.call_args_list[0].args[1])
+        ack = {"tid": envelope["tid"], "drone_id": "drone-1", "status": "returning", "last_updated": "2025-04-05T13:28:28"}
+        await handler_b.on_message(None, "drone/status/1", handler_b.codec.encode(ack), 1, None)
+        topic, payload = client_b.publish.call_args.args[:2]
+        self.assertEqual(topic, "drone/ack")
+        self.assertEqual((client_b.publish.call_args.kwargs["qos"], handler_b.publisher.published), (1, 1))
+
+        await handler_a.on_message(None, topic, payload, 1, None)
+        self.assertIn("return_home command acknowledged by Drone drone-1", await command)
+
+
+class TestCommandConcurrency(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.repository = InMemoryDroneRepository()
+        await self.repository.save(make_drone("drone-1").to_dict())
+        self.mqtt_client = MagicMock()
+        self.mqtt_handler = MQTTHandler(self.mqtt_client, "drone/command", "drone/status", self.repository)
+        self.service = DroneCommandService(self.repository, self.mqtt_handler, drone_cache=DroneStateCache())
+
+    async def test_command_retries_after_a_concurrent_write(self):
+        """
+        Test that a telemetry write between the read and the write of a command makes
+        the command re-validate against the new state instead of overwriting it.
+        """
+        find_by_id = self.repository.find_by_id
+
+        async def find_then_report(drone_id):
+            drone = await find_by_id(drone_id)
+            if drone.version == 1:
+                await self.repository.save(make_drone(drone_id, DroneStatus.FLYING).to_dict())
+            return drone
+
+        self.repository.find_by_id = find_then_report
+        with self.assertRaises(InvalidTransitionError):
+            await self.service.execute_takeoff("drone-1")
+
+        drone = await find_by_id("drone-1")
+        self.assertEqual((drone.status, drone.version), (DroneStatus.FLYING, 2))
+        self.mqtt_client.publish.assert_not_called()
+        self.assertEqual(len(self.service.command_tracker), 0)
+
+    async def test_report_of_the_state_before_a_command_is_not_dropped(self):
+        """
+        Test that a drone still reporting its state from before a command, e.g. because
+        it rejected the command, overwrites the command's state instead of being deduplicated.
+        """
+        self.mqtt_handler.change_detector = ChangeDetector(heartbeat_interval=30)
+        status = {"drone_id": "drone-1", "dock_id": "dock-1", "status": "docked", "last_updated": "2025-04-05T13:28:28"}
+        await self.mqtt_handler.on_message(None, "drone/status", self.mqtt_handler.codec.encode(status), 1, None)
+
+        await self.service.execute_takeoff("drone-1")
+        await self.mqtt_handler.on_message(None, "drone/status", self.mqtt_handler.codec.encode(status), 1, None)
+
+        self.assertEqual((await self.repository.find_by_id("drone-1")).status, DroneStatus.DOCKED)
+        self.assertEqual(self.mqtt_handler.change_detector.dropped, 0)
+
+    async def test_commands_are_serialized_per_drone(self):
+        """
+        Test that concurrent dock updates of one drone are applied one after the other.
+        """
+        results = await asyncio.gather(
+            self.service.execute_update_dock("drone-1", "dock-2"),
+            self.service.execute_update_dock("drone-1", "dock-2"),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(results[0], "update_dock command sent to Drone drone-1")
+        self.assertIsInstance(results[1], ValueError)
+        drone = await self.repository.find_by_id("drone-1")
+        self.assertEqual((drone.dock_id, drone.version), ("dock-2", 2))
+        self.assertEqual(len(self.service.command_lanes), 0)
+
+    async def test_gives_up_when_the_drone_keeps_changing(self):
+        self.repository.compare_and_set = AsyncMock(return_value=False)
+
+        with self.assertRaises(ConcurrentUpdateError):
+            await self.service.execute_update_dock("drone-1", "dock-2")
+        self.assertEqual(self.repository.compare_and_set.await_count, self.service.max_update_attempts)
+
+
+if __name__ == "__main__":
+    unittest.main()
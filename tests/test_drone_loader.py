@@ -0,0 +1,80 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from domain.drone import Drone, DroneStatus
+from infrastructure.repository.drone_loader import DroneLoader
+
+
+def make_drone(drone_id: str) -> Drone:
+    return Drone(drone_id, dock_id="dock-1", status=DroneStatus.DOCKED)
+
+
+class TestDroneLoader(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.repository = MagicMock()
+        self.repository.find_by_id = AsyncMock(side_effect=lambda drone_id: make_drone(drone_id))
+        self.repository.find_many = AsyncMock(side_effect=lambda drone_ids: [make_drone(i) for i in drone_ids if i != "missing"])
+        self.loader = DroneLoader(self.repository)
+
+    async def test_concurrent_lookups_share_one_query(self):
+        """
+        Test that concurrent lookups of the same drone issue a single repository query.
+        """
+        drones = await asyncio.gather(*(self.loader.load("drone-1") for _ in range(20)))
+
+        self.repository.find_by_id.assert_awaited_once_with("drone-1")
+        self.repository.find_many.assert_not_awaited()
+        self.assertTrue(all(drone is drones[0] for drone in drones))
+        self.assertEqual(self.loader.metrics()["coalesced"], 19)
+
+    async def test_same_tick_lookups_are_batched(self):
+        """
+        Test that lookups of different drones in the same tick are merged into one find_many.
+        """
+        drones = await asyncio.gather(
+            self.loader.load("drone-1"),
+            self.loader.load_many(["drone-2", "drone-1", "missing"]),
+            self.loader.load("drone-3"),
+        )
+
+        self.repository.find_many.assert_awaited_once_with(["drone-1", "drone-2", "missing", "drone-3"])
+        self.assertEqual(drones[0].drone_id, "drone-1")
+        self.assertEqual([drone.drone_id for drone in drones[1]], ["drone-2", "drone-1"])
+        self.assertEqual(self.loader.metrics()["inflight"], 0)
+
+    async def test_missing_drone_raises(self):
+        """
+        Test that loading an unknown drone raises ValueError, and that the next lookup queries again.
+        """
+        self.repository.find_by_id.side_effect = ValueError("Drone with ID drone-9 not found")
+
+        with self.assertRaises(ValueError):
+            await self.loader.load("drone-9")
+        with self.assertRaises(ValueError):
+            await self.loader.load("drone-9")
+        self.assertEqual(self.repository.find_by_id.await_count, 2)
+
+    async def test_repository_error_reaches_every_waiter(self):
+        """
+        Test that a failing query fails all callers waiting on it.
+        """
+        self.repository.find_many.side_effect = ConnectionError("down")
+
+        results = await asyncio.gather(self.loader.load("drone-1"), self.loader.load("drone-2"), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+
+    async def test_cancelled_caller_does_not_cancel_shared_lookup(self):
+        """
+        Test that cancelling one caller leaves the shared lookup running for the others.
+        """
+        first = asyncio.create_task(self.loader.load("drone-1"))
+        second = asyncio.create_task(self.loader.load("drone-1"))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        self.assertEqual((await second).drone_id, "drone-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from domain.drone import Drone, DroneStatus
+from infrastructure.fleet_stats import FleetStats
+from infrastructure.mqtt_handler import MQTTHandler
+from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+from application.drone_command_service import DroneCommandService
+
+
+class TestFleetStats(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.repository = InMemoryDroneRepository()
+        await self.repository.save_many([
+            Drone("drone-1", "dock-1", DroneStatus.DOCKED).to_dict(),
+            Drone("drone-2", "dock-1", DroneStatus.DOCKED).to_dict(),
+            Drone("drone-3", "dock-2", DroneStatus.FLYING).to_dict(),
+        ])
+        self.stats = FleetStats(self.repository, settle=0)
+        self.stats.load([drone async for batch in self.repository.iter_all() for drone in batch])
+
+    async def test_status_messages_move_drones_between_counters(self):
+        handler = MQTTHandler(MagicMock(), "drone/command", "drone/status", self.repository)
+        handler.add_status_listener(self.stats.update)
+
+        for drone_id, status in (("drone-1", "flying"), ("drone-1", "flying"), ("drone-3", "docked")):
+            message = {"drone_id": drone_id, "dock_id": "dock-1", "status": status, "last_updated": "2025-04-05T13:28:28"}
+            await handler.on_message(None, "drone/status", handler.codec.encode(message), 1, None)
+
+        summary = self.stats.summary()
+        self.assertEqual(summary["total"], 3)
+        self.assertEqual((summary["by_status"]["flying"], summary["by_status"]["docked"]), (1, 2))
+        self.assertEqual(summary["by_status"]["lost"], 0)
+        self.assertEqual(summary["by_dock"], {"dock-1": {"docked": 2, "flying": 1, "total": 3}})
+
+    async def test_reconcile_corrects_drift(self):
+        """
+        Test that drones changed behind the counters' back are recounted from the repository, and later status
+        messages of those drones move them between the corrected counters.
+        """
+        handler = MQTTHandler(MagicMock(), "drone/command", "drone/status", self.repository)
+        handler.add_status_listener(self.stats.update)
+        await self.repository.save(Drone("drone-4", "dock-2", DroneStatus.IDLE).to_dict())
+        await self.repository.delete_drone_by_id("drone-1")
+
+        self.assertEqual(await self.stats.reconcile(), 2)
+
+        summary = self.stats.summary()
+        self.assertEqual((summary["total"], summary["by_status"]["docked"], summary["by_status"]["idle"]), (3, 1, 1))
+        self.assertEqual(summary["by_dock"]["dock-2"], {"flying": 1, "idle": 1, "total": 2})
+
+        message = {"drone_id": "drone-4", "dock_id": "dock-2", "status": "flying", "last_updated": "2025-04-05T13:28:28"}
+        await handler.on_message(None, "drone/status", handler.codec.encode(message), 1, None)
+
+        summary = self.stats.summary()
+        self.assertEqual((summary["total"], summary["by_status"]["flying"], summary["by_status"]["idle"]), (3, 2, 0))
+        self.assertEqual(summary["by_dock"]["dock-2"], {"flying": 2, "total": 2})
+        self.assertNotIn("drone-1", self.stats)
+        self.assertEqual(await self.stats.reconcile(), 0)
+
+    async def test_reconcile_keeps_updates_received_while_it_runs(self):
+        """
+        Test that a status update handled while the repository is streamed is not overwritten by the older stored state.
+        """
+        iter_all = self.repository.iter_all
+
+        async def iter_all_with_update(batch_size):
+            async for batch in iter_all(batch_size):
+                self.stats.update(Drone("drone-2", "dock-1", DroneStatus.FLYING))
+                self.stats.remove("drone-3")
+                yield batch
+
+        self.repository.iter_all = iter_all_with_update
+        await self.stats.reconcile()
+
+        summary = self.stats.summary()
+        self.assertEqual((summary["total"], summary["by_status"]["flying"], summary["by_status"]["docked"]), (2, 1, 1))
+        self.assertEqual(summary["by_dock"], {"dock-1": {"docked": 1, "flying": 1, "total": 2}})
+        self.assertNotIn("drone-3", self.stats)
+
+    async def test_reconcile_keeps_updates_not_written_yet(self):
+        """
+        Test that an update received just before the stream, still waiting in the write-behind stage, is kept.
+        """
+        self.stats.settle = 0.05
+        reconcile = asyncio.create_task(self.stats.reconcile())
+        await asyncio.sleep(0)
+        self.stats.update(Drone("drone-1", "dock-1", DroneStatus.FLYING))
+        await reconcile
+
+        summary = self.stats.summary()
+        self.assertEqual((summary["by_status"]["flying"], summary["by_status"]["docked"]), (2, 1))
+
+    async def test_unregister_removes_the_drone_from_the_counters(self):
+        service = DroneCommandService(self.repository, MQTTHandler(MagicMock(), "drone/command", "drone/status", self.repository),
+                                      fleet_stats=self.stats)
+
+        await service.execute_unregister("drone-3")
+
+        summary = self.stats.summary()
+        self.assertEqual((summary["total"], summary["by_status"]["flying"]), (2, 0))
+        self.assertNotIn("dock-2", summary["by_dock"])
+
+if __name__ == "__main__":
+    unittest.main()
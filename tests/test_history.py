@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from domain.drone import Drone, DroneStatus, parse_timestamp
+from infrastructure.history_recorder import HistoryRecorder
+from infrastructure.repository.history_repository import DroneHistoryRepository
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class TestDroneHistoryRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """
+        Set up a history repository with a mocked collection.
+        """
+        self.repository = DroneHistoryRepository("mongodb://localhost:27017", bucket_seconds=3600, bucket_size=2)
+        self.repository.collection = MagicMock()
+        self.repository.collection.bulk_write = AsyncMock(return_value=None)
+
+    async def test_append_groups_samples_into_buckets(self):
+        """
+        Test that samples are pushed per drone and window, split at the bucket size.
+        """
+        samples = [
+            {"drone_id": "drone-1", "dock_id": "dock-1", "status": "flying", "last_updated": datetime(2025, 4, 5, 13, minute)}
+            for minute in (1, 2, 3)
+        ] + [{"drone_id": "drone-2", "dock_id": None, "status": "idle", "last_updated": datetime(2025, 4, 5, 14, 0)}]
+
+        await self.repository.append_many(samples)
+
+        operations = self.repository.collection.bulk_write.await_args.args[0]
+        self.assertEqual([op._filter["drone_id"] for op in operations], ["drone-1", "drone-1", "drone-2"])
+        self.assertEqual([op._doc["$inc"]["count"] for op in operations], [2, 1, 1])
+        # Only a bucket with room for the whole chunk is matched
+        self.assertEqual([op._filter["count"] for op in operations], [{"$lte": 0}, {"$lte": 1}, {"$lte": 1}])
+        self.assertEqual(operations[0]._doc["$push"]["samples"]["$each"][0],
+                         {"t": datetime(2025, 4, 5, 13, 1), "s": "flying", "d": "dock-1"})
+
+    async def test_find_range_filters_and_downsamples(self):
+        """
+        Test that range queries drop samples outside the range and keep one per interval.
+        """
+        samples = [{"t": datetime(2025, 4, 5, 13, 0, second), "s": "flying", "d": None} for second in range(0, 60, 10)]
+        self.repository.collection.find = MagicMock(return_value=FakeCursor([{"bucket_start": datetime(2025, 4, 5, 13), "samples": samples}]))
+
+        results = [sample async for sample in self.repository.find_range(
+            "drone-1", datetime(2025, 4, 5, 13, 0, 10), datetime(2025, 4, 5, 13, 0, 50), downsample=20)]
+
+        self.assertEqual([sample["timestamp"].second for sample in results], [10, 30, 50])
+
+    async def test_out_of_order_samples(self):
+        """
+        Test that late samples widen their bucket's bounds and are streamed in time order,
+        and that a range with an offset is compared in UTC.
+        """
+        samples = [{"drone_id": "drone-1", "dock_id": None, "status": "flying", "last_updated": datetime(2025, 4, 5, 13, minute)}
+                   for minute in (30, 10)]
+        await self.repository.append_many(samples)
+        update = self.repository.collection.bulk_write.await_args.args[0][0]._doc
+        self.assertEqual((update["$min"]["first"].minute, update["$max"]["last"].minute), (10, 30))
+
+        window = datetime(2025, 4, 5, 13)
+        buckets = [
+            {"bucket_start": window, "samples": [{"t": datetime(2025, 4, 5, 13, minute), "s": "flying", "d": None} for minute in (20, 40)]},
+            {"bucket_start": window, "samples": [{"t": datetime(2025, 4, 5, 13, minute), "s": "flying", "d": None} for minute in (30, 10)]},
+        ]
+        self.repository.collection.find = MagicMock(return_value=FakeCursor(buckets))
+        start = parse_timestamp(datetime(2025, 4, 5, 15, 15, tzinfo=timezone(timedelta(hours=2))))
+        results = [sample async for sample in self.repository.find_range("drone-1", start)]
+
+        self.assertEqual([sample["timestamp"].minute for sample in results], [20, 30, 40])
+        self.assertNotIn("first", self.repository.collection.find.call_args.args[0])
+
+
+class TestHistoryRecorder(unittest.IsolatedAsyncioTestCase):
+    async def test_flushes_buffered_samples_on_stop(self):
+        repository = MagicMock()
+        repository.append_many = AsyncMock(return_value=None)
+        recorder = HistoryRecorder(repository, batch_size=2, flush_interval=60)
+        recorder.start()
+        for status in (DroneStatus.FLYING, DroneStatus.RETURNING, DroneStatus.DOCKED):
+            recorder.record(Drone("drone-1", status=status))
+        await recorder.stop()
+
+        batches = [call.args[0] for call in repository.append_many.await_args_list]
+        self.assertEqual([sample["status"] for batch in batches for sample in batch], ["flying", "returning", "docked"])
+
+    async def test_failed_append_is_retried_in_order(self):
+        repository = MagicMock()
+        repository.append_many = AsyncMock(side_effect=[ConnectionError("down"), None, None])
+        recorder = HistoryRecorder(repository, batch_size=2, flush_interval=60, retry_base=0.01)
+        for status in (DroneStatus.FLYING, DroneStatus.RETURNING, DroneStatus.DOCKED):
+            recorder.record(Drone("drone-1", status=status))
+
+        self.assertFalse(await recorder.flush())
+        recorder.start()
+        await asyncio.sleep(0.1)
+
+        batches = [call.args[0] for call in repository.append_many.await_args_list[1:]]
+        self.assertEqual([sample["status"] for batch in batches for sample in batch], ["flying", "returning", "docked"])
+        await recorder.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from domain.drone import Drone, DroneStatus
+from infrastructure.change_detector import ChangeDetector
+from infrastructure.drone_cache import DroneStateCache
+from infrastructure.liveness import LivenessMonitor
+from infrastructure.mqtt_handler import MQTTHandler
+from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+from infrastructure.sharding import ShardPlan
+from application.fleet_warmup import FleetWarmup
+from application.drone_command_service import DroneCommandService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLivenessMonitor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch("infrastructure.liveness.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.monitor = LivenessMonitor(timeout=10, tick=1)
+
+    def test_silent_drone_expires_after_timeout(self):
+        self.monitor.heartbeat("drone-1")
+        self.clock.now += 9
+        self.assertEqual(self.monitor.advance(), [])
+        self.clock.now += 2
+        self.assertEqual(self.monitor.advance(), ["drone-1"])
+        self.assertNotIn("drone-1", self.monitor)
+
+    def test_heartbeat_pushes_the_deadline(self):
+        """
+        Test that a drone reporting within the timeout never expires, across wheel wrap-arounds.
+        """
+        self.monitor.heartbeat("drone-1")
+        self.monitor.heartbeat("drone-2")
+        for _ in range(30):
+            self.clock.now += 5
+            self.monitor.heartbeat("drone-1")
+            expired = self.monitor.advance()
+            self.assertNotIn("drone-1", expired)
+        self.assertIn("drone-1", self.monitor)
+        self.assertNotIn("drone-2", self.monitor)
+
+    def test_track_keeps_existing_deadline(self):
+        self.monitor.heartbeat("drone-1")
+        self.clock.now += 6
+        self.monitor.advance()
+        self.monitor.track("drone-1")
+        self.clock.now += 5
+        self.assertEqual(self.monitor.advance(), ["drone-1"])
+
+
+class TestMarkLost(unittest.IsolatedAsyncioTestCase):
+    async def test_silent_drone_is_marked_lost_and_unchanged_reports_count_as_heartbeats(self):
+        repository = MagicMock()
+        repository.save = AsyncMock()
+        handler = MQTTHandler(MagicMock(), "drone/command", "drone/status", repository, change_detector=ChangeDetector(30))
+        cache = DroneStateCache()
+        monitor = LivenessMonitor(timeout=10, tick=1)
+        service = DroneCommandService(repository, handler, drone_cache=cache, liveness_monitor=monitor)
+
+        message = handler.codec.encode({"drone_id": "drone-1", "status": "flying", "last_updated": "2025-04-05T13:28:28"})
+        await handler.on_message(None, "drone/status", message, 1, None)
+        monitor.forget("drone-1")
+        await handler.on_message(None, "drone/status", message, 1, None)
+        self.assertEqual(handler.change_detector.dropped, 1)
+        self.assertIn("drone-1", monitor)
+
+        monitor.forget("drone-1")
+        await service.mark_lost("drone-1")
+
+        self.assertEqual(cache.get("drone-1").status, DroneStatus.LOST)
+        self.assertEqual(repository.save.await_args.args[0]["status"], "lost")
+        # The next report is processed even though it repeats the state from before the drone was lost
+        await handler.on_message(None, "drone/status", message, 1, None)
+        self.assertEqual(cache.get("drone-1").status, DroneStatus.FLYING)
+
+    async def test_sharded_workers_only_track_their_own_drones(self):
+        """
+        Test that warm-up and heartbeats only track drones whose partition the worker owns.
+        """
+        repository = InMemoryDroneRepository()
+        drone_ids = [f"drone-{i}" for i in range(20)]
+        await repository.save_many([Drone(drone_id, "dock-1", DroneStatus.FLYING).to_dict() for drone_id in drone_ids])
+
+        monitors = []
+        for index in range(2):
+            plan = ShardPlan(partitions=4, worker_index=index, worker_count=2)
+            monitor = LivenessMonitor(timeout=10, tick=1, owns=plan.owns)
+            await FleetWarmup(repository, liveness_monitor=monitor).run()
+            handler = MQTTHandler(MagicMock(), "drone/command", "drone/status", repository, shard_plan=plan)
+            handler.add_heartbeat_listener(monitor.report)
+            await handler.on_message(None, "drone/status", handler.codec.encode(
+                {"drone_id": "drone-404", "status": "flying", "last_updated": "2025-04-05T13:28:28"}), 1, None)
+            monitors.append((plan, monitor))
+
+        for drone_id in drone_ids + ["drone-404"]:
+            self.assertEqual([drone_id in monitor for _, monitor in monitors],
+                             [plan.owns(drone_id) for plan, _ in monitors])
+        self.assertEqual(sum(len(monitor) for _, monitor in monitors), 21)
+
+    async def test_status_echo_is_not_a_heartbeat(self):
+        repository = MagicMock()
+        repository.save = AsyncMock()
+        handler = MQTTHandler(MagicMock(), "drone/command", "drone/status", repository)
+        monitor = LivenessMonitor(timeout=10, tick=1)
+        handler.add_heartbeat_listener(monitor.report)
+
+        echo = {"drone_id": "drone-1", "status": "flying", "last_updated": "2025-04-05T13:28:28", "echo": True}
+        await handler.on_message(None, "drone/status", handler.codec.encode(echo), 1, None)
+
+        self.assertNotIn("drone-1", monitor)
+        repository.save.assert_awaited_once()
+
+    async def test_invalid_status_is_not_a_heartbeat(self):
+        repository = MagicMock()
+        repository.save = AsyncMock()
+        handler = MQTTHandler(MagicMock(), "drone/command", "drone/status", repository)
+        monitor = LivenessMonitor(timeout=10, tick=1)
+        handler.add_heartbeat_listener(monitor.report)
+
+        for message in ({"drone_id": "drone-1", "status": "hovering"},
+                        {"drone_id": "drone-1", "status": "flying", "latitude": 91.0, "longitude": 4.0}):
+            await handler.on_message(None, "drone/status", handler.codec.encode(message), 1, None)
+
+        self.assertNotIn("drone-1", monitor)
+        repository.save.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import json
+import logging
+import queue
+import unittest
+from infrastructure.logging_setup import LoggingPipeline, NonBlockingQueueHandler, RateLimitFilter, SamplingFilter
+
+
+def make_record(level: int, msg: str, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("drone", level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLoggingFilters(unittest.TestCase):
+    def test_sampling_keeps_whole_drones(self):
+        """
+        Test that per-drone sampling keeps every record of a sampled drone and never samples warnings.
+        """
+        sampling = SamplingFilter(rate=0.5, topic_rates={"drone/ack": 1.0})
+        kept = {f"drone-{i}" for i in range(1000) if sampling.filter(make_record(logging.INFO, "x", drone_id=f"drone-{i}"))}
+
+        self.assertTrue(300 < len(kept) < 700)
+        self.assertTrue(all(sampling.filter(make_record(logging.DEBUG, "y", drone_id=drone_id)) for drone_id in kept))
+        self.assertTrue(all(sampling.filter(make_record(logging.INFO, "x", drone_id=f"drone-{i}", topic="drone/ack"))
+                            for i in range(100)))
+        self.assertTrue(all(sampling.filter(make_record(logging.ERROR, "x", drone_id=f"drone-{i}")) for i in range(100)))
+
+    def test_rate_limit_suppresses_repeated_errors(self):
+        rate_limit = RateLimitFilter(burst=3, interval=60)
+        passed = [rate_limit.filter(make_record(logging.ERROR, "Invalid payload on %s: %s")) for _ in range(10)]
+
+        self.assertEqual(passed, [True] * 3 + [False] * 7)
+        self.assertTrue(rate_limit.filter(make_record(logging.ERROR, "Another error")))
+        self.assertTrue(rate_limit.filter(make_record(logging.INFO, "Invalid payload on %s: %s")))
+
+        rate_limit.interval = 0
+        record = make_record(logging.ERROR, "Invalid payload on %s: %s")
+        self.assertTrue(rate_limit.filter(record))
+        self.assertIn("(7 similar messages suppressed)", record.msg)
+
+    def test_full_queue_drops_records(self):
+        handler = NonBlockingQueueHandler(queue.Queue(2))
+        for _ in range(5):
+            handler.emit(make_record(logging.INFO, "x"))
+        self.assertEqual(handler.dropped, 3)
+
+
+class TestLoggingPipeline(unittest.TestCase):
+    def test_records_are_written_as_json_by_the_listener(self):
+        stream = io.StringIO()
+        pipeline = LoggingPipeline(level="INFO", stream=stream)
+        root = logging.getLogger()
+        previous_level = root.level
+        self.addCleanup(root.setLevel, previous_level)
+        self.addCleanup(root.removeHandler, pipeline.output)
+        pipeline.start()
+
+        logging.info("Drone %s saved", "drone-1", extra={"drone_id": "drone-1", "topic": "drone/status"})
+        logging.debug("not written")
+        pipeline.set_level("debug")
+        logging.debug("written")
+        pipeline.stop()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line["message"] for line in lines], ["Drone drone-1 saved", "written"])
+        self.assertEqual((lines[0]["drone_id"], lines[0]["topic"], lines[0]["level"]), ("drone-1", "drone/status", "INFO"))
+        with self.assertRaises(ValueError):
+            pipeline.set_level("loud")
+
+
+if __name__ == "__main__":
+    unittest.main()
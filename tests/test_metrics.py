@@ -0,0 +1,50 @@
+import unittest
+from infrastructure.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """
+        Set up a private registry for each test.
+        """
+        self.registry = MetricsRegistry()
+
+    def test_counter_with_labels(self):
+        counter = Counter("payloads", "Invalid payloads.", ["reason"], registry=self.registry)
+        counter.labels("missing_status").inc()
+        counter.labels(reason="missing_status").inc(2)
+
+        self.assertIn('payloads_total{reason="missing_status"} 3', self.registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        """
+        Test that histogram buckets follow the less-or-equal convention and are cumulative.
+        """
+        histogram = Histogram("latency", "Latency.", buckets=(0.1, 1.0), registry=self.registry)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(3)
+
+        output = self.registry.render()
+        self.assertIn('latency_bucket{le="0.1"} 1', output)
+        self.assertIn('latency_bucket{le="1"} 2', output)
+        self.assertIn('latency_bucket{le="+Inf"} 3', output)
+        self.assertIn("latency_count 3", output)
+        self.assertIn("latency_sum 3.6", output)
+
+    def test_gauge_function(self):
+        """
+        Test that a gauge can read its value at scrape time.
+        """
+        queue = [1, 2, 3]
+        Gauge("queue_depth", "Queue depth.", registry=self.registry).set_function(lambda: len(queue))
+        self.assertIn("queue_depth 3", self.registry.render())
+
+    def test_duplicate_names_are_rejected(self):
+        Counter("payloads", "Invalid payloads.", registry=self.registry)
+        with self.assertRaises(ValueError):
+            Counter("payloads", "Invalid payloads.", registry=self.registry)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import asyncio
+from unittest.mock import MagicMock
+from infrastructure.mqtt_publisher import InflightWindow, MQTTPublisher
+
+
+class FakeClient:
+    def __init__(self, window: InflightWindow = None):
+        self.is_connected = True
+        self.window = window
+        self.published = []
+        self._mid = 0
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append((topic, payload, qos))
+        if qos > 0 and self.window is not None:
+            self._mid += 1
+            self.window.push_message(self._mid, payload)
+
+
+class TestMQTTPublisher(unittest.IsolatedAsyncioTestCase):
+    async def test_publishes_inline_before_start(self):
+        """
+        Test that messages are published immediately, with the QoS of their kind, when the sender is not running.
+        """
+        client = MagicMock()
+        publisher = MQTTPublisher(client)
+
+        await publisher.publish("drone/command", b"cmd", kind="command")
+        await publisher.publish("drone/status", b"status", kind="status")
+
+        self.assertEqual([call.kwargs["qos"] for call in client.publish.call_args_list], [1, 0])
+        with self.assertRaises(ValueError):
+            await publisher.publish("drone/status", b"x", kind="telemetry")
+
+    async def test_inflight_window_limits_qos1(self):
+        """
+        Test that QoS 1 messages wait for broker acks once the in-flight window is full.
+        """
+        window = InflightWindow()
+        client = FakeClient(window)
+        publisher = MQTTPublisher(client, window=window, max_inflight=2)
+        publisher.start()
+
+        for i in range(5):
+            await publisher.publish("drone/command", i, kind="command")
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(client.published), 2)
+
+        window.remove_message_by_mid(1)
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(client.published), 3)
+
+        window.clear()
+        await publisher.stop(timeout=1)
+        self.assertEqual([payload for _, payload, _ in client.published], [0, 1, 2, 3, 4])
+
+    async def test_full_queue_drops_qos0(self):
+        """
+        Test that a full queue drops QoS 0 messages, and that stopping drops what was never published.
+        """
+        client = FakeClient()
+        client.is_connected = False
+        publisher = MQTTPublisher(client, max_queue_size=1, retry_base=10)
+        publisher.start()
+
+        await publisher.publish("drone/status", b"a", kind="status")
+        await asyncio.sleep(0)
+        await publisher.publish("drone/status", b"b", kind="status")
+        await publisher.publish("drone/status", b"c", kind="status")
+
+        self.assertEqual(publisher.metrics()["dropped"], 1)
+        await publisher.stop(timeout=0.05)
+        self.assertEqual(client.published, [])
+        self.assertEqual(publisher.metrics()["dropped"], 3)
+
+    async def test_retries_until_reconnected(self):
+        """
+        Test that QoS 1 messages are retried with backoff while the client is disconnected.
+        """
+        client = FakeClient()
+        client.is_connected = False
+        publisher = MQTTPublisher(client, retry_base=0.001, retry_max=0.002)
+        publisher.start()
+
+        await publisher.publish("drone/command", b"cmd", kind="command")
+        await asyncio.sleep(0.02)
+        self.assertEqual(client.published, [])
+        self.assertGreater(publisher.metrics()["retries"], 0)
+
+        client.is_connected = True
+        await publisher.stop(timeout=1)
+        self.assertEqual(client.published, [("drone/command", b"cmd", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from domain.drone import DroneStatus
+from infrastructure.repository.factory import create_drone_repository
+
+
+def make_document(drone_id: str, status: str = "docked", dock_id: str = "dock-1") -> dict:
+    return {"drone_id": drone_id, "dock_id": dock_id, "status": status, "last_updated": "2025-04-05T13:28:28"}
+
+
+class RepositoryBackendTests:
+    """
+    Behaviour shared by every repository backend.
+    """
+    async def asyncSetUp(self):
+        self.repository = self.create_repository()
+        await self.repository.ensure_indexes()
+        await self.repository.save_many([
+            make_document("drone-1", "flying", "dock-1"),
+            make_document("drone-2", "docked", "dock-1"),
+            make_document("drone-3", "docked", "dock-2"),
+        ])
+
+    async def test_find_by_id(self):
+        drone = await self.repository.find_by_id("drone-1")
+        self.assertEqual(drone.status, DroneStatus.FLYING)
+        self.assertEqual(drone.dock_id, "dock-1")
+        with self.assertRaises(ValueError):
+            await self.repository.find_by_id("drone-404")
+
+    async def test_save_upserts(self):
+        await self.repository.save(make_document("drone-1", "returning", "dock-2"))
+        drone = await self.repository.find_by_id("drone-1")
+        self.assertEqual(drone.status, DroneStatus.RETURNING)
+        self.assertEqual(drone.dock_id, "dock-2")
+
+    async def test_find_many_filters(self):
+        """
+        Test ID, status and dock filters, alone and combined.
+        """
+        def ids(drones):
+            return sorted(drone.drone_id for drone in drones)
+
+        self.assertEqual(ids(await self.repository.find_many(["drone-1", "drone-3", "drone-404"])), ["drone-1", "drone-3"])
+        self.assertEqual(ids(await self.repository.find_many(status="docked")), ["drone-2", "drone-3"])
+        self.assertEqual(ids(await self.repository.find_many(status="docked", dock_id="dock-1")), ["drone-2"])
+        self.assertEqual(ids(await self.repository.find_many(["drone-1", "drone-2"], dock_id="dock-1", status="flying")), ["drone-1"])
+        self.assertEqual(ids(await self.repository.find_many()), ["drone-1", "drone-2", "drone-3"])
+
+        await self.repository.save(make_document("drone-2", "flying", "dock-1"))
+        self.assertEqual(ids(await self.repository.find_many(status="docked")), ["drone-3"])
+
+    async def test_find_many_pages_in_drone_id_order(self):
+        def ids(drones):
+            return [drone.drone_id for drone in drones]
+
+        self.assertEqual(ids(await self.repository.find_many(limit=2)), ["drone-1", "drone-2"])
+        self.assertEqual(ids(await self.repository.find_many(after="drone-2", limit=2)), ["drone-3"])
+        self.assertEqual(ids(await self.repository.find_many(status="docked", after="drone-1", limit=1)), ["drone-2"])
+        self.assertEqual(ids(await self.repository.find_many(after="drone-1")), ["drone-2", "drone-3"])
+
+    async def test_geo_queries_keep_position_across_updates(self):
+        """
+        Test radius and polygon lookups, and that a status update without a position keeps the stored one.
+        """
+        await self.repository.save_many([
+            dict(make_document("drone-1", "flying"), latitude=52.0, longitude=4.0, altitude=120.0),
+            dict(make_document("drone-2"), latitude=52.01, longitude=4.01),
+            dict(make_document("drone-3"), latitude=48.0, longitude=2.0),
+        ])
+        await self.repository.save(make_document("drone-1", "returning"))
+
+        drone = await self.repository.find_by_id("drone-1")
+        self.assertEqual((drone.latitude, drone.longitude, drone.altitude), (52.0, 4.0, 120.0))
+        near = await self.repository.find_near(52.0, 4.0, 2000)
+        self.assertEqual(sorted(drone.drone_id for drone in near), ["drone-1", "drone-2"])
+        within = await self.repository.find_within([(47.0, 1.0), (49.0, 1.0), (49.0, 3.0), (47.0, 3.0)])
+        self.assertEqual([drone.drone_id for drone in within], ["drone-3"])
+
+    async def test_iter_all_streams_batches(self):
+        batches = [batch async for batch in self.repository.iter_all(batch_size=2)]
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(sorted(drone.drone_id for batch in batches for drone in batch), ["drone-1", "drone-2", "drone-3"])
+
+    async def test_compare_and_set(self):
+        """
+        Test that a write only applies at the expected version and that every write bumps it.
+        """
+        drone = await self.repository.find_by_id("drone-1")
+        self.assertEqual(drone.version, 1)
+        self.assertTrue(await self.repository.compare_and_set(make_document("drone-1", "returning"), 1))
+        self.assertFalse(await self.repository.compare_and_set(make_document("drone-1", "docked"), 1))
+        await self.repository.save(make_document("drone-1", "flying"))
+
+        drone = await self.repository.find_by_id("drone-1")
+        self.assertEqual((drone.status, drone.version), (DroneStatus.FLYING, 3))
+        self.assertFalse(await self.repository.compare_and_set(make_document("drone-1"), None))
+        self.assertTrue(await self.repository.compare_and_set(make_document("drone-4"), None))
+        self.assertEqual((await self.repository.find_by_id("drone-4")).version, 1)
+
+    async def test_count_by_status_and_dock(self):
+        counts = await self.repository.count_by_status_and_dock()
+        self.assertEqual(counts, {("flying", "dock-1"): 1, ("docked", "dock-1"): 1, ("docked", "dock-2"): 1})
+
+    async def test_delete(self):
+        self.assertEqual(await self.repository.delete_drone_by_id("drone-1"), "Deleted drone with ID: drone-1")
+        self.assertEqual(await self.repository.delete_drone_by_id("drone-1"), "No drone found with ID: drone-1")
+        self.assertEqual(len(await self.repository.find_many(dock_id="dock-1")), 1)
+
+
+class TestInMemoryDroneRepository(RepositoryBackendTests, unittest.IsolatedAsyncioTestCase):
+    def create_repository(self):
+        return create_drone_repository("memory")
+
+
+class TestSQLiteDroneRepository(RepositoryBackendTests, unittest.IsolatedAsyncioTestCase):
+    def create_repository(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return create_drone_repository("sqlite", sqlite_path=os.path.join(directory.name, "drones.db"))
+
+    async def asyncTearDown(self):
+        await self.repository.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from infrastructure.sharding import ShardPlan, partition_for
+
+
+class TestShardPlan(unittest.TestCase):
+    def test_partitions_are_owned_by_exactly_one_worker(self):
+        """
+        Test that every status partition belongs to exactly one worker.
+        """
+        plans = [ShardPlan(partitions=16, worker_index=i, worker_count=3) for i in range(3)]
+        owned = sorted(p for plan in plans for p in plan.owned_partitions())
+        self.assertEqual(owned, list(range(16)))
+
+    def test_drone_is_published_on_its_partition(self):
+        """
+        Test that a drone always maps to the same partition topic.
+        """
+        plan = ShardPlan(partitions=8)
+        topic = plan.status_topic_for("drone/status", "drone-123")
+        self.assertEqual(topic, f"drone/status/{partition_for('drone-123', 8)}")
+        self.assertEqual(topic, plan.status_topic_for("drone/status", "drone-123"))
+        self.assertEqual(ShardPlan().status_topic_for("drone/status", "drone-123"), "drone/status")
+
+    def test_shared_subscriptions(self):
+        """
+        Test that a share group subscribes through $share and uses a unique client ID.
+        """
+        plan = ShardPlan(partitions=4, worker_index=1, worker_count=2, share_group="ingest")
+        self.assertEqual(plan.status_subscriptions("drone/status"),
+                         ["$share/ingest/drone/status", "drone/status/1", "drone/status/3"])
+        self.assertNotEqual(plan.client_id("drone-api-server"), "drone-api-server")
+        self.assertEqual(ShardPlan().client_id("drone-api-server"), "drone-api-server")
+
+    def test_plain_topics_without_share_group_are_consumed_by_worker_zero(self):
+        """
+        Test that without a share group only one worker subscribes to the un-partitioned topics.
+        """
+        plans = [ShardPlan(partitions=4, worker_index=i, worker_count=2) for i in range(2)]
+        self.assertEqual(plans[0].status_subscriptions("drone/status"), ["drone/status", "drone/status/0", "drone/status/2"])
+        self.assertEqual(plans[1].status_subscriptions("drone/status"), ["drone/status/1", "drone/status/3"])
+        self.assertEqual([plan.plain_subscriptions("drone/command") for plan in plans], [["drone/command"], []])
+
+    def test_invalid_worker_index(self):
+        with self.assertRaises(ValueError):
+            ShardPlan(worker_index=2, worker_count=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from domain.drone import Drone, DroneStatus
+from infrastructure.drone_cache import DroneStateCache
+from infrastructure.repository.memory_drone_repository import InMemoryDroneRepository
+from infrastructure.snapshot import MAX_ID_LENGTH, NO_DOCK, SnapshotError, SnapshotReader, SnapshotWriter, write_snapshot
+from infrastructure.spatial_index import SpatialIndex
+from application.fleet_warmup import FleetWarmup
+
+UPDATED = datetime(2025, 4, 5, 13, 28, 28)
+
+
+class TestSnapshot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "fleet.snapshot")
+
+    def test_round_trip(self):
+        """
+        Test that every field survives a write and a memory-mapped read.
+        """
+        drones = [
+            Drone("drone-1", "dock-1", DroneStatus.FLYING, UPDATED, 52.0, 4.0, 120.5),
+            Drone("drone-2", None, DroneStatus.DOCKED, UPDATED),
+        ]
+        write_snapshot(self.path, drones)
+
+        with SnapshotReader(self.path) as reader:
+            self.assertEqual(len(reader), 2)
+            self.assertEqual([drone.to_dict() for drone in reader], [drone.to_dict() for drone in drones])
+            self.assertLess(reader.age, 60)
+
+    def test_oversized_ids_are_left_out(self):
+        """
+        Test that IDs that do not fit a record, including one as long as the no-dock marker, are not written.
+        """
+        drones = [
+            Drone("drone-1", "d" * MAX_ID_LENGTH, DroneStatus.DOCKED, UPDATED),
+            Drone("drone-2", "d" * NO_DOCK, DroneStatus.DOCKED, UPDATED),
+            Drone("drone-3", "d" * 70000, DroneStatus.DOCKED, UPDATED),
+            Drone("x" * 70000, None, DroneStatus.DOCKED, UPDATED),
+        ]
+        with self.assertLogs(level="WARNING"):
+            write_snapshot(self.path, drones)
+
+        with SnapshotReader(self.path) as reader:
+            self.assertEqual([drone.to_dict() for drone in reader], [drones[0].to_dict()])
+
+    def test_corrupt_snapshot_is_rejected(self):
+        write_snapshot(self.path, [Drone("drone-1", "dock-1", DroneStatus.FLYING, UPDATED)])
+        with open(self.path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"X")
+
+        with self.assertRaises(SnapshotError):
+            SnapshotReader(self.path)
+
+    async def test_warmup_from_snapshot_then_repository(self):
+        """
+        Test that a warm-up loads the snapshot, catches up from the repository and keeps newer telemetry.
+        """
+        repository = InMemoryDroneRepository()
+        await repository.save_many([
+            Drone("drone-1", "dock-1", DroneStatus.DOCKED, UPDATED, 52.0, 4.0).to_dict(),
+            Drone("drone-2", "dock-1", DroneStatus.DOCKED, UPDATED).to_dict(),
+        ])
+        await SnapshotWriter(repository, self.path).write()
+        await repository.save(Drone("drone-2", "dock-1", DroneStatus.FLYING, datetime(2025, 4, 5, 14, 0, 0)).to_dict())
+
+        cache = DroneStateCache()
+        index = SpatialIndex()
+        cache.put(Drone("drone-1", "dock-1", DroneStatus.FLYING, datetime(2025, 4, 5, 15, 0, 0), 52.1, 4.1))
+        warmup = FleetWarmup(repository, drone_cache=cache, spatial_index=index, snapshot_path=self.path)
+        await warmup.run()
+
+        self.assertTrue(warmup.ready)
+        self.assertEqual(warmup.source, "snapshot")
+        self.assertEqual(cache.get("drone-1").status, DroneStatus.FLYING)
+        self.assertEqual(cache.get("drone-2").status, DroneStatus.FLYING)
+        self.assertTrue(index.ready)
+
+    async def test_warmup_without_snapshot(self):
+        repository = InMemoryDroneRepository()
+        await repository.save(Drone("drone-1", "dock-1", DroneStatus.DOCKED, UPDATED).to_dict())
+        warmup = FleetWarmup(repository, drone_cache=DroneStateCache(), snapshot_path=self.path)
+        self.assertFalse(warmup.ready)
+
+        await warmup.run()
+
+        self.assertEqual((warmup.ready, warmup.source, warmup.loaded), (True, "repository", 1))
+
+    async def test_warmup_retries_a_failed_load(self):
+        repository = InMemoryDroneRepository()
+        await repository.save(Drone("drone-1", "dock-1", DroneStatus.DOCKED, UPDATED).to_dict())
+        iter_all = repository.iter_all
+        calls = []
+
+        def failing_once(batch_size):
+            calls.append(batch_size)
+            if len(calls) == 1:
+                raise ConnectionError("down")
+            return iter_all(batch_size)
+
+        repository.iter_all = failing_once
+        warmup = FleetWarmup(repository, drone_cache=DroneStateCache(), retry_base=0.01)
+        await warmup.run()
+
+        self.assertEqual((warmup.ready, warmup.failures, warmup.loaded), (True, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import random
+from domain.drone import Drone, DroneStatus
+from domain.geo import haversine_m, point_in_polygon
+from infrastructure.spatial_index import SpatialIndex
+
+
+def located(drone_id: str, latitude: float, longitude: float) -> Drone:
+    return Drone(drone_id, status=DroneStatus.FLYING, latitude=latitude, longitude=longitude, altitude=100.0)
+
+
+class TestGeo(unittest.TestCase):
+    def test_haversine(self):
+        """
+        Test the distance of one degree of latitude (about 111.2 km).
+        """
+        self.assertAlmostEqual(haversine_m(52.0, 4.0, 53.0, 4.0), 111195, delta=10)
+
+    def test_point_in_polygon(self):
+        triangle = [(0.0, 0.0), (0.0, 10.0), (10.0, 0.0)]
+        self.assertTrue(point_in_polygon(2.0, 2.0, triangle))
+        self.assertFalse(point_in_polygon(8.0, 8.0, triangle))
+
+    def test_drone_rejects_invalid_position(self):
+        with self.assertRaises(ValueError):
+            Drone.from_dict({"drone_id": "drone-1", "status": "flying", "latitude": 91.0, "longitude": 4.0})
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def test_updates_move_drones_between_cells(self):
+        """
+        Test that a moving drone is found at its latest position only.
+        """
+        index = SpatialIndex(cell_size=0.01)
+        index.update(located("drone-1", 52.0, 4.0))
+        index.update(located("drone-1", 52.5, 4.5))
+        index.update(Drone("drone-1", status=DroneStatus.RETURNING))
+
+        self.assertEqual(index.within_radius(52.0, 4.0, 1000), [])
+        self.assertEqual([match[0] for match in index.within_radius(52.5, 4.5, 1000)], ["drone-1"])
+        self.assertEqual(len(index), 1)
+
+    def test_queries_match_a_full_scan(self):
+        """
+        Test radius and polygon queries against a brute-force scan of random positions.
+        """
+        rng = random.Random(7)
+        drones = [located(f"drone-{i}", rng.uniform(51.0, 53.0), rng.uniform(3.0, 6.0)) for i in range(2000)]
+        index = SpatialIndex(cell_size=0.05)
+        index.load(drones)
+
+        expected = sorted(d.drone_id for d in drones if haversine_m(52.0, 4.5, d.latitude, d.longitude) <= 20000)
+        matches = index.within_radius(52.0, 4.5, 20000)
+        self.assertEqual(sorted(match[0] for match in matches), expected)
+        self.assertEqual([match[2] for match in matches], sorted(match[2] for match in matches))
+
+        polygon = [(51.5, 3.5), (52.5, 4.0), (52.0, 5.5), (51.2, 5.0)]
+        expected = sorted(d.drone_id for d in drones if point_in_polygon(d.latitude, d.longitude, polygon))
+        self.assertEqual(sorted(match[0] for match in index.within_polygon(polygon)), expected)
+        self.assertTrue(index.ready)
+
+
+if __name__ == "__main__":
+    unittest.main()
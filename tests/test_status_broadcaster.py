@@ -0,0 +1,45 @@
+import unittest
+from domain.drone import Drone, DroneStatus
+from infrastructure.status_broadcaster import StatusBroadcaster
+
+
+class TestStatusBroadcaster(unittest.IsolatedAsyncioTestCase):
+    async def test_filters_by_drone_and_status(self):
+        """
+        Test that subscribers only receive the drones and status they asked for.
+        """
+        broadcaster = StatusBroadcaster()
+        by_id = broadcaster.subscribe(["drone-1"])
+        flying = broadcaster.subscribe(status=DroneStatus.FLYING)
+
+        broadcaster.publish(Drone("drone-1", status=DroneStatus.DOCKED))
+        broadcaster.publish(Drone("drone-2", status=DroneStatus.FLYING))
+
+        self.assertEqual([update["drone_id"] for update in await by_id.get()], ["drone-1"])
+        self.assertEqual([update["drone_id"] for update in await flying.get()], ["drone-2"])
+
+    async def test_slow_consumer_is_conflated_and_bounded(self):
+        """
+        Test that a slow subscriber keeps only the latest update per drone, up to max_pending drones.
+        """
+        broadcaster = StatusBroadcaster(max_pending=2)
+        subscription = broadcaster.subscribe()
+        broadcaster.publish(Drone("drone-1", status=DroneStatus.FLYING))
+        broadcaster.publish(Drone("drone-1", status=DroneStatus.RETURNING))
+        broadcaster.publish(Drone("drone-2", status=DroneStatus.FLYING))
+        broadcaster.publish(Drone("drone-3", status=DroneStatus.FLYING))
+
+        updates = await subscription.get()
+        self.assertEqual([update["drone_id"] for update in updates], ["drone-2", "drone-3"])
+        self.assertEqual(subscription.conflated, 1)
+        self.assertEqual(subscription.dropped, 1)
+
+    async def test_unsubscribe(self):
+        broadcaster = StatusBroadcaster()
+        subscription = broadcaster.subscribe(["drone-1"])
+        broadcaster.unsubscribe(subscription)
+        self.assertEqual(len(broadcaster), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
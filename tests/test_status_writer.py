@@ -0,0 +1,87 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from infrastructure.status_writer import StatusWriter
+
+
+class TestStatusWriter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """
+        Set up a status writer backed by a mocked repository.
+        """
+        self.repository = MagicMock()
+        self.repository.save_many = AsyncMock(return_value=None)
+        self.writer = StatusWriter(self.repository, batch_size=3, flush_interval=0.05, max_queue_size=10)
+
+    async def test_coalesces_by_drone_id(self):
+        """
+        Test that only the last document per drone is written.
+        """
+        await self.writer.submit({"drone_id": "drone-1", "status": "flying"})
+        await self.writer.submit({"drone_id": "drone-1", "status": "returning"})
+        await self.writer.submit({"drone_id": "drone-2", "status": "docked"})
+        await self.writer.flush()
+        self.assertEqual(self.repository.save_many.await_count, 0)
+
+        self.writer.start()
+        await self.writer.stop()
+
+        batch = self.repository.save_many.await_args.args[0]
+        self.assertEqual(batch, [
+            {"drone_id": "drone-1", "status": "returning"},
+            {"drone_id": "drone-2", "status": "docked"},
+        ])
+        self.assertEqual(self.writer.coalesced_documents, 1)
+        self.assertEqual(self.writer.queue_depth, 0)
+
+    async def test_flushes_on_batch_size(self):
+        """
+        Test that a full batch is flushed without waiting for the interval.
+        """
+        self.writer.flush_interval = 60
+        self.writer.start()
+        for i in range(3):
+            await self.writer.submit({"drone_id": f"drone-{i}", "status": "idle"})
+        for _ in range(10):
+            await asyncio.sleep(0)
+        self.assertEqual(self.repository.save_many.await_count, 1)
+        self.assertEqual(len(self.repository.save_many.await_args.args[0]), 3)
+        await self.writer.stop()
+
+    async def test_flushes_on_interval(self):
+        """
+        Test that a partial batch is flushed once the interval elapses.
+        """
+        self.writer.start()
+        await self.writer.submit({"drone_id": "drone-1", "status": "idle"})
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.repository.save_many.await_count, 1)
+        self.assertEqual(self.writer.flushed_documents, 1)
+        await self.writer.stop()
+
+    async def test_failed_flush_is_retried_without_overwriting_newer_documents(self):
+        """
+        Test that a failed batch is put back behind newer documents and written by the retry.
+        """
+        self.writer.retry_base = 0.01
+        self.repository.save_many = AsyncMock(side_effect=[ConnectionError("down"), None])
+        self.writer._add_pending({"drone_id": "drone-1", "status": "flying"})
+        self.writer._add_pending({"drone_id": "drone-2", "status": "idle"})
+        self.assertFalse(await self.writer.flush())
+        self.assertEqual(self.writer.failed_flushes, 1)
+        self.assertEqual(self.writer.queue_depth, 2)
+
+        self.writer.start()
+        await self.writer.submit({"drone_id": "drone-1", "status": "returning"})
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.repository.save_many.await_count, 2)
+        self.assertEqual(sorted(self.repository.save_many.await_args.args[0], key=lambda data: data["drone_id"]), [
+            {"drone_id": "drone-1", "status": "returning"},
+            {"drone_id": "drone-2", "status": "idle"},
+        ])
+        self.assertEqual(self.writer.queue_depth, 0)
+        await self.writer.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()